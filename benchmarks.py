@@ -0,0 +1,411 @@
+""" The benchmarks module times the hot paths of the vector, shapes, and
+collisions modules.  It is meant to be run as a script:
+
+    python benchmarks.py [--output results.json] [--compare old.json] [name...]
+
+Every benchmark reports the best time per call out of several repeats.  The
+results are printed as a table and can also be written out as JSON, so that a
+run on one commit can be compared against a run on another.  Any names given
+on the command line restrict the run to the benchmarks that start with them.
+
+All of the inputs are generated from a fixed random seed, so two runs of the
+same code always do exactly the same work. """
+
+from __future__ import division
+
+import math, random, json, pickle, platform, sys, time, timeit
+
+from vector import *
+from shapes import *
+from collisions import Collisions
+from broadphase import SpatialHash, AABBTree
+from world import CollisionWorld
+import serialization
+from fixtures import random_shapes, edges_touching
+
+format_version = 1
+
+class Benchmark(object):
+    """ Times one callable.  The callable is run in a loop that is long enough
+    to last for roughly the given duration, and the loop is repeated several
+    times to filter out noise.  Only the fastest repeat is kept. """
+
+    # Operators {{{1
+    def __init__(self, name, function, calls=1):
+        self.__name = name
+        self.__function = function
+        self.__calls = calls
+
+    def __repr__(self):
+        return "<Benchmark %s>" % self.__name
+
+    # Attributes {{{1
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def function(self):
+        return self.__function
+
+    @property
+    def calls(self):
+        return self.__calls
+
+    def get_name(self): return self.name
+    def get_function(self): return self.function
+    def get_calls(self): return self.calls
+
+    # Methods {{{1
+    def run(self, duration=0.1, repeat=5):
+        """ Time this benchmark and return a dictionary describing the result.
+        The calls attribute is used to turn the time for one invocation of the
+        function into the time for one of the operations it performs. """
+        timer = timeit.Timer(self.function)
+        number = Benchmark.calibrate(timer, duration)
+
+        best = min(timer.repeat(repeat, number))
+        seconds = best / number / self.calls
+
+        return dict(seconds=seconds, number=number,
+                repeat=repeat, calls=self.calls)
+
+    @staticmethod
+    def calibrate(timer, duration):
+        number = 1
+        while True:
+            if timer.timeit(number) >= duration / 10:
+                return max(1, int(number * 10))
+            number *= 10
+    # }}}1
+
+# Fixtures {{{1
+def random_vectors(count, size=500, seed=0):
+    generator = random.Random(seed)
+    return [Vector(generator.uniform(0, size), generator.uniform(0, size))
+            for index in range(count)]
+
+def all_pairs(shapes):
+    touching = Collisions.touching
+    count = 0
+
+    for index, first in enumerate(shapes):
+        for second in shapes[index + 1:]:
+            if touching(first, second):
+                count += 1
+
+    return count
+
+def moving_world(count, broad_phase, fraction=0.1):
+    """ Build a collision world in which the given fraction of the shapes are
+    mutable circles that wobble back and forth every step. """
+    size = 35 * math.sqrt(count)
+    shapes = random_shapes(count, size=size)
+    moving = []
+
+    for index, shape in enumerate(shapes[:int(count * fraction)]):
+        if isinstance(shape, Circle):
+            shapes[index] = MutableCircle(shape.center, shape.radius)
+            moving.append(shapes[index])
+
+    world = CollisionWorld(broad_phase)
+    for shape in shapes:
+        world.insert(shape)
+
+    world.step()
+    return world, moving
+
+def bullet_hell(count, filtered, seed=0):
+    """ Build a spatial hash full of small bullets, with a few players mixed
+    in.  Bullets can only hit players, but that only helps if the index is
+    told about it. """
+    generator = random.Random(seed)
+    index = SpatialHash(32)
+    bullet, player = 1, 2
+
+    for number in range(count):
+        center = Vector(generator.uniform(0, 400), generator.uniform(0, 400))
+
+        if number % 50:
+            category, mask, radius = bullet, player, 3
+        else:
+            category, mask, radius = player, bullet, 12
+
+        if filtered:
+            index.insert(Circle(center, radius), category, mask)
+        else:
+            index.insert(Circle(center, radius))
+
+    return index
+
+def world_stepper(world, moving):
+    """ Return a function that steps the world once.  The moving shapes go
+    back and forth on alternate steps, so they never drift away. """
+    steps = [Vector(2, 1), Vector(-2, -1)]
+
+    def step():
+        steps.reverse()
+        for shape in moving:
+            shape.move_ip(steps[0])
+        world.step()
+
+    return step
+# }}}1
+
+# Vector Benchmarks {{{1
+def vector_benchmarks():
+    a = Vector(3.0, 4.0); b = Vector(-1.5, 2.5)
+
+    yield Benchmark("vector.construct", lambda: Vector(3.0, 4.0))
+    yield Benchmark("vector.add", lambda: a + b)
+    yield Benchmark("vector.subtract", lambda: a - b)
+    yield Benchmark("vector.scale", lambda: a * 2.5)
+    yield Benchmark("vector.divide", lambda: a / 2.5)
+    yield Benchmark("vector.dot", lambda: Vector.dot(a, b))
+    yield Benchmark("vector.perp", lambda: Vector.perp(a, b))
+    yield Benchmark("vector.magnitude", lambda: a.magnitude)
+    yield Benchmark("vector.normal", lambda: a.normal)
+    yield Benchmark("vector.orthonormal", lambda: a.orthonormal)
+    yield Benchmark("vector.distance", lambda: Vector.get_distance(a, b))
+
+# Shape Benchmarks {{{1
+def shape_benchmarks():
+    center = Vector(50, 50)
+    corner = Vector(80, 90)
+    hexagon = [center + 20 * Vector.from_radians(index * math.pi / 3)
+            for index in range(6)]
+    square = [Vector(10, 10), Vector(20, 10), Vector(20, 20), Vector(10, 20)]
+    circle = Circle(center, 20)
+    polygon = Polygon(hexagon)
+
+    yield Benchmark("shapes.line", lambda: Line(center, corner))
+    yield Benchmark("shapes.circle", lambda: Circle(center, 20))
+    yield Benchmark("shapes.polygon.square", lambda: Polygon(square))
+    yield Benchmark("shapes.polygon.hexagon", lambda: Polygon(hexagon))
+    yield Benchmark("shapes.polygon.trusted",
+            lambda: Polygon(hexagon, trusted=True))
+    yield Benchmark("shapes.polygon.box",
+            lambda: Polygon(hexagon, trusted=True).box)
+    yield Benchmark("shapes.polygon.regular",
+            lambda: Polygon.from_regular(center, 20, 8))
+
+    # Rotating a sprite by rebuilding its polygon, and by transforming it.
+    turn = Transform.from_rotation(0.1)
+    sprite = TransformedShape(polygon, Transform.identity())
+
+    yield Benchmark("shapes.polygon.rotate",
+            lambda: Polygon([turn.apply(vertex) for vertex in hexagon]).box)
+    yield Benchmark("shapes.transformed.rotate",
+            lambda: sprite.rotate(0.1).box)
+
+    # Moving an entity by one frame, with and without allocating.
+    step = Vector(1.5, -0.5)
+    rectangle = Rectangle(10, 20, 30, 40)
+    mutable_circle = MutableCircle(center, 20)
+    mutable_rectangle = MutableRectangle(10, 20, 30, 40)
+
+    yield Benchmark("shapes.circle.move", lambda: circle.move(step).box)
+    yield Benchmark("shapes.circle.move_ip",
+            lambda: mutable_circle.move_ip(step))
+    yield Benchmark("shapes.rectangle.move",
+            lambda: rectangle.move(step))
+    yield Benchmark("shapes.rectangle.move_ip",
+            lambda: mutable_rectangle.move_ip(step))
+
+    yield Benchmark("shapes.rectangle.dimensions",
+            lambda: Rectangle.from_dimensions(10, 20, 30, 40))
+    yield Benchmark("shapes.rectangle.corners",
+            lambda: Rectangle.from_corners(center, corner))
+    yield Benchmark("shapes.rectangle.center",
+            lambda: Rectangle.from_center(center, 30, 40))
+    yield Benchmark("shapes.rectangle.top_left",
+            lambda: Rectangle.from_top_left(center, 30, 40))
+    yield Benchmark("shapes.rectangle.circle",
+            lambda: Rectangle.from_circle(circle))
+    yield Benchmark("shapes.rectangle.shape",
+            lambda: Rectangle.from_shape(polygon))
+
+# Collision Benchmarks {{{1
+def collision_benchmarks():
+    point = Vector(12, 13); other = Vector(15, 17)
+    inside = Vector(50, 52); outside = Vector(90, 95)
+    origin = Vector(0, 0); direction = Vector(1, 1).normal
+
+    line = Line(Vector(0, 0), Vector(40, 30), Vector(-3, 4).normal)
+    crossing = Line(Vector(0, 30), Vector(40, 0))
+    parallel = Line(Vector(0, 10), Vector(40, 40))
+
+    circle = Circle(Vector(50, 50), 20)
+    near_circle = Circle(Vector(70, 65), 10)
+    far_circle = Circle(Vector(150, 150), 10)
+
+    box = Rectangle.from_center(Vector(50, 50), 40, 30)
+    near_box = Rectangle.from_center(Vector(70, 60), 20, 20)
+    far_box = Rectangle.from_center(Vector(150, 150), 20, 20)
+
+    hexagon = Polygon.from_regular(Vector(50, 50), 20, 6)
+    near_hexagon = Polygon.from_regular(Vector(75, 60), 15, 6, 0.3)
+    far_hexagon = Polygon.from_regular(Vector(150, 150), 15, 6, 0.3)
+
+    predicates = [
+            ("points_nearby", (point, other, 5)),
+            ("point_on_line", (Vector(20, 15), line)),
+            ("point_near_line", (point, line, 3)),
+            ("point_past_line", (point, line, 3)),
+            ("point_near_circle", (inside, circle, 3)),
+            ("point_near_shape", (inside, hexagon, 3)),
+            ("point_inside_circle", (outside, circle)),
+            ("point_inside_shape", (inside, hexagon)),
+            ("point_inside_shape.box", (inside, box)),
+            ("lines_touching", (line, crossing)),
+            ("lines_touching.parallel", (line, parallel)),
+            ("circle_near_line", (near_circle, line, 3)),
+            ("circle_touching_line", (near_circle, line)),
+            ("circle_past_line", (near_circle, line, 3)),
+            ("shape_touching_line", (hexagon, crossing)),
+            ("shape_touching_line.box", (box, crossing)),
+            ("shape_past_line", (hexagon, line, 3)),
+            ("boxes_touching", (box, near_box)),
+            ("boxes_touching.miss", (box, far_box)),
+            ("circles_nearby", (circle, near_circle, 3)),
+            ("circles_touching", (circle, near_circle)),
+            ("circles_touching.miss", (circle, far_circle)),
+            ("circle_touching_shape", (near_circle, hexagon)),
+            ("circle_touching_polygon", (near_circle, hexagon)),
+            ("polygons_touching", (hexagon, near_hexagon)),
+            ("polygons_touching.miss", (hexagon, far_hexagon)),
+            ("shapes_touching", (hexagon, near_hexagon)),
+            ("shapes_touching.box", (box, near_box)),
+            ("touching", (near_circle, hexagon)),
+            ("contact", (hexagon, near_hexagon)),
+            ("circles_impact", (near_circle, Vector(-40, -30), circle)),
+            ("boxes_impact", (near_box, Vector(-40, -30), box)),
+            ("raycast", (origin, direction, 200, hexagon)) ]
+
+    for name, arguments in predicates:
+        function = getattr(Collisions, name.split(".")[0])
+        yield Benchmark("collisions." + name,
+                lambda function=function, arguments=arguments:
+                    function(*arguments))
+
+    # The edge intersection test that polygons_touching() replaced.
+    yield Benchmark("collisions.polygons_touching.edges",
+            lambda: edges_touching(hexagon, near_hexagon))
+    yield Benchmark("collisions.polygons_touching.edges.miss",
+            lambda: edges_touching(hexagon, far_hexagon))
+
+# Scene Benchmarks {{{1
+def scene_benchmarks(sizes=(25, 50, 100, 200)):
+    for size in sizes:
+        shapes = random_shapes(size, size=10 * size)
+        pairs = size * (size - 1) // 2
+
+        # The time reported is the time taken to check one pair, so scenes of
+        # different sizes can be compared directly.
+        yield Benchmark("scene.all_pairs.%d" % size,
+                lambda shapes=shapes: all_pairs(shapes), calls=pairs)
+
+    # The time reported is the time taken to find every touching pair.
+    for name, filtered in (("unfiltered", False), ("filtered", True)):
+        index = bullet_hell(1000, filtered)
+        yield Benchmark("scene.bullets.%s" % name,
+                lambda index=index: list(index.touching()))
+
+    # The time reported is the time taken for one whole step.
+    for size in (200, 1000):
+        for name, index in (("hash", SpatialHash(64)), ("tree", AABBTree())):
+            world, moving = moving_world(size, index)
+            yield Benchmark("scene.world.%s.%d" % (name, size),
+                    world_stepper(world, moving))
+
+    # The time reported is the time taken to save or load a whole scene.  The
+    # shapes are used first, so anything they cache would be pickled too.
+    shapes = random_shapes(1000, size=5000)
+    all_pairs(shapes[:100])
+    for shape in shapes: shape.box
+
+    pickled = pickle.dumps(shapes, pickle.HIGHEST_PROTOCOL)
+    packed = serialization.dumps(shapes)
+
+    yield Benchmark("scene.snapshot.pickle.dump", lambda:
+            pickle.dumps(shapes, pickle.HIGHEST_PROTOCOL))
+    yield Benchmark("scene.snapshot.pickle.load", lambda:
+            pickle.loads(pickled))
+    yield Benchmark("scene.snapshot.binary.dump", lambda:
+            serialization.dumps(shapes))
+    yield Benchmark("scene.snapshot.binary.load", lambda:
+            serialization.loads(packed))
+# }}}1
+
+def all_benchmarks():
+    for group in (vector_benchmarks, shape_benchmarks,
+                  collision_benchmarks, scene_benchmarks):
+        for benchmark in group():
+            yield benchmark
+
+def run_benchmarks(names=(), duration=0.1, repeat=5, output=sys.stdout):
+    """ Run every benchmark whose name starts with one of the given names
+    (or every benchmark, if no names are given) and return the results as a
+    dictionary that can be dumped directly to JSON. """
+    results = {}
+
+    for benchmark in all_benchmarks():
+        if names and not benchmark.name.startswith(tuple(names)):
+            continue
+
+        result = benchmark.run(duration, repeat)
+        results[benchmark.name] = result
+
+        if output:
+            output.write("%-40s %12.3f us\n" % (
+                benchmark.name, result["seconds"] * 1e6))
+            output.flush()
+
+    return dict(
+            version=format_version,
+            created=time.strftime("%Y-%m-%dT%H:%M:%S"),
+            python=platform.python_version(),
+            implementation=platform.python_implementation(),
+            platform=platform.platform(),
+            results=results)
+
+def compare_results(old, new, output=sys.stdout):
+    """ Print the ratio between the old and new time of every benchmark that
+    appears in both sets of results.  Ratios above one mean the new code is
+    slower. """
+    old = old["results"]; new = new["results"]
+
+    for name in sorted(set(old) & set(new)):
+        before = old[name]["seconds"]
+        after = new[name]["seconds"]
+
+        output.write("%-40s %12.3f us %12.3f us %8.2fx\n" % (
+            name, before * 1e6, after * 1e6, after / before))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time the hot paths.")
+    parser.add_argument("names", nargs="*",
+            help="only run benchmarks starting with these names")
+    parser.add_argument("--output", "-o",
+            help="write the results to this JSON file")
+    parser.add_argument("--compare", "-c",
+            help="compare the results against this JSON file")
+    parser.add_argument("--duration", type=float, default=0.1,
+            help="approximate seconds spent in each repeat")
+    parser.add_argument("--repeat", type=int, default=5,
+            help="number of repeats to take the best of")
+
+    arguments = parser.parse_args()
+    results = run_benchmarks(
+            arguments.names, arguments.duration, arguments.repeat)
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=4, sort_keys=True)
+
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            print
+            compare_results(json.load(file), results)
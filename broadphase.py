@@ -0,0 +1,1682 @@
+""" The broadphase module provides spatial indices that quickly find the
+shapes that might be touching each other.  The indices only ever compare the
+bounding boxes of the shapes they hold, so the candidate pairs they report
+still need to be checked using the functions in the collisions module.  The
+touching() method provided by every index does exactly that.
+
+Any object with a box attribute can be indexed, which includes circles,
+rectangles, and polygons.  Shapes are immutable, so moving a shape usually
+means replacing it with a new object.  The move() methods take care of this by
+accepting an optional replacement for the shape being moved.
+
+Every shape can also be given a category and a mask when it is inserted.  Both
+are bitfields, and two shapes are only ever reported as a pair if each one's
+category shares a bit with the other one's mask.  This check is a couple of
+integer operations, and it happens before any boxes are compared.  By default,
+every shape is in the first category and interacts with every category. """
+
+from __future__ import division
+
+import heapq, itertools, math
+
+import shapes
+from vector import *
+from collisions import Collisions
+
+default_category = 1
+default_mask = ~0
+
+class BroadPhase(object):
+    """ Provides the interface shared by every broad-phase index.  This is
+    supposed to be an abstract base class; it is meant to be inherited rather
+    than instantiated. """
+
+    # Abstract Methods {{{1
+    def insert(self, shape, category=default_category, mask=default_mask):
+        raise NotImplementedError
+    def remove(self, shape): raise NotImplementedError
+    def move(self, shape, replacement=None): raise NotImplementedError
+
+    def filter(self, shape): raise NotImplementedError
+
+    def query(self, shape): raise NotImplementedError
+    def pairs(self): raise NotImplementedError
+
+    # Narrow Phase {{{1
+    def touching(self):
+        """ Yield every pair of shapes in this index that are actually
+        touching each other. """
+        touching = Collisions.touching
+
+        for first, second in self.pairs():
+            if touching(first, second):
+                yield first, second
+
+    def query_region(self, region):
+        """ Return every shape in this index that is touching the given
+        region, which can be any circle or shape. """
+        touching = Collisions.touching
+        return set(shape for shape in self.query(region)
+                if touching(region, shape))
+
+    def query_point(self, point):
+        """ Return every shape in this index that contains the given point. """
+        point_inside = Collisions.point_inside
+        region = shapes.Rectangle.from_point(point)
+
+        return set(shape for shape in self.query(region)
+                if point_inside(point, shape))
+
+    # Raycasts {{{1
+    def raycast(self, origin, direction, max_distance):
+        """ Return the first shape hit by the given ray and a RayHit describing
+        where it was hit, or None if the ray doesn't hit anything within the
+        given distance. """
+        hits = self.raycast_all(origin, direction, max_distance)
+        return hits[0] if hits else None
+
+    def raycast_all(self, origin, direction, max_distance):
+        """ Return a (shape, hit) pair for every shape hit by the given ray
+        within the given distance, sorted from nearest to furthest.  This
+        default implementation checks every shape near the ray's box. """
+        end = origin + direction.normal * max_distance
+        region = shapes.Line(origin, end)
+        raycast = Collisions.raycast
+
+        hits = []
+        for shape in self.query(region):
+            hit = raycast(origin, direction, max_distance, shape)
+            if hit: hits.append((shape, hit))
+
+        hits.sort(key=lambda pair: pair[1].distance)
+        return hits
+
+    # Nearest Shapes {{{1
+    def nearest(self, point, max_distance=float('inf')):
+        """ Return the shape closest to the given point and its distance, or
+        None if there aren't any shapes within the given distance.  Points
+        inside a shape are zero distance away from it. """
+        found = self.k_nearest(point, 1, max_distance)
+        return found[0] if found else None
+
+    def k_nearest(self, point, k, max_distance=float('inf')):
+        """ Return a (shape, distance) pair for each of the k shapes closest
+        to the given point, nearest first, leaving out any that are further
+        away than the given distance.  This default implementation queries
+        a square around the point, and keeps doubling the size of the square
+        until it holds k shapes that are closer than its edges, or until it
+        covers every shape in the index. """
+        if k <= 0:
+            return []
+
+        distance = Collisions.distance
+        radius = min(max_distance, BroadPhase.search_radius)
+        x, y = point
+
+        while True:
+            region = shapes.Rectangle(
+                    x - radius, y - radius, x + radius, y + radius)
+            candidates = self.query(region)
+
+            found = [(distance(point, shape), shape) for shape in candidates]
+            found = [pair for pair in found if pair[0] <= max_distance]
+            found.sort(key=lambda pair: pair[0])
+
+            # Any shape closer than the edges of the square has a box that
+            # overlaps the square, so it must be one of the candidates.
+            done = len(found) >= k and found[k - 1][0] <= radius
+
+            if done or radius >= max_distance or \
+                    len(candidates) >= len(self):
+                return [(shape, d) for d, shape in found[:k]]
+
+            radius = min(2 * radius, max_distance)
+
+    # The size of the first square searched by k_nearest().
+    search_radius = 16
+
+    # Helper Methods {{{1
+    @staticmethod
+    def branch_and_bound(point, k, max_distance, root, expand):
+        """ Find the k shapes closest to the given point by searching a tree
+        of boxes, nearest box first.  The expand() function is given a node
+        of the tree and returns two lists: (squared distance, node) pairs for
+        the node's children and (squared distance, shape) pairs for the
+        shapes it holds, where each distance is measured to a box.  Boxes are
+        never further away than what they hold, so the search stops as soon
+        as k shapes are closer than any box that hasn't been opened yet. """
+        distance = Collisions.distance
+        counter = itertools.count()
+        found = []
+
+        # Boxes are compared using squared distances, so leave some room for
+        # rounding; shapes are always compared using their exact distance.
+        limit = max_distance * max_distance * (1 + 1e-9)
+
+        # Each entry is a squared distance, a tie breaker, a node or a shape,
+        # and the exact distance to the shape once it's been measured.
+        heap = [(0, next(counter), root, None, None)]
+        push = heapq.heappush
+
+        while heap and len(found) < k:
+            key, order, node, shape, exact = heapq.heappop(heap)
+
+            if exact is not None:
+                if exact > max_distance: break
+                found.append((shape, exact))
+            elif key > limit:
+                break
+            elif shape is not None:
+                exact = distance(point, shape)
+                push(heap, (exact * exact, order, None, shape, exact))
+            else:
+                children, contents = expand(node)
+                for key, child in children:
+                    push(heap, (key, next(counter), child, None, None))
+                for key, shape in contents:
+                    push(heap, (key, next(counter), None, shape, None))
+
+        return found
+
+    @staticmethod
+    def box_distance(x, y, left, top, right, bottom):
+        """ Return the squared distance from the given point to the nearest
+        point in the given box. """
+        dx = left - x if x < left else x - right if x > right else 0
+        dy = top - y if y < top else y - bottom if y > bottom else 0
+        return dx * dx + dy * dy
+    # }}}1
+
+class SpatialHash(BroadPhase):
+    """ Sorts shapes into the cells of a uniform grid.  Only shapes that share
+    a cell are ever compared, so finding every pair of overlapping boxes takes
+    roughly linear time when the shapes are spread out.  The grid works best
+    when its cells are a little bigger than a typical shape; shapes that cover
+    many cells are slow to insert and to move. """
+
+    # Operators {{{1
+    def __init__(self, cell_size):
+        self.__size = cell_size
+        self.__cells = {}
+        self.__shapes = {}
+
+    def __len__(self):
+        return len(self.__shapes)
+
+    def __iter__(self):
+        return iter(self.__shapes)
+
+    def __contains__(self, shape):
+        return shape in self.__shapes
+
+    # Attributes {{{1
+    @property
+    def cell_size(self):
+        return self.__size
+
+    def get_cell_size(self):
+        return self.cell_size
+
+    # Index Methods {{{1
+    def insert(self, shape, category=default_category, mask=default_mask):
+        """ Add the given shape to every cell that its box overlaps. """
+        box = shape.box
+        bounds = self.__bounds(box)
+
+        self.__shapes[shape] = box, bounds, category, mask
+        self.__fill(shape, SpatialHash.yield_cells(bounds))
+
+    def remove(self, shape):
+        """ Remove the given shape from the grid. """
+        bounds = self.__shapes.pop(shape)[1]
+        self.__clear(shape, SpatialHash.yield_cells(bounds))
+
+    def move(self, shape, replacement=None):
+        """ Update the cells that hold the given shape.  If a replacement is
+        given, it takes the place of the original shape in the grid.  Shapes
+        that stay in the same cells are handled without touching the grid. """
+
+        if replacement is None:
+            replacement = shape
+
+        old_box, old_bounds, category, mask = self.__shapes.pop(shape)
+        new_box = replacement.box
+        new_bounds = self.__bounds(new_box)
+
+        self.__shapes[replacement] = new_box, new_bounds, category, mask
+
+        old_cells = SpatialHash.yield_cells(old_bounds)
+        new_cells = SpatialHash.yield_cells(new_bounds)
+
+        if replacement is not shape:
+            self.__clear(shape, old_cells)
+            self.__fill(replacement, new_cells)
+
+        elif new_bounds != old_bounds:
+            old_cells = set(old_cells)
+            new_cells = set(new_cells)
+
+            self.__clear(shape, old_cells - new_cells)
+            self.__fill(shape, new_cells - old_cells)
+
+    def filter(self, shape):
+        """ Return the category and mask that the given shape was inserted
+        with. """
+        record = self.__shapes[shape]
+        return record[2], record[3]
+
+    def query(self, shape):
+        """ Return every shape in the grid with a box that overlaps the box of
+        the given shape.  The shape itself is never included. """
+        box = shape.box
+        boxes_touching = Collisions.boxes_touching
+
+        found = set()
+        for cell in SpatialHash.yield_cells(self.__bounds(box)):
+            found.update(self.__cells.get(cell, ()))
+
+        found.discard(shape)
+
+        return set(other for other in found
+                if boxes_touching(box, self.__shapes[other][0]))
+
+    def pairs(self):
+        """ Yield every pair of shapes in the grid with overlapping boxes.
+        Pairs that share more than one cell are only reported by the cell that
+        holds the top left corner of their overlap, so each pair is reported
+        exactly once. """
+
+        size = self.__size
+        floor = math.floor
+        shapes = self.__shapes
+        boxes_touching = Collisions.boxes_touching
+
+        for (i, j), members in self.__cells.items():
+            if len(members) < 2:
+                continue
+
+            members = list(members)
+            count = len(members)
+
+            for a in range(count):
+                first = members[a]
+                first_box, _, first_category, first_mask = shapes[first]
+
+                for b in range(a + 1, count):
+                    second = members[b]
+                    second_box, _, second_category, second_mask = \
+                            shapes[second]
+
+                    if not (first_category & second_mask and
+                            second_category & first_mask):
+                        continue
+
+                    if not boxes_touching(first_box, second_box):
+                        continue
+
+                    left = max(first_box.left, second_box.left)
+                    top = max(first_box.top, second_box.top)
+
+                    if floor(left / size) != i: continue
+                    if floor(top / size) != j: continue
+
+                    yield first, second
+
+    def raycast(self, origin, direction, max_distance):
+        """ Return the first shape hit by the given ray and a RayHit describing
+        where it was hit, or None if the ray doesn't hit anything within the
+        given distance.  The ray walks through the grid one cell at a time and
+        stops as soon as a hit is found that's closer than the next cell. """
+        raycast = Collisions.raycast
+        tested = set()
+        best = None
+
+        for members, exit in self.__march(origin, direction, max_distance):
+            for shape in members:
+                if shape in tested: continue
+                tested.add(shape)
+
+                limit = best[1].distance if best else max_distance
+                hit = raycast(origin, direction, limit, shape)
+
+                if hit and (best is None or hit.distance < limit):
+                    best = shape, hit
+
+            if best and best[1].distance <= exit:
+                break
+
+        return best
+
+    def raycast_all(self, origin, direction, max_distance):
+        """ Return a (shape, hit) pair for every shape hit by the given ray
+        within the given distance, sorted from nearest to furthest.  Only the
+        cells along the ray are checked. """
+        raycast = Collisions.raycast
+        tested = set()
+        hits = []
+
+        for members, exit in self.__march(origin, direction, max_distance):
+            for shape in members:
+                if shape in tested: continue
+                tested.add(shape)
+
+                hit = raycast(origin, direction, max_distance, shape)
+                if hit: hits.append((shape, hit))
+
+        hits.sort(key=lambda pair: pair[1].distance)
+        return hits
+
+    # Helper Methods {{{1
+    @staticmethod
+    def yield_cells(bounds):
+        """ Yield the index of every cell in the given range. """
+        first_column, first_row, last_column, last_row = bounds
+
+        for i in range(first_column, last_column + 1):
+            for j in range(first_row, last_row + 1):
+                yield i, j
+
+    def __bounds(self, box):
+        size = self.__size
+        floor = math.floor
+
+        return (int(floor(box.left / size)), int(floor(box.top / size)),
+                int(floor(box.right / size)), int(floor(box.bottom / size)))
+
+    def __march(self, origin, direction, max_distance):
+        """ Yield the contents of every cell that the given ray passes
+        through, in order, along with the distance at which the ray leaves
+        each cell.  This is a digital differential analyzer: the ray always
+        steps into whichever neighboring cell it reaches first. """
+        size = self.__size
+        floor = math.floor
+        infinity = float('inf')
+
+        x, y = origin
+        dx, dy = direction.normal
+
+        i, j = int(floor(x / size)), int(floor(y / size))
+        distance = 0
+
+        def setup(start, cell, speed):
+            if speed > 0:
+                return 1, ((cell + 1) * size - start) / speed, size / speed
+            if speed < 0:
+                return -1, (cell * size - start) / speed, -size / speed
+            return 0, infinity, infinity
+
+        step_i, next_x, delta_x = setup(x, i, dx)
+        step_j, next_y, delta_y = setup(y, j, dy)
+
+        while distance <= max_distance:
+            exit = min(next_x, next_y)
+            yield self.__cells.get((i, j), ()), exit
+
+            if next_x < next_y:
+                i += step_i; distance = next_x; next_x += delta_x
+            else:
+                j += step_j; distance = next_y; next_y += delta_y
+
+    def __fill(self, shape, cells):
+        for cell in cells:
+            self.__cells.setdefault(cell, set()).add(shape)
+
+    def __clear(self, shape, cells):
+        for cell in cells:
+            members = self.__cells[cell]
+            members.discard(shape)
+            if not members:
+                del self.__cells[cell]
+    # }}}1
+
+class SweepAndPrune(BroadPhase):
+    """ Sorts the left and right edges of every box along the x-axis, then
+    sweeps across them to find the boxes that overlap.  The sorted list of
+    edges is kept from one call to the next and is re-sorted with an insertion
+    sort.  Shapes don't move far between frames, so the list is usually almost
+    sorted already and this costs close to linear time.  This index works best
+    when the shapes are spread out along the x-axis, like in a side-scroller.
+
+    Each endpoint in the list is stored as [x, is_end, shape].  Starts are
+    sorted before ends with the same coordinate, so boxes that just barely
+    touch are still reported. """
+
+    # Operators {{{1
+    def __init__(self):
+        self.__endpoints = []
+        self.__shapes = {}
+
+        self.__unsorted = False
+        self.__inserted = False
+        self.__removed = False
+
+    def __len__(self):
+        return len(self.__shapes)
+
+    def __iter__(self):
+        return iter(self.__shapes)
+
+    def __contains__(self, shape):
+        return shape in self.__shapes
+
+    # Index Methods {{{1
+    def insert(self, shape, category=default_category, mask=default_mask):
+        """ Add the given shape to the index.  New endpoints are merged into
+        the list the next time it is sorted. """
+        box = shape.box
+        start = [box.left, False, shape]
+        end = [box.right, True, shape]
+
+        self.__shapes[shape] = box, start, end, category, mask
+        self.__endpoints += start, end
+        self.__inserted = True
+
+    def remove(self, shape):
+        """ Remove the given shape from the index.  Its endpoints are dropped
+        the next time the list is sorted. """
+        box, start, end, category, mask = self.__shapes.pop(shape)
+        start[2] = end[2] = None
+        self.__removed = True
+
+    def move(self, shape, replacement=None):
+        """ Update the endpoints of the given shape.  If a replacement is
+        given, it takes the place of the original shape in the index. """
+
+        if replacement is None:
+            replacement = shape
+
+        box, start, end, category, mask = self.__shapes.pop(shape)
+        box = replacement.box
+
+        start[0] = box.left; start[2] = replacement
+        end[0] = box.right; end[2] = replacement
+
+        self.__shapes[replacement] = box, start, end, category, mask
+        self.__unsorted = True
+
+    def filter(self, shape):
+        """ Return the category and mask that the given shape was inserted
+        with. """
+        record = self.__shapes[shape]
+        return record[3], record[4]
+
+    def query(self, shape):
+        """ Return every shape in the index with a box that overlaps the box
+        of the given shape.  The shape itself is never included. """
+        self.__sort()
+
+        box = shape.box
+        shapes = self.__shapes
+        boxes_touching = Collisions.boxes_touching
+
+        found = set()
+        for x, is_end, other in self.__endpoints:
+            if x > box.right:
+                break
+            if is_end or other is shape:
+                continue
+            if boxes_touching(box, shapes[other][0]):
+                found.add(other)
+
+        return found
+
+    def pairs(self):
+        """ Yield every pair of shapes with overlapping boxes.  Any box that
+        is still open when another one starts overlaps it along the x-axis, so
+        only the y-axis needs to be checked. """
+        self.__sort()
+
+        active = {}
+        shapes = self.__shapes
+
+        for x, is_end, shape in self.__endpoints:
+            if is_end:
+                del active[shape]
+                continue
+
+            record = shapes[shape]
+            box, category, mask = record[0], record[3], record[4]
+            top, bottom = box.top, box.bottom
+
+            for other, (other_box, other_category, other_mask) \
+                    in active.items():
+                if not (category & other_mask and other_category & mask):
+                    continue
+                if top <= other_box.bottom and bottom >= other_box.top:
+                    yield other, shape
+
+            active[shape] = box, category, mask
+
+    # Helper Methods {{{1
+    def __sort(self):
+        endpoints = self.__endpoints
+
+        if self.__removed:
+            endpoints[:] = [x for x in endpoints if x[2] is not None]
+            self.__removed = False
+
+        # Newly inserted endpoints could be anywhere, so merge them in using
+        # a full sort.  After that, only insertion sort is needed.
+        if self.__inserted:
+            endpoints.sort(key=lambda x: (x[0], x[1]))
+            self.__inserted = self.__unsorted = False
+
+        if self.__unsorted:
+            SweepAndPrune.insertion_sort(endpoints)
+            self.__unsorted = False
+
+    @staticmethod
+    def insertion_sort(endpoints):
+        """ Sort the given endpoints in place.  This takes linear time if the
+        endpoints are already nearly sorted. """
+
+        for i in range(1, len(endpoints)):
+            endpoint = endpoints[i]
+            x, is_end = endpoint[0], endpoint[1]
+
+            j = i - 1
+            while j >= 0:
+                other = endpoints[j]
+                if other[0] < x: break
+                if other[0] == x and other[1] <= is_end: break
+
+                endpoints[j + 1] = other
+                j -= 1
+
+            endpoints[j + 1] = endpoint
+    # }}}1
+
+class AABBTree(BroadPhase):
+    """ Keeps shapes in a dynamic bounding volume hierarchy.  Each leaf holds
+    one shape and a box that has been fattened by a small margin, so shapes
+    can move a little without being reinserted.  Each branch holds the union
+    of the boxes beneath it.  New leaves are placed next to whichever node
+    grows the tree's perimeter the least, and rotations keep the tree balanced.
+    Unlike a uniform grid, this index copes well with a mix of very large and
+    very small shapes. """
+
+    # Operators {{{1
+    def __init__(self, margin=5):
+        self.__margin = margin
+        self.__root = None
+        self.__leaves = {}
+
+    def __len__(self):
+        return len(self.__leaves)
+
+    def __iter__(self):
+        return iter(self.__leaves)
+
+    def __contains__(self, shape):
+        return shape in self.__leaves
+
+    # Attributes {{{1
+    @property
+    def margin(self):
+        return self.__margin
+
+    @property
+    def height(self):
+        return self.__root.height if self.__root else 0
+
+    def get_margin(self):
+        return self.margin
+
+    def get_height(self):
+        return self.height
+
+    # Index Methods {{{1
+    def insert(self, shape, category=default_category, mask=default_mask):
+        """ Add a leaf for the given shape to the tree. """
+        leaf = TreeNode(shape.box.grow(self.__margin), shape)
+        leaf.category = category
+        leaf.mask = mask
+        self.__leaves[shape] = leaf
+        self.__insert_leaf(leaf)
+
+    def remove(self, shape):
+        """ Remove the given shape from the tree. """
+        leaf = self.__leaves.pop(shape)
+        self.__remove_leaf(leaf)
+
+    def move(self, shape, replacement=None):
+        """ Update the leaf holding the given shape.  If a replacement is
+        given, it takes the place of the original shape in the tree.  The leaf
+        is only reinserted if the new box escapes its fattened box. """
+
+        if replacement is None:
+            replacement = shape
+
+        leaf = self.__leaves.pop(shape)
+        leaf.shape = replacement
+        self.__leaves[replacement] = leaf
+
+        box = replacement.box
+        fat_box = leaf.box
+
+        if fat_box.left <= box.left and fat_box.right >= box.right and \
+                fat_box.top <= box.top and fat_box.bottom >= box.bottom:
+            return
+
+        self.__remove_leaf(leaf)
+        leaf.box = box.grow(self.__margin)
+        self.__insert_leaf(leaf)
+
+    def filter(self, shape):
+        """ Return the category and mask that the given shape was inserted
+        with. """
+        leaf = self.__leaves[shape]
+        return leaf.category, leaf.mask
+
+    def query(self, shape):
+        """ Return every shape in the tree with a box that overlaps the box of
+        the given shape.  The shape itself is never included. """
+        box = shape.box
+        boxes_touching = Collisions.boxes_touching
+
+        found = set()
+        stack = [self.__root] if self.__root else []
+
+        while stack:
+            node = stack.pop()
+
+            if not boxes_touching(node.box, box):
+                continue
+
+            if node.left is None:
+                other = node.shape
+                if other is not shape and boxes_touching(other.box, box):
+                    found.add(other)
+            else:
+                stack.append(node.left)
+                stack.append(node.right)
+
+        return found
+
+    def pairs(self):
+        """ Yield every pair of shapes with overlapping boxes.  Each branch
+        compares its two subtrees against each other, descending only where
+        their boxes overlap, so the whole search takes about O(n log n). """
+
+        if self.__root is None:
+            return
+
+        boxes_touching = Collisions.boxes_touching
+        branches = [self.__root] if self.__root.left else []
+
+        while branches:
+            branch = branches.pop()
+            stack = [(branch.left, branch.right)]
+
+            for child in (branch.left, branch.right):
+                if child.left is not None:
+                    branches.append(child)
+
+            while stack:
+                A, B = stack.pop()
+
+                # Each branch holds the union of the categories and masks
+                # beneath it, so whole subtrees can be filtered out at once.
+                if not (A.category & B.mask and B.category & A.mask):
+                    continue
+
+                if not boxes_touching(A.box, B.box):
+                    continue
+
+                if A.left is None and B.left is None:
+                    if boxes_touching(A.shape.box, B.shape.box):
+                        yield A.shape, B.shape
+
+                elif A.left is None or \
+                        (B.left is not None and B.height > A.height):
+                    stack.append((A, B.left))
+                    stack.append((A, B.right))
+
+                else:
+                    stack.append((A.left, B))
+                    stack.append((A.right, B))
+
+    def raycast(self, origin, direction, max_distance):
+        """ Return the first shape hit by the given ray and a RayHit describing
+        where it was hit, or None if the ray doesn't hit anything within the
+        given distance.  Branches are skipped if the ray misses their box, or
+        only reaches it after a closer hit has already been found. """
+        raycast = Collisions.raycast
+        raycast_box = Collisions.raycast_box
+
+        best = None
+        limit = max_distance
+        stack = [self.__root] if self.__root else []
+
+        while stack:
+            node = stack.pop()
+
+            if not raycast_box(origin, direction, limit, node.box):
+                continue
+
+            if node.left is None:
+                hit = raycast(origin, direction, limit, node.shape)
+                if hit and (best is None or hit.distance < limit):
+                    best = node.shape, hit
+                    limit = hit.distance
+            else:
+                stack.append(node.left)
+                stack.append(node.right)
+
+        return best
+
+    def k_nearest(self, point, k, max_distance=float('inf')):
+        """ Return a (shape, distance) pair for each of the k shapes closest
+        to the given point, nearest first.  Branches are opened in order of
+        the distance to their boxes, and the search stops as soon as no branch
+        that hasn't been opened could hold anything closer. """
+        if self.__root is None:
+            return []
+
+        x, y = point
+        box_distance = BroadPhase.box_distance
+
+        def expand(node):
+            if node.left is None:
+                box = node.shape.box
+                distance = box_distance(x, y,
+                        box.left, box.top, box.right, box.bottom)
+                return (), [(distance, node.shape)]
+
+            children = []
+            for child in (node.left, node.right):
+                box = child.box
+                distance = box_distance(x, y,
+                        box.left, box.top, box.right, box.bottom)
+                children.append((distance, child))
+
+            return children, ()
+
+        return BroadPhase.branch_and_bound(
+                point, k, max_distance, self.__root, expand)
+
+    # Tree Methods {{{1
+    def __insert_leaf(self, leaf):
+        if self.__root is None:
+            self.__root = leaf
+            return
+
+        # Find the best sibling for the new leaf.  The cost of each choice is
+        # the amount that it would grow the perimeters of the branches above.
+        box = leaf.box
+        node = self.__root
+
+        while node.left is not None:
+            perimeter = AABBTree.perimeter(node.box)
+            combined = AABBTree.perimeter(AABBTree.union(node.box, box))
+
+            cost = 2 * combined
+            inheritance = 2 * (combined - perimeter)
+
+            def descent_cost(child):
+                cost = AABBTree.perimeter(AABBTree.union(child.box, box))
+                if child.left is not None:
+                    cost -= AABBTree.perimeter(child.box)
+                return cost + inheritance
+
+            left_cost = descent_cost(node.left)
+            right_cost = descent_cost(node.right)
+
+            if cost < left_cost and cost < right_cost:
+                break
+
+            node = node.left if left_cost < right_cost else node.right
+
+        # Create a new branch to hold the leaf and its sibling.
+        sibling = node
+        parent = sibling.parent
+
+        branch = TreeNode(AABBTree.union(sibling.box, box))
+        branch.parent = parent
+        branch.height = sibling.height + 1
+        branch.left = sibling; sibling.parent = branch
+        branch.right = leaf; leaf.parent = branch
+
+        if parent is None:
+            self.__root = branch
+        elif parent.left is sibling:
+            parent.left = branch
+        else:
+            parent.right = branch
+
+        self.__refit(leaf.parent)
+
+    def __remove_leaf(self, leaf):
+        if leaf is self.__root:
+            self.__root = None
+            return
+
+        parent = leaf.parent
+        grandparent = parent.parent
+        sibling = parent.right if parent.left is leaf else parent.left
+
+        if grandparent is None:
+            self.__root = sibling
+            sibling.parent = None
+        else:
+            if grandparent.left is parent:
+                grandparent.left = sibling
+            else:
+                grandparent.right = sibling
+
+            sibling.parent = grandparent
+            self.__refit(grandparent)
+
+        leaf.parent = None
+
+    def __refit(self, node):
+        """ Walk from the given node to the root, rebalancing each branch and
+        updating its box and height along the way. """
+
+        while node is not None:
+            node = self.__balance(node)
+
+            left, right = node.left, node.right
+            node.height = 1 + max(left.height, right.height)
+            node.box = AABBTree.union(left.box, right.box)
+            node.category = left.category | right.category
+            node.mask = left.mask | right.mask
+
+            node = node.parent
+
+    def __balance(self, A):
+        """ If one child of the given branch is more than one level taller than
+        the other, rotate the taller child up into the branch's place.  Return
+        the node that ends up in the branch's place. """
+
+        if A.left is None or A.height < 2:
+            return A
+
+        B, C = A.left, A.right
+        balance = C.height - B.height
+
+        if balance > 1:
+            self.__rotate(A, C, B)
+            return C
+
+        if balance < -1:
+            self.__rotate(A, B, C)
+            return B
+
+        return A
+
+    def __rotate(self, A, up, other):
+        """ Promote the child 'up' of branch A, which becomes the child of the
+        promoted node.  The taller grandchild stays with the promoted node,
+        while the shorter one moves down to A. """
+
+        F, G = up.left, up.right
+
+        up.left = A
+        up.parent = A.parent
+        A.parent = up
+
+        if up.parent is None:
+            self.__root = up
+        elif up.parent.left is A:
+            up.parent.left = up
+        else:
+            up.parent.right = up
+
+        if F.height > G.height:
+            keep, give = F, G
+        else:
+            keep, give = G, F
+
+        up.right = keep
+
+        if A.left is up:
+            A.left = give
+        else:
+            A.right = give
+
+        give.parent = A
+
+        A.box = AABBTree.union(other.box, give.box)
+        A.height = 1 + max(other.height, give.height)
+        A.category = other.category | give.category
+        A.mask = other.mask | give.mask
+
+        up.box = AABBTree.union(A.box, keep.box)
+        up.height = 1 + max(A.height, keep.height)
+        up.category = A.category | keep.category
+        up.mask = A.mask | keep.mask
+
+    # Helper Methods {{{1
+    @staticmethod
+    def union(first, second):
+        """ Return the smallest box that contains both of the given boxes. """
+        return shapes.Rectangle(
+                min(first.left, second.left), min(first.top, second.top),
+                max(first.right, second.right),
+                max(first.bottom, second.bottom))
+
+    @staticmethod
+    def perimeter(box):
+        return 2 * (box.right - box.left + box.bottom - box.top)
+    # }}}1
+
+class TreeNode(object):
+    """ Represents a single node in an AABBTree.  Leaves hold a shape, while
+    branches always have both a left and a right child. """
+
+    __slots__ = ('box', 'shape', 'parent', 'left', 'right', 'height',
+            'category', 'mask')
+
+    def __init__(self, box, shape=None):
+        self.box = box
+        self.shape = shape
+        self.parent = None
+        self.left = None
+        self.right = None
+        self.height = 0
+        self.category = 0
+        self.mask = 0
+
+class Quadtree(BroadPhase):
+    """ Divides space into a tree of square regions, each of which is split
+    into four quadrants once it holds more than a few shapes.  Each shape is
+    kept in the smallest region that completely contains its box, so shapes
+    that straddle the border between two quadrants stay in the region above
+    them.  The tree only subdivides where the shapes actually are, which
+    makes it a good fit for large, mostly static levels that are dense in
+    some places and empty in others.
+
+    Regions are split once they hold more than 'capacity' shapes, unless
+    they are already 'max_depth' levels below the root.  The root grows
+    outwards when a shape is inserted outside of it, so the bounds of the
+    level don't need to be known in advance, but the regions that were
+    already there end up one level deeper every time it does.  Giving the
+    bounds up front avoids this.  Use load() to insert many shapes at once. """
+
+    # Operators {{{1
+    def __init__(self, capacity=8, max_depth=16, bounds=None):
+        self.__capacity = capacity
+        self.__max_depth = max_depth
+        self.__root = None
+        self.__records = {}     # shape -> (node, item)
+
+        if bounds is not None:
+            size = max(bounds.width, bounds.height, 1)
+            self.__root = QuadNode(bounds.left, bounds.top,
+                    bounds.left + size, bounds.top + size)
+
+    def __len__(self):
+        return len(self.__records)
+
+    def __iter__(self):
+        return iter(self.__records)
+
+    def __contains__(self, shape):
+        return shape in self.__records
+
+    # Attributes {{{1
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    @property
+    def max_depth(self):
+        return self.__max_depth
+
+    @property
+    def depth(self):
+        """ The number of levels in the tree, not counting the root. """
+        if self.__root is None:
+            return 0
+
+        deepest = 0
+        stack = [(self.__root, 0)]
+
+        while stack:
+            node, depth = stack.pop()
+            deepest = max(deepest, depth)
+
+            if node.children:
+                stack.extend((child, depth + 1) for child in node.children)
+
+        return deepest
+
+    def get_capacity(self): return self.capacity
+    def get_max_depth(self): return self.max_depth
+    def get_depth(self): return self.depth
+
+    # Index Methods {{{1
+    def insert(self, shape, category=default_category, mask=default_mask):
+        """ Add the given shape to the smallest region that contains it. """
+        item = Quadtree.make_item(shape, category, mask)
+        self.__grow(item)
+        self.__insert_item(item)
+
+    def load(self, shapes, category=default_category, mask=default_mask):
+        """ Insert many shapes at once.  If the tree is empty, it's built from
+        the top down in a single pass, which is much faster than inserting the
+        shapes one at a time. """
+        items = [Quadtree.make_item(shape, category, mask)
+                for shape in shapes]
+
+        if not items:
+            return
+
+        if self.__records:
+            for item in items:
+                self.__grow(item)
+                self.__insert_item(item)
+            return
+
+        if self.__root is None:
+            left = min(item[1] for item in items)
+            top = min(item[2] for item in items)
+            size = max(max(item[3] for item in items) - left,
+                       max(item[4] for item in items) - top, 1)
+
+            self.__root = QuadNode(left, top, left + size, top + size)
+        else:
+            for item in items:
+                self.__grow(item)
+
+        self.__build(self.__root, items, 0)
+
+    def remove(self, shape):
+        """ Remove the given shape from the tree. """
+        node, item = self.__records.pop(shape)
+        Quadtree.discard(node, item)
+
+    def move(self, shape, replacement=None):
+        """ Update the region holding the given shape.  If a replacement is
+        given, it takes the place of the original shape in the tree. """
+
+        if replacement is None:
+            replacement = shape
+
+        node, item = self.__records.pop(shape)
+        Quadtree.discard(node, item)
+
+        self.insert(replacement, item[5], item[6])
+
+    def filter(self, shape):
+        """ Return the category and mask that the given shape was inserted
+        with. """
+        node, item = self.__records[shape]
+        return item[5], item[6]
+
+    def query(self, shape):
+        """ Return every shape in the tree with a box that overlaps the box of
+        the given shape.  The shape itself is never included. """
+        box = shape.box
+        left, top, right, bottom = box.left, box.top, box.right, box.bottom
+
+        found = set()
+        stack = [self.__root] if self.__root else []
+
+        while stack:
+            node = stack.pop()
+
+            if node.left > right or node.right < left or \
+                    node.top > bottom or node.bottom < top:
+                continue
+
+            for item in node.items:
+                if item[1] <= right and item[3] >= left and \
+                        item[2] <= bottom and item[4] >= top:
+                    found.add(item[0])
+
+            if node.children:
+                stack.extend(node.children)
+
+        found.discard(shape)
+        return found
+
+    def pairs(self):
+        """ Yield every pair of shapes with overlapping boxes.  The shapes in
+        each region are compared with each other and with the shapes held by
+        the regions above it, as long as those overlap the region at all. """
+
+        stack = [(self.__root, [])] if self.__root else []
+
+        while stack:
+            node, inherited = stack.pop()
+            items = node.items
+
+            for index, A in enumerate(items):
+                for others in (items[index + 1:], inherited):
+                    for B in others:
+                        if A[5] & B[6] and B[5] & A[6] and \
+                                A[1] <= B[3] and A[3] >= B[1] and \
+                                A[2] <= B[4] and A[4] >= B[2]:
+                            yield A[0], B[0]
+
+            if not node.children:
+                continue
+
+            inherited = inherited + items
+
+            for child in node.children:
+                if not child.items and not child.children:
+                    continue
+
+                left, top = child.left, child.top
+                right, bottom = child.right, child.bottom
+
+                relevant = [item for item in inherited
+                        if item[1] <= right and item[3] >= left and
+                            item[2] <= bottom and item[4] >= top]
+
+                stack.append((child, relevant))
+
+    def k_nearest(self, point, k, max_distance=float('inf')):
+        """ Return a (shape, distance) pair for each of the k shapes closest
+        to the given point, nearest first.  Regions and boxes are opened in
+        order of their distance from the point, and the search stops as soon
+        as no region or box that hasn't been opened could hold anything
+        closer. """
+        if self.__root is None:
+            return []
+
+        x, y = point
+        box_distance = BroadPhase.box_distance
+
+        def expand(node):
+            contents = [(box_distance(x, y, *item[1:5]), item[0])
+                    for item in node.items]
+            children = [(box_distance(x, y, child.left, child.top,
+                            child.right, child.bottom), child)
+                    for child in node.children or ()]
+            return children, contents
+
+        return BroadPhase.branch_and_bound(
+                point, k, max_distance, self.__root, expand)
+
+    # Tree Methods {{{1
+    def __insert_item(self, item):
+        capacity = self.__capacity
+        node = self.__root
+        depth = 0
+
+        while True:
+            if node.children:
+                child = Quadtree.find_quadrant(node, item)
+                if child is not None:
+                    node = child; depth += 1
+                    continue
+
+            node.items.append(item)
+            self.__records[item[0]] = node, item
+
+            if node.children is None and len(node.items) > capacity \
+                    and depth < self.__max_depth:
+                self.__split(node)
+
+            return
+
+    def __split(self, node):
+        """ Give the given region four quadrants, and move any shapes that
+        fit inside one of them down into it. """
+        node.children = Quadtree.make_quadrants(node)
+
+        items = node.items
+        node.items = []
+
+        for item in items:
+            child = Quadtree.find_quadrant(node, item)
+            target = node if child is None else child
+
+            target.items.append(item)
+            self.__records[item[0]] = target, item
+
+    def __build(self, node, items, depth):
+        """ Build the tree beneath the given region from scratch. """
+        records = self.__records
+
+        if len(items) <= self.__capacity or depth >= self.__max_depth:
+            node.items = items
+            for item in items:
+                records[item[0]] = node, item
+            return
+
+        node.children = Quadtree.make_quadrants(node)
+        quadrants = dict((child, []) for child in node.children)
+        straddling = node.items
+
+        for item in items:
+            child = Quadtree.find_quadrant(node, item)
+
+            if child is None:
+                straddling.append(item)
+                records[item[0]] = node, item
+            else:
+                quadrants[child].append(item)
+
+        for child in node.children:
+            if quadrants[child]:
+                self.__build(child, quadrants[child], depth + 1)
+
+    def __grow(self, item):
+        """ Make the root bigger until it contains the given item.  Each time
+        the root grows, the old root becomes one of its quadrants. """
+        left, top, right, bottom = item[1:5]
+
+        if self.__root is None:
+            size = max(right - left, bottom - top, 1)
+            self.__root = QuadNode(left, top, left + size, top + size)
+            return
+
+        root = self.__root
+
+        while left < root.left or top < root.top or \
+                right > root.right or bottom > root.bottom:
+            size = root.right - root.left
+
+            new_left = root.left - size if left < root.left else root.left
+            new_top = root.top - size if top < root.top else root.top
+
+            parent = QuadNode(new_left, new_top,
+                    new_left + 2 * size, new_top + 2 * size)
+
+            # Split the new root along the edges of the old one, so the old
+            # root fits exactly into one of the new quadrants.
+            column = 1 if new_left < root.left else 0
+            row = 1 if new_top < root.top else 0
+
+            x = root.left if column else root.right
+            y = root.top if row else root.bottom
+
+            parent.children = Quadtree.make_quadrants(parent, x, y)
+            parent.children[2 * row + column] = root
+
+            root = parent
+
+        self.__root = root
+
+    # Helper Methods {{{1
+    @staticmethod
+    def make_item(shape, category, mask):
+        box = shape.box
+        return (shape, box.left, box.top, box.right, box.bottom,
+                category, mask)
+
+    @staticmethod
+    def make_quadrants(node, x=None, y=None):
+        """ Return the top left, top right, bottom left, and bottom right
+        quadrants of the given region.  The quadrants meet at the center of
+        the region, unless another point is given. """
+        left, top, right, bottom = node.left, node.top, node.right, node.bottom
+
+        if x is None: x = (left + right) / 2
+        if y is None: y = (top + bottom) / 2
+
+        return [QuadNode(left, top, x, y), QuadNode(x, top, right, y),
+                QuadNode(left, y, x, bottom), QuadNode(x, y, right, bottom)]
+
+    @staticmethod
+    def find_quadrant(node, item):
+        """ Return the quadrant of the given region that completely contains
+        the given item, or None if the item straddles two of them. """
+        quadrants = node.children
+        x = quadrants[0].right
+        y = quadrants[0].bottom
+
+        if item[3] <= x: column = 0
+        elif item[1] >= x: column = 1
+        else: return None
+
+        if item[4] <= y: row = 0
+        elif item[2] >= y: row = 1
+        else: return None
+
+        return quadrants[2 * row + column]
+
+    @staticmethod
+    def discard(node, item):
+        """ Remove the given item from the given region.  Items are compared
+        by identity, because shapes that are equal aren't interchangeable. """
+        items = node.items
+        for index, other in enumerate(items):
+            if other is item:
+                del items[index]
+                return
+    # }}}1
+
+class QuadNode(object):
+    """ Represents a single region in a Quadtree.  Every region holds the
+    shapes that fit inside it but not inside any one of its quadrants, and it
+    either has four quadrants or none at all. """
+
+    __slots__ = ('left', 'top', 'right', 'bottom', 'children', 'items')
+
+    def __init__(self, left, top, right, bottom):
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+        self.children = None
+        self.items = []
+
+if __name__ == "__main__":
+    import random
+    from shapes import *
+    from fixtures import random_shapes, brute_force_pairs, brute_force_touching
+
+    # Helper Functions {{{1
+    def check_index(index, shapes):
+        reported = [frozenset(pair) for pair in index.pairs()]
+
+        assert len(reported) == len(set(reported))
+        assert set(reported) == brute_force_pairs(shapes)
+
+        touching = set(frozenset(pair) for pair in index.touching())
+        assert touching == set(
+                frozenset(pair) for pair in brute_force_touching(shapes))
+
+        for shape in shapes[:20]:
+            expected = set(other for other in shapes
+                    if other is not shape and
+                    Collisions.boxes_touching(shape.box, other.box))
+            assert set(index.query(shape)) == expected
+
+        region = Circle(Vector(250, 250), 60)
+        expected = set(shape for shape in shapes
+                if Collisions.touching(region, shape))
+        assert index.query_region(region) == expected
+
+        for shape in shapes[:20]:
+            point = shape.center
+            expected = set(other for other in shapes
+                    if Collisions.point_inside(point, other))
+            assert shape in expected
+            assert index.query_point(point) == expected
+
+    def exercise_index(index):
+        shapes = random_shapes(300)
+
+        for shape in shapes:
+            index.insert(shape)
+
+        assert len(index) == len(shapes)
+        check_index(index, shapes)
+
+        # Move some shapes in place and replace some others.
+        for frame in range(3):
+            for i, shape in enumerate(shapes[:100]):
+                displacement = Vector(i % 7 - 3, i % 5 - 2) * 10
+
+                if isinstance(shape, Polygon):
+                    index.move(shape)
+                else:
+                    replacement = shape.move(displacement)
+                    index.move(shape, replacement)
+                    shapes[i] = replacement
+
+            check_index(index, shapes)
+
+        # Swap some circles and rectangles for mutable copies, and then move
+        # those in place.
+        mutables = []
+
+        for i, shape in enumerate(shapes[100:200], 100):
+            if isinstance(shape, Circle):
+                mutable = MutableCircle(shape.center, shape.radius)
+            elif isinstance(shape, Rectangle):
+                mutable = MutableRectangle(
+                        shape.left, shape.top, shape.right, shape.bottom)
+            else:
+                continue
+
+            index.move(shape, mutable)
+            mutables.append(mutable)
+            shapes[i] = mutable
+
+        for frame in range(3):
+            for i, mutable in enumerate(mutables):
+                mutable.move_ip(Vector(i % 5 - 2, i % 3 - 1) * 15)
+                index.move(mutable)
+
+            check_index(index, shapes)
+
+        # Remove a few shapes.
+        for shape in shapes[-50:]:
+            index.remove(shape)
+
+        del shapes[-50:]
+
+        assert len(index) == len(shapes)
+        assert shapes[-1] in index
+
+        check_index(index, shapes)
+
+    def exercise_filters(index):
+        shapes = random_shapes(300)
+        filters = {}
+
+        # Bullets only hit enemies and walls, enemies hit everything, and
+        # walls only hit bullets and enemies.
+        bullet, enemy, wall = 1, 2, 4
+        masks = { bullet: enemy | wall, enemy: ~0, wall: bullet | enemy }
+
+        for i, shape in enumerate(shapes):
+            category = (bullet, enemy, wall)[i % 5 % 3]
+            filters[shape] = category, masks[category]
+            index.insert(shape, category, masks[category])
+
+        def expected_pairs():
+            pairs = set()
+            for first, second in brute_force_pairs(shapes):
+                first_category, first_mask = filters[first]
+                second_category, second_mask = filters[second]
+
+                if first_category & second_mask and \
+                        second_category & first_mask:
+                    pairs.add(frozenset((first, second)))
+            return pairs
+
+        reported = [frozenset(pair) for pair in index.pairs()]
+
+        assert len(reported) == len(set(reported))
+        assert set(reported) == expected_pairs()
+        assert index.filter(shapes[0]) == (bullet, masks[bullet])
+
+        # Moving and replacing shapes keeps their filters.
+        for i, shape in enumerate(shapes[:100]):
+            if isinstance(shape, Polygon):
+                continue
+
+            replacement = shape.move(Vector(i % 7 - 3, i % 5 - 2) * 10)
+            index.move(shape, replacement)
+
+            filters[replacement] = filters.pop(shape)
+            shapes[i] = replacement
+
+        reported = [frozenset(pair) for pair in index.pairs()]
+
+        assert len(reported) == len(set(reported))
+        assert set(reported) == expected_pairs()
+
+    def exercise_raycasts(index):
+        generator = random.Random(1)
+        uniform = generator.uniform
+
+        shapes = random_shapes(200)
+        shapes += [Line(Vector(uniform(0, 500), uniform(0, 500)),
+                        Vector(uniform(0, 500), uniform(0, 500)))
+                   for i in range(20)]
+
+        for shape in shapes:
+            index.insert(shape)
+
+        for i in range(50):
+            origin = Vector(uniform(0, 500), uniform(0, 500))
+            direction = Vector.random()
+            distance = uniform(0, 300)
+
+            expected = []
+            for shape in shapes:
+                hit = Collisions.raycast(origin, direction, distance, shape)
+                if hit: expected.append((hit.distance, shape))
+
+            expected.sort()
+            hits = index.raycast_all(origin, direction, distance)
+
+            assert [(hit.distance, shape) for shape, hit in hits] == expected
+
+            first = index.raycast(origin, direction, distance)
+            if expected:
+                assert first[1].distance == expected[0][0]
+            else:
+                assert first is None
+
+    def exercise_nearest(index):
+        generator = random.Random(4)
+        uniform = generator.uniform
+
+        shapes = random_shapes(200)
+        shapes += [Line(Vector(uniform(0, 500), uniform(0, 500)),
+                        Vector(uniform(0, 500), uniform(0, 500)))
+                   for i in range(20)]
+
+        for shape in shapes:
+            index.insert(shape)
+
+        for trial in range(30):
+            point = Vector(uniform(-200, 700), uniform(-200, 700))
+            distances = sorted(Collisions.distance(point, shape)
+                    for shape in shapes)
+
+            for k in (1, 5, 20):
+                found = index.k_nearest(point, k)
+
+                assert [distance for shape, distance in found] \
+                        == distances[:k]
+                for shape, distance in found:
+                    assert Collisions.distance(point, shape) == distance
+
+            # Shapes beyond the maximum distance are left out.
+            limit = distances[3]
+            found = index.k_nearest(point, 10, limit)
+            assert [distance for shape, distance in found] \
+                    == [distance for distance in distances[:10]
+                        if distance <= limit]
+
+            assert index.nearest(point)[1] == distances[0]
+            if distances[0]:
+                assert index.nearest(point, distances[0] / 2) is None
+
+            assert index.k_nearest(point, 0) == []
+            assert index.k_nearest(point, -1) == []
+
+        # Asking for nothing works even when nothing is nearby.
+        assert index.k_nearest(Vector(-5000, -5000), 0) == []
+
+    # Spatial Hash Tests {{{1
+    def spatial_hash_tests():
+        exercise_index(SpatialHash(25))
+        exercise_raycasts(SpatialHash(25))
+        exercise_filters(SpatialHash(25))
+        exercise_nearest(SpatialHash(25))
+
+    # Sweep and Prune Tests {{{1
+    def sweep_and_prune_tests():
+        exercise_index(SweepAndPrune())
+        exercise_raycasts(SweepAndPrune())
+        exercise_filters(SweepAndPrune())
+        exercise_nearest(SweepAndPrune())
+
+        endpoints = [[3, False, None], [2, True, None], [1, False, None],
+                     [2, False, None], [0, True, None], [5, True, None]]
+
+        SweepAndPrune.insertion_sort(endpoints)
+
+        assert [x[0] for x in endpoints] == [0, 1, 2, 2, 3, 5]
+        assert [x[1] for x in endpoints[2:4]] == [False, True]
+
+    # AABB Tree Tests {{{1
+    def aabb_tree_tests():
+        exercise_index(AABBTree(margin=5))
+        exercise_raycasts(AABBTree(margin=5))
+        exercise_filters(AABBTree(margin=5))
+        exercise_nearest(AABBTree(margin=5))
+
+        # Inserting shapes in sorted order is the worst case for an
+        # unbalanced tree.
+        tree = AABBTree(margin=0)
+        for x in range(1024):
+            tree.insert(Rectangle(x, 0, x + 1, 1))
+
+        assert tree.height <= 20
+
+    # Quadtree Tests {{{1
+    def quadtree_tests():
+        exercise_index(Quadtree(capacity=4))
+        exercise_raycasts(Quadtree(capacity=4))
+        exercise_filters(Quadtree(capacity=4))
+        exercise_nearest(Quadtree(capacity=4))
+
+        generator = random.Random(2)
+        uniform = generator.uniform
+
+        # Walls are clustered in a few dense blocks, with open space between.
+        walls = []
+        for block in range(5):
+            x, y = uniform(-5000, 5000), uniform(-5000, 5000)
+            for i in range(60):
+                tail = Vector(x + uniform(0, 100), y + uniform(0, 100))
+                walls.append(Line(tail, tail + Vector.random() * 10))
+
+        loaded = Quadtree(capacity=8, max_depth=10)
+        loaded.load(walls)
+
+        inserted = Quadtree(capacity=8, max_depth=10,
+                bounds=Rectangle(-5000, -5000, 5500, 5500))
+        for wall in walls:
+            inserted.insert(wall)
+
+        assert len(loaded) == len(inserted) == len(walls)
+        assert 0 < loaded.depth <= 10 and 0 < inserted.depth <= 10
+
+        for tree in (loaded, inserted):
+            reported = [frozenset(pair) for pair in tree.pairs()]
+
+            assert len(reported) == len(set(reported))
+            assert set(reported) == brute_force_pairs(walls)
+
+            for wall in walls[::10]:
+                region = Circle(wall.center, 20)
+                expected = set(other for other in walls
+                        if Collisions.touching(region, other))
+                assert tree.query_region(region) == expected
+
+            for trial in range(20):
+                point = Vector(uniform(-5000, 5000), uniform(-5000, 5000))
+                distances = sorted(Collisions.distance(point, wall)
+                        for wall in walls)
+
+                found = tree.k_nearest(point, 3)
+                assert [distance for wall, distance in found] \
+                        == distances[:3]
+
+        # Identical shapes can't be separated, so the depth limit has to stop
+        # the tree from splitting forever.
+        tree = Quadtree(capacity=2, max_depth=6)
+        for index in range(50):
+            tree.insert(Rectangle(0, 0, 1, 1))
+
+        assert tree.depth <= 6
+        assert len(list(tree.pairs())) == 50 * 49 // 2
+
+        assert Quadtree().nearest(Vector(0, 0)) is None
+        assert Quadtree().k_nearest(Vector(0, 0), 3) == []
+        assert list(Quadtree().pairs()) == []
+    # }}}1
+
+    print "Testing broadphase.py..."
+
+    spatial_hash_tests()
+    sweep_and_prune_tests()
+    aabb_tree_tests()
+    quadtree_tests()
+
+    print "All tests passed."
@@ -1,14 +1,41 @@
 from __future__ import division
 
 import math, shapes
-from vector import Vector
+from vector import Vector, VectorArray
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class Collisions:
 
+    # Raw Coordinates {{{1
+    # These functions take plain numbers rather than vectors or shapes, and
+    # compare squared distances so that no square roots are ever taken.  A
+    # negative padding can never be reached, so it's never nearby.
+
+    @staticmethod
+    def distance_squared(x1, y1, x2, y2):
+        dx = x1 - x2; dy = y1 - y2
+        return dx * dx + dy * dy
+
+    @staticmethod
+    def coordinates_nearby(x1, y1, x2, y2, padding):
+        dx = x1 - x2; dy = y1 - y2
+        return padding >= 0 and dx * dx + dy * dy <= padding * padding
+
+    @staticmethod
+    def coordinates_near_line(x, y, hx, hy, tx, ty, padding):
+        return padding >= 0 and padding * padding >= \
+                Collisions.point_segment_distance_squared(
+                        x, y, hx, hy, tx, ty)
+
     # Points and Lines {{{1
     @staticmethod
     def points_nearby(first, second, padding):
-        return Vector.get_distance(first, second) <= padding
+        return Collisions.coordinates_nearby(
+                first[0], first[1], second[0], second[1], padding)
 
     @staticmethod
     def point_on_line(point, line):
@@ -32,32 +59,46 @@ class Collisions:
 
     @staticmethod
     def point_near_line(point, line, padding):
-        if line.degenerate:
-            return Collisions.points_nearby(point, line.head, padding)
-
-        A, B = line.points
-        C = point; R = padding
+        x, y = point
+        hx, hy = line.head
+        tx, ty = line.tail
 
-        a = (B.x - A.x)**2 + (B.y - A.y)**2
-        b = 2 * (B.x - A.x) * (A.x - C.x)       \
-                + 2 * (B.y - A.y) * (A.y - C.y)
-        c = C.x**2 + C.y**2 + A.x**2 + A.y**2   \
-                - 2 * (C.x * A.x + C.y * A.y) - R**2
+        return Collisions.coordinates_near_line(
+                x, y, hx, hy, tx, ty, padding)
 
-        discriminant = b**2 - 4 * a * c
-
-        if discriminant < 0:
-            return False
-        elif discriminant == 0:
-            u = v = -b / float(2 * a)
-        else:
-            u = (-b + math.sqrt(discriminant)) / float(2 * a)
-            v = (-b - math.sqrt(discriminant)) / float(2 * a)
+    @staticmethod
+    def point_line_distance_squared(point, line):
+        """ Return the squared distance between the point and the closest
+        point on the given line segment. """
+        x, y = point
+        hx, hy = line.head
+        tx, ty = line.tail
 
-        if u < 0 and v < 0: return False
-        if u > 1 and v > 1: return False
+        return Collisions.point_segment_distance_squared(
+                x, y, hx, hy, tx, ty)
 
-        return True
+    @staticmethod
+    def point_segment_distance_squared(x, y, hx, hy, tx, ty):
+        """ Return the squared distance between the point (x, y) and the
+        closest point on the segment between (hx, hy) and (tx, ty).  The point
+        is projected onto the segment and the projection is clamped to the
+        ends, so nothing is divided unless the projection lands in between
+        and no square root is ever taken. """
+        dx = hx - tx; dy = hy - ty
+        px = x - tx; py = y - ty
+
+        dot = px * dx + py * dy
+        if dot <= 0:
+            return px * px + py * py
+
+        length = dx * dx + dy * dy
+        if dot >= length:
+            px = x - hx; py = y - hy
+            return px * px + py * py
+
+        k = dot / length
+        px -= k * dx; py -= k * dy
+        return px * px + py * py
 
     @staticmethod
     def point_past_line(point, line, padding=0):
@@ -67,15 +108,40 @@ class Collisions:
     # Points and Shapes {{{1
     @staticmethod
     def point_near_circle(point, circle, padding):
-        return Collisions.points_nearby(
-                point, circle.center, circle.radius + padding)
+        x, y = point
+        cx, cy = circle.center
+
+        return Collisions.coordinates_nearby(
+                x, y, cx, cy, circle.radius + padding)
+
+    @staticmethod
+    def point_near_box(point, box, padding):
+        x, y = point
+
+        if x < box.left - padding or x > box.right + padding: return False
+        if y < box.top - padding or y > box.bottom + padding: return False
+
+        return True
 
     @staticmethod
     def point_near_shape(point, shape, padding):
-        past_edge = Collisions.point_past_line
 
-        for edge in shape.edges:
-            if not past_edge(point, edge, padding):
+        # Optimized point/box collision
+        if isinstance(shape, shapes.Rectangle):
+            return Collisions.point_near_box(point, shape, padding)
+
+        # Move the point into the local space of a transformed shape, rather
+        # than moving the whole shape into world space.
+        if isinstance(shape, shapes.TransformedShape):
+            transform = shape.transform
+            return Collisions.point_near_shape(
+                    transform.apply_inverse(point), shape.local,
+                    padding / transform.scale)
+
+        px, py = point
+
+        for (nx, ny), (hx, hy) in zip(shape.normals, shape.vertices):
+            if nx * (px - hx) + ny * (py - hy) > padding:
                 return False
         return True
 
@@ -83,9 +149,23 @@ class Collisions:
     def point_inside_circle(point, circle):
         return Collisions.point_near_circle(point, circle, 0)
 
+    @staticmethod
+    def point_inside_box(point, box):
+        return Collisions.point_near_box(point, box, 0)
+
     @staticmethod 
     def point_inside_shape(point, shape):
         return Collisions.point_near_shape(point, shape, 0)
+
+    @staticmethod
+    def point_inside(point, shape):
+        """ Check if the point is inside any circle or shape (or on any line),
+        using whichever of the functions above applies. """
+        if isinstance(shape, shapes.Line):
+            return Collisions.point_on_line(point, shape)
+        if isinstance(shape, shapes.Circle):
+            return Collisions.point_inside_circle(point, shape)
+        return Collisions.point_inside_shape(point, shape)
     # }}}1
 
     # Lines Touching {{{1
@@ -163,8 +243,12 @@ class Collisions:
 
     @staticmethod
     def circle_near_line(circle, line, padding):
-        return Collisions.point_near_line(
-                circle.center, line, circle.radius + padding)
+        x, y = circle.center
+        hx, hy = line.head
+        tx, ty = line.tail
+
+        return Collisions.coordinates_near_line(
+                x, y, hx, hy, tx, ty, circle.radius + padding)
 
     @staticmethod
     def circle_touching_line(circle, line):
@@ -175,8 +259,54 @@ class Collisions:
         return Collisions.point_past_line(
                 circle.center, line, circle.radius + padding)
 
+    @staticmethod
+    def box_touching_line(box, line):
+        """ Check if the line touches the box, by clipping the line against
+        the box one axis at a time.  Unlike shape_touching_line(), a line that
+        is entirely inside the box counts as touching it. """
+        (hx, hy), (tx, ty) = line.points
+        enter, exit = 0, 1
+
+        for start, delta, low, high in (
+                (tx, hx - tx, box.left, box.right),
+                (ty, hy - ty, box.top, box.bottom)):
+
+            if delta == 0:
+                if start < low or start > high:
+                    return False
+                continue
+
+            near = (low - start) / delta
+            far = (high - start) / delta
+
+            if near > far:
+                near, far = far, near
+
+            if near > enter: enter = near
+            if far < exit: exit = far
+
+            if enter > exit:
+                return False
+
+        return True
+
     @staticmethod
     def shape_touching_line(shape, line):
+
+        # Optimized box/line collision.  Only the edges of the box count, so
+        # the line can't be strictly inside it at both ends.
+        if isinstance(shape, shapes.Rectangle):
+            if not Collisions.box_touching_line(shape, line):
+                return False
+
+            left, right = shape.left, shape.right
+            top, bottom = shape.top, shape.bottom
+
+            for x, y in line.points:
+                if not (left < x < right and top < y < bottom):
+                    return True
+            return False
+
         lines_touching = Collisions.lines_touching
         for edge in shape.edges:
             if lines_touching(edge, line):
@@ -193,26 +323,49 @@ class Collisions:
     # }}}1
 
     # Shapes Touching {{{1
+    @staticmethod
+    def boxes_touching(first, second):
+        if first.top > second.bottom: return False
+        if first.bottom < second.top: return False
+
+        if first.left > second.right: return False
+        if first.right < second.left: return False
+
+        return True
+
     @staticmethod
     def circles_nearby(first, second, padding):
-        distance = first.radius + second.radius + padding
-        return Collisions.points_nearby(
-                first.center, second.center, distance)
+        x1, y1 = first.center
+        x2, y2 = second.center
+
+        return Collisions.coordinates_nearby(x1, y1, x2, y2,
+                first.radius + second.radius + padding)
 
     @staticmethod
     def circles_touching(first, second):
-        return Collisions.circles_nearby(first, second, 0)
+        x1, y1 = first.center
+        x2, y2 = second.center
+
+        return Collisions.coordinates_nearby(x1, y1, x2, y2,
+                first.radius + second.radius)
 
     @staticmethod
     def circle_touching_shape(circle, shape):
-        point_inside_shape = Collisions.point_inside_shape
-        circle_touching_edge = Collisions.circle_touching_line
-
-        if point_inside_shape(circle.center, shape):
+        if Collisions.point_inside_shape(circle.center, shape):
             return True
-        for edge in shape.edges:
-            if circle_touching_edge(circle, edge):
+
+        # Check the edges straight from the vertices, without building them.
+        segment_distance = Collisions.point_segment_distance_squared
+        x, y = circle.center
+        limit = circle.radius * circle.radius
+
+        vertices = shape.vertices
+        tx, ty = vertices[-1]
+
+        for hx, hy in vertices:
+            if segment_distance(x, y, hx, hy, tx, ty) <= limit:
                 return True
+            tx, ty = hx, hy
 
         return False
 
@@ -220,37 +373,968 @@ class Collisions:
     def shape_touching_circle(shape, circle):
         return Collisions.circle_touching_shape(circle, shape)
 
+    @staticmethod
+    def circle_touching_polygon(circle, shape):
+
+        # This is a separating axis test.  The only axes that can separate a
+        # circle from a convex shape are the normals of the shape's edges and
+        # the line between the circle and the nearest vertex.
+        cx, cy = circle.center
+        radius = circle.radius
+
+        for (nx, ny), (hx, hy) in zip(shape.normals, shape.vertices):
+            if nx * (cx - hx) + ny * (cy - hy) > radius:
+                return False
+
+        closest = None
+        for x, y in shape.vertices:
+            distance = (x - cx) * (x - cx) + (y - cy) * (y - cy)
+            if closest is None or distance < closest:
+                closest = distance; ax = x - cx; ay = y - cy
+
+        if closest == 0:
+            return True
+
+        limit = radius * math.sqrt(closest)
+        for x, y in shape.vertices:
+            if ax * (x - cx) + ay * (y - cy) <= limit:
+                return True
+
+        return False
+
+    @staticmethod
+    def polygons_touching(first, second):
+
+        # This is a separating axis test.  Both shapes are convex, so they
+        # aren't touching if every vertex of one shape is in front of any
+        # edge of the other.  The edge normals point outwards, so the edge
+        # itself marks the far side of its own shape along that axis.
+        for shape, vertices in ((first, second.vertices),
+                                (second, first.vertices)):
+            for (nx, ny), (hx, hy) in zip(shape.normals, shape.vertices):
+                offset = nx * hx + ny * hy
+
+                for x, y in vertices:
+                    if nx * x + ny * y <= offset:
+                        break
+                else:
+                    return False
+
+        return True
+
     @staticmethod
     def shapes_touching(first, second):
 
         # Optimized box/box collision
         if isinstance(first, shapes.Rectangle)   \
                 and isinstance(second, shapes.Rectangle):
+            return Collisions.boxes_touching(first, second)
 
-            if first.top > second.bottom: return False
-            if first.bottom < second.top: return False
+        # Generic shape/shape collision
+        return Collisions.polygons_touching(first, second)
 
-            if first.left > second.right: return False
-            if first.right < second.left: return False
+    @staticmethod
+    def touching(first, second):
+        """ Check any two lines, circles, or shapes for contact, using
+        whichever of the functions above applies to that pair.  A line that
+        is entirely inside a shape counts as touching it. """
+        Circle = shapes.Circle
+        Line = shapes.Line
+
+        if isinstance(second, Line) and not isinstance(first, Line):
+            first, second = second, first
+
+        if isinstance(first, Line):
+            if isinstance(second, Line):
+                return Collisions.lines_touching(first, second)
+            if isinstance(second, Circle):
+                return Collisions.circle_touching_line(second, first)
+            if isinstance(second, shapes.Rectangle):
+                return Collisions.box_touching_line(second, first)
+
+            return Collisions.shape_touching_line(second, first) or \
+                    Collisions.point_inside_shape(first.head, second)
+
+        if isinstance(first, Circle):
+            if isinstance(second, Circle):
+                return Collisions.circles_touching(first, second)
+            return Collisions.circle_touching_polygon(first, second)
+
+        if isinstance(second, Circle):
+            return Collisions.circle_touching_polygon(second, first)
+
+        return Collisions.shapes_touching(first, second)
+
+    # Shapes Overlapping {{{1
+    @staticmethod
+    def circles_contact(first, second):
+        (x1, y1), r1 = first.center, first.radius
+        (x2, y2), r2 = second.center, second.radius
 
-            return True
+        dx = x2 - x1; dy = y2 - y1
+        reach = r1 + r2
+        distance = dx * dx + dy * dy
 
-        # Generic shape/shape collision
-        point_inside_shape = Collisions.point_inside_shape
-        shape_touching_edge = Collisions.shape_touching_line
+        if distance > reach * reach:
+            return None
 
-        if point_inside_shape(first.center, second): return True
-        if point_inside_shape(second.center, first): return True
+        distance = math.sqrt(distance)
 
-        for edge in first.edges:
-            if shape_touching_edge(second, edge):
-                return True
+        # Concentric circles can be pushed apart in any direction.
+        if distance == 0:
+            normal = Vector.unit_x()
+        else:
+            normal = Vector(dx / distance, dy / distance)
 
-        return False
+        depth = reach - distance
+        point = first.center + normal * (r1 - depth / 2)
+
+        return Contact(normal, depth, (point,))
+
+    @staticmethod
+    def circle_polygon_contact(circle, shape):
+
+        # Find the edge that the center of the circle is furthest in front
+        # of.  If the circle is outside the shape, the closest point on the
+        # shape must lie on this edge or on one of its ends.
+        center = circle.center
+        radius = circle.radius
+        cx, cy = center
+
+        separation = None
+        for edge in shape.edges:
+            nx, ny = edge.facing
+            hx, hy = edge.head
+
+            distance = nx * (cx - hx) + ny * (cy - hy)
+            if distance > radius:
+                return None
+
+            if separation is None or distance > separation:
+                separation = distance; best = edge
+
+        if separation > 0:
+            head, tail = best.points
+
+            for vertex, other in ((head, tail), (tail, head)):
+                offset = center - vertex
+
+                # The circle is closest to one of the edge's corners.
+                if Vector.dot(offset, other - vertex) <= 0:
+                    distance = offset.magnitude
+
+                    if distance > radius:
+                        return None
+
+                    normal = -offset / distance
+                    point = (vertex + center + normal * radius) / 2
+
+                    return Contact(normal, radius - distance, (point,))
+
+        # The circle is either closest to the middle of the edge, or its
+        # center is inside the shape.  The contact point is halfway between
+        # the edge and the deepest point on the circle.
+        normal = -best.facing
+        point = center + normal * ((radius + separation) / 2)
+
+        return Contact(normal, radius - separation, (point,))
+
+    @staticmethod
+    def boxes_contact(first, second):
+        left = max(first.left, second.left)
+        right = min(first.right, second.right)
+        top = max(first.top, second.top)
+        bottom = min(first.bottom, second.bottom)
+
+        if left > right or top > bottom:
+            return None
+
+        # Find the shortest distance that the second box could be pushed to
+        # clear the first, in each of the four directions.
+        pushes = [
+                (first.right - second.left, Vector(1, 0)),
+                (second.right - first.left, Vector(-1, 0)),
+                (first.bottom - second.top, Vector(0, 1)),
+                (second.bottom - first.top, Vector(0, -1)) ]
+
+        depth, normal = min(pushes, key=lambda push: push[0])
+
+        # The contact points are the corners of the overlap on the side that
+        # the second box would be pushed away from.
+        if normal.x:
+            x = left if normal.x > 0 else right
+            points = Vector(x, top), Vector(x, bottom)
+        else:
+            y = top if normal.y > 0 else bottom
+            points = Vector(left, y), Vector(right, y)
+
+        if points[0] == points[1]:
+            points = points[:1]
+
+        return Contact(normal, depth, points)
+
+    @staticmethod
+    def polygons_contact(first, second):
+
+        # Returns the edge with the largest separation from the given shape
+        # and that separation.  A positive separation means that the edge is
+        # a separating axis.
+        def find_separation(edges, vertices):
+            separation = None
+
+            for edge in edges:
+                nx, ny = edge.facing
+                hx, hy = edge.head
+
+                distance = min(nx * (x - hx) + ny * (y - hy)
+                        for x, y in vertices)
+
+                if separation is None or distance > separation:
+                    separation = distance; best = edge
+
+                if separation > 0:
+                    break
+
+            return best, separation
+
+        # Returns the part of the segment that is behind the given plane.
+        def clip(points, normal, offset):
+            distances = [Vector.dot(normal, point) - offset
+                    for point in points]
+
+            clipped = [point for point, distance in zip(points, distances)
+                    if distance <= 0]
+
+            if len(points) == 2:
+                (A, B), (a, b) = points, distances
+                if a * b < 0:
+                    clipped.append(A + (B - A) * (a / (a - b)))
+
+            return clipped
+
+        first_edge, first_separation = \
+                find_separation(first.edges, second.vertices)
+        if first_separation > 0:
+            return None
+
+        second_edge, second_separation = \
+                find_separation(second.edges, first.vertices)
+        if second_separation > 0:
+            return None
+
+        # The edge with the least penetration becomes the reference edge.
+        # Prefer the first shape, so that ties are resolved consistently.
+        if second_separation > first_separation + 1e-9:
+            reference, incident_shape = second_edge, first
+            flip = True
+        else:
+            reference, incident_shape = first_edge, second
+            flip = False
+
+        normal = reference.facing
+
+        # The incident edge is the edge on the other shape that faces most
+        # directly against the reference edge.
+        incident = min(incident_shape.edges,
+                key=lambda edge: Vector.dot(edge.facing, normal))
+
+        # Clip the incident edge to the sides of the reference edge, then keep
+        # whatever is left that's behind the reference edge.
+        head, tail = reference.points
+        tangent = (head - tail).normal
+
+        points = incident.points
+        points = clip(points, -tangent, -Vector.dot(tangent, tail))
+        points = clip(points, tangent, Vector.dot(tangent, head))
+
+        offset = Vector.dot(normal, head)
+        points = tuple(point for point in points
+                if Vector.dot(normal, point) <= offset)
+
+        if len(points) == 2 and points[0] == points[1]:
+            points = points[:1]
+
+        # Rounding error can clip away every point when the shapes only touch
+        # at a corner.  In that case, use the deepest vertex of the incident
+        # edge.
+        if not points:
+            points = (min(incident.points,
+                    key=lambda point: Vector.dot(normal, point)),)
+
+        depth = -max(first_separation, second_separation)
+        return Contact(-normal if flip else normal, depth, points)
+
+    @staticmethod
+    def contact(first, second):
+        """ Find the contact between any two circles or shapes, using
+        whichever of the functions above applies to that pair.  Return None if
+        the shapes aren't touching. """
+        Circle = shapes.Circle
+        Rectangle = shapes.Rectangle
+
+        if isinstance(first, Circle):
+            if isinstance(second, Circle):
+                return Collisions.circles_contact(first, second)
+            return Collisions.circle_polygon_contact(first, second)
+
+        if isinstance(second, Circle):
+            contact = Collisions.circle_polygon_contact(second, first)
+            return contact.reverse() if contact else None
+
+        if isinstance(first, Rectangle) and isinstance(second, Rectangle):
+            return Collisions.boxes_contact(first, second)
+
+        return Collisions.polygons_contact(first, second)
+
+    # Swept Shapes {{{1
+    @staticmethod
+    def point_impact_circle(point, displacement, circle):
+        """ Return the earliest time in [0, 1] at which the moving point hits
+        the circle, or None if it never does.  This solves for the time at
+        which the point is exactly one radius away from the center. """
+        (px, py), (dx, dy) = point, displacement
+        (cx, cy), radius = circle.center, circle.radius
+
+        ox = px - cx; oy = py - cy
+
+        a = dx * dx + dy * dy
+        b = 2 * (dx * ox + dy * oy)
+        c = ox * ox + oy * oy - radius * radius
+
+        if c <= 0:
+            return 0
+        if a == 0:
+            return None
+
+        discriminant = b * b - 4 * a * c
+        if discriminant < 0:
+            return None
+
+        # Only the first root matters, because it's when the point enters.
+        t = (-b - math.sqrt(discriminant)) / (2 * a)
+        return t if 0 <= t <= 1 else None
+
+    @staticmethod
+    def circle_impact_line(circle, displacement, line):
+        """ Return the earliest time in [0, 1] at which the circle, moving by
+        the given displacement, hits the line.  Return None if it never does.
+        The circle sweeps out a capsule, so the circle either hits the flat
+        side of the line or one of its ends. """
+
+        if Collisions.circle_touching_line(circle, line):
+            return 0
+
+        point_impact_circle = Collisions.point_impact_circle
+        center, radius = circle.center, circle.radius
+        times = []
+
+        # Check the ends of the line, but only once if they're the same.
+        head, tail = line.points
+        ends = (head,) if head == tail else (head, tail)
+
+        for end in ends:
+            time = point_impact_circle(
+                    center, displacement, shapes.Circle(end, radius))
+            if time is not None:
+                times.append(time)
+
+        # Check the flat side of the line.
+        if not line.degenerate:
+            normal = line.normal
+            distance = Vector.dot(normal, center - line.tail)
+            speed = Vector.dot(normal, displacement)
+
+            if speed != 0:
+                side = radius if distance > 0 else -radius
+                time = (side - distance) / speed
+
+                if 0 <= time <= 1:
+                    direction = line.direction
+                    offset = center + displacement * time - line.tail
+                    along = Vector.dot(offset, direction)
+
+                    if 0 <= along <= direction.magnitude_squared:
+                        times.append(time)
+
+        return min(times) if times else None
+
+    @staticmethod
+    def circles_impact(first, displacement, second):
+        """ Return the earliest time in [0, 1] at which the first circle,
+        moving by the given displacement, hits the second circle.  If both
+        circles are moving, pass the difference between their displacements.
+        Return None if the circles never touch. """
+        return Collisions.point_impact_circle(first.center, displacement,
+                second.grow(first.radius))
+
+    @staticmethod
+    def boxes_impact(first, displacement, second):
+        """ Return the earliest time in [0, 1] at which the first box, moving
+        by the given displacement, hits the second box.  Return None if the
+        boxes never touch.  Each axis gives an interval of time during which
+        the boxes overlap along that axis, and the boxes only touch while both
+        intervals overlap. """
+
+        enter, exit = 0, 1
+        axes = (first.left, first.right, second.left, second.right,
+                    displacement.x), \
+               (first.top, first.bottom, second.top, second.bottom,
+                    displacement.y)
+
+        for low, high, other_low, other_high, speed in axes:
+            if speed == 0:
+                if high < other_low or low > other_high:
+                    return None
+                continue
+
+            if speed > 0:
+                start = (other_low - high) / speed
+                end = (other_high - low) / speed
+            else:
+                start = (other_high - low) / speed
+                end = (other_low - high) / speed
+
+            enter = max(enter, start)
+            exit = min(exit, end)
+
+            if enter > exit:
+                return None
+
+        return enter
+
+    @staticmethod
+    def circle_impact_polygon(circle, displacement, shape):
+        """ Return the earliest time in [0, 1] at which the circle, moving by
+        the given displacement, hits the convex shape.  Return None if it
+        never does.  A circle that starts outside the shape has to cross one
+        of its edges to get in, so the first edge hit is the answer. """
+
+        if Collisions.circle_touching_polygon(circle, shape):
+            return 0
+
+        circle_impact_line = Collisions.circle_impact_line
+        times = [circle_impact_line(circle, displacement, edge)
+                for edge in shape.edges]
+        times = [time for time in times if time is not None]
+
+        return min(times) if times else None
+
+    # Distances {{{1
+    @staticmethod
+    def point_line_distance(point, line):
+        """ Return the distance between the point and the closest point on
+        the given line segment. """
+        return math.sqrt(Collisions.point_line_distance_squared(point, line))
+
+    @staticmethod
+    def point_circle_distance(point, circle):
+        """ Return the distance between the point and the edge of the given
+        circle, or zero if the point is inside it. """
+        x, y = point
+        cx, cy = circle.center
+
+        distance = Collisions.distance_squared(x, y, cx, cy)
+        distance = math.sqrt(distance) - circle.radius
+        return distance if distance > 0 else 0
+
+    @staticmethod
+    def point_box_distance(point, box):
+        """ Return the distance between the point and the given box, or zero
+        if the point is inside it. """
+        x, y = point
+
+        dx = box.left - x if x < box.left else \
+                x - box.right if x > box.right else 0
+        dy = box.top - y if y < box.top else \
+                y - box.bottom if y > box.bottom else 0
+
+        return math.sqrt(dx * dx + dy * dy)
+
+    @staticmethod
+    def point_shape_distance(point, shape):
+        """ Return the distance between the point and the given convex shape,
+        or zero if the point is inside it.  The closest point on the outside
+        of a convex shape is always on one of the edges that faces the
+        point, so the other edges are skipped. """
+
+        # Optimized point/box distance
+        if isinstance(shape, shapes.Rectangle):
+            return Collisions.point_box_distance(point, shape)
+
+        if isinstance(shape, shapes.TransformedShape):
+            transform = shape.transform
+            return transform.scale * Collisions.point_shape_distance(
+                    transform.apply_inverse(point), shape.local)
+
+        segment_distance = Collisions.point_segment_distance_squared
+        x, y = point
+        vertices = shape.vertices
+        count = len(vertices)
+        closest = None
+
+        for index, (nx, ny) in enumerate(shape.normals):
+            hx, hy = vertices[index]
+
+            if nx * (x - hx) + ny * (y - hy) <= 0:
+                continue
+
+            tx, ty = vertices[(index + 1) % count]
+            distance = segment_distance(x, y, hx, hy, tx, ty)
+
+            if closest is None or distance < closest:
+                closest = distance
+
+        return math.sqrt(closest) if closest is not None else 0
+
+    @staticmethod
+    def distance(point, shape):
+        """ Return the distance between the point and any line, circle, or
+        shape, using whichever of the functions above applies.  Points inside
+        a circle or a shape are zero distance away from it. """
+        if isinstance(shape, shapes.Line):
+            return Collisions.point_line_distance(point, shape)
+        if isinstance(shape, shapes.Circle):
+            return Collisions.point_circle_distance(point, shape)
+        return Collisions.point_shape_distance(point, shape)
+
+    # Raycasts {{{1
+    @staticmethod
+    def raycast_line(origin, direction, max_distance, line):
+        """ Return where the given ray first hits the line, or None if it
+        doesn't hit the line within the given distance.  The direction
+        doesn't need to be normalized. """
+        direction = direction.normal
+        edge = line.direction
+        offset = line.tail - origin
+
+        denominator = Vector.perp(direction, edge)
+
+        # The ray is parallel to the line, so it can only hit the line if
+        # they're collinear.  If so, it hits whichever end is closer.
+        if denominator == 0:
+            if Vector.perp(offset, direction) != 0:
+                return None
+
+            distances = [Vector.dot(point - origin, direction)
+                    for point in line.points]
+            if max(distances) < 0:
+                return None
+
+            distance = max(min(distances), 0)
+            normal = -direction
+
+        else:
+            distance = Vector.perp(offset, edge) / denominator
+            along = Vector.perp(offset, direction) / denominator
+
+            if distance < 0 or along < 0 or along > 1:
+                return None
+
+            normal = line.normal
+            if Vector.dot(normal, direction) > 0:
+                normal = -normal
+
+        if distance > max_distance:
+            return None
+
+        return RayHit(distance, origin + direction * distance, normal)
+
+    @staticmethod
+    def raycast_circle(origin, direction, max_distance, circle):
+        """ Return where the given ray first hits the circle, or None if it
+        doesn't hit the circle within the given distance.  A ray that starts
+        inside the circle hits it immediately. """
+        direction = direction.normal
+        offset = origin - circle.center
+
+        b = Vector.dot(offset, direction)
+        c = offset.magnitude_squared - circle.radius * circle.radius
+
+        if c <= 0:
+            return RayHit(0, origin, -direction)
+        if b > 0:
+            return None
+
+        discriminant = b * b - c
+        if discriminant < 0:
+            return None
+
+        distance = -b - math.sqrt(discriminant)
+        if distance > max_distance:
+            return None
+
+        point = origin + direction * distance
+        normal = point - circle.center
+
+        return RayHit(distance, point,
+                normal.normal if normal else -direction)
+
+    @staticmethod
+    def raycast_box(origin, direction, max_distance, box):
+        """ Return where the given ray first hits the box, or None if it
+        doesn't hit the box within the given distance.  A ray that starts
+        inside the box hits it immediately. """
+        direction = direction.normal
+        enter, exit = 0, max_distance
+        normal = -direction
+
+        axes = (origin.x, direction.x, box.left, box.right, Vector(1, 0)), \
+               (origin.y, direction.y, box.top, box.bottom, Vector(0, 1))
+
+        for start, speed, low, high, axis in axes:
+            if speed == 0:
+                if start < low or start > high:
+                    return None
+                continue
+
+            near = (low - start) / speed
+            far = (high - start) / speed
+
+            if near > far:
+                near, far = far, near
+
+            if near > enter:
+                enter = near
+                normal = -axis if speed > 0 else axis
+
+            exit = min(exit, far)
+
+            if enter > exit:
+                return None
+
+        return RayHit(enter, origin + direction * enter, normal)
+
+    @staticmethod
+    def raycast_polygon(origin, direction, max_distance, shape):
+        """ Return where the given ray first hits the convex shape, or None if
+        it doesn't hit the shape within the given distance.  The ray is
+        clipped against each edge in turn; the last edge it enters through is
+        the one it hits.  A ray that starts inside the shape hits it
+        immediately. """
+        direction = direction.normal
+        enter, exit = 0, max_distance
+        normal = -direction
+
+        for facing, head in zip(shape.normals, shape.vertices):
+            distance = Vector.dot(facing, head - origin)
+            speed = Vector.dot(facing, direction)
+
+            if speed == 0:
+                if distance < 0:
+                    return None
+                continue
+
+            time = distance / speed
+
+            if speed < 0:
+                if time > enter:
+                    enter = time; normal = facing
+            else:
+                exit = min(exit, time)
+
+            if enter > exit:
+                return None
+
+        return RayHit(enter, origin + direction * enter, normal)
+
+    @staticmethod
+    def raycast(origin, direction, max_distance, shape):
+        """ Cast a ray at any line, circle, or shape, using whichever of the
+        functions above applies. """
+        if isinstance(shape, shapes.Line):
+            return Collisions.raycast_line(
+                    origin, direction, max_distance, shape)
+        if isinstance(shape, shapes.Circle):
+            return Collisions.raycast_circle(
+                    origin, direction, max_distance, shape)
+        if isinstance(shape, shapes.Rectangle):
+            return Collisions.raycast_box(
+                    origin, direction, max_distance, shape)
+
+        return Collisions.raycast_polygon(
+                origin, direction, max_distance, shape)
+    # }}}1
+
+class Contact(object):
+    """ Describes how two touching shapes overlap.  The normal is a unit
+    vector pointing from the first shape towards the second, and the depth is
+    how far the shapes overlap along that normal.  Moving the second shape by
+    the translation vector (or the first shape by its opposite) is the
+    smallest move that separates the two.  The contact points are where the
+    shapes meet; there are either one or two of them. """
+
+    # Operators {{{1
+    def __init__(self, normal, depth, points):
+        self.__normal = normal
+        self.__depth = depth
+        self.__points = tuple(points)
+
+    def __repr__(self):
+        return "Contact: normal %s, depth %f, at %s" % (
+                self.normal, self.depth, ", ".join(map(repr, self.points)))
+
+    def reverse(self):
+        """ Return the same contact as seen from the second shape. """
+        return Contact(-self.normal, self.depth, self.points)
+
+    # Attributes {{{1
+    @property
+    def normal(self):
+        return self.__normal
+
+    @property
+    def depth(self):
+        return self.__depth
+
+    @property
+    def points(self):
+        return self.__points
+
+    @property
+    def translation(self):
+        return self.__normal * self.__depth
+
+    def get_normal(self): return self.normal
+    def get_depth(self): return self.depth
+    def get_points(self): return self.points
+    def get_translation(self): return self.translation
+    # }}}1
+
+class RayHit(object):
+    """ Describes where a ray hit a shape.  The distance is measured from the
+    origin of the ray, and the normal is a unit vector perpendicular to the
+    surface that was hit, facing back towards the ray.  Rays that start inside
+    a shape hit it at a distance of zero. """
+
+    # Operators {{{1
+    def __init__(self, distance, point, normal):
+        self.__distance = distance
+        self.__point = point
+        self.__normal = normal
+
+    def __repr__(self):
+        return "RayHit: %s at distance %f, normal %s" % (
+                self.point, self.distance, self.normal)
+
+    # Attributes {{{1
+    @property
+    def distance(self):
+        return self.__distance
+
+    @property
+    def point(self):
+        return self.__point
+
+    @property
+    def normal(self):
+        return self.__normal
+
+    def get_distance(self): return self.distance
+    def get_point(self): return self.point
+    def get_normal(self): return self.normal
+    # }}}1
+
+class Batch:
+    """ Provides versions of the most common collision checks that work on
+    whole arrays of shapes at once, without building any Vector or shape
+    objects.  Points and circle centers are given as arrays of (x, y) pairs
+    (or as VectorArray objects), radii as arrays of numbers, boxes as arrays
+    of (left, top, right, bottom) rows, and line segments as arrays of
+    (head x, head y, tail x, tail y) rows.
+
+    The functions that return masks follow the numpy broadcasting rules, so
+    either side can be a single shape (one-vs-many) or both sides can be
+    arrays of the same length (elementwise).  The functions ending in _pairs
+    compare every shape on one side with every shape on the other and return
+    an array of (i, j) index pairs.  All of these functions require numpy. """
+
+    # Pairs are found one block of rows at a time, so that comparing
+    # thousands of shapes doesn't allocate gigantic intermediate matrices.
+    block_size = 1024
+
+    # Points and Circles {{{1
+    @staticmethod
+    def points_nearby(first, second, padding):
+        x1, y1 = Batch.coordinates(first)
+        x2, y2 = Batch.coordinates(second)
+        padding = Batch.array(padding)
+
+        dx = x1 - x2; dy = y1 - y2
+        return (dx * dx + dy * dy <= padding * padding) & (padding >= 0)
+
+    @staticmethod
+    def point_inside_circle(points, centers, radii):
+        return Batch.points_nearby(points, centers, radii)
+
+    @staticmethod
+    def circles_touching(centers, radii, other_centers, other_radii):
+        return Batch.points_nearby(centers, other_centers,
+                Batch.array(radii) + Batch.array(other_radii))
+
+    @staticmethod
+    def circles_touching_pairs(centers, radii,
+            other_centers=None, other_radii=None):
+        """ Return the index pair of every touching pair of circles.  If only
+        one set of circles is given, it is compared against itself and each
+        pair is only reported once, with i < j. """
+
+        x1, y1 = Batch.coordinates(centers)
+        r1 = Batch.array(radii) * numpy.ones(len(x1))
+
+        if other_centers is None:
+            x2, y2, r2 = x1, y1, r1
+        else:
+            x2, y2 = Batch.coordinates(other_centers)
+            r2 = Batch.array(other_radii) * numpy.ones(len(x2))
+
+        def touching(rows, columns):
+            dx = x1[rows, None] - x2[columns]
+            dy = y1[rows, None] - y2[columns]
+            reach = r1[rows, None] + r2[columns]
+            return dx * dx + dy * dy <= reach * reach
+
+        return Batch.find_pairs(touching, len(x1), len(x2),
+                other_centers is None)
+
+    # Points and Lines {{{1
+    @staticmethod
+    def point_line_distance_squared(points, segments):
+        """ Return the squared distance between each point and the closest
+        point on each line segment.  Segments are given as arrays of (head x,
+        head y, tail x, tail y) rows, or as a single Line. """
+        x, y = Batch.coordinates(points)
+        hx, hy, tx, ty = Batch.segments(segments)
+
+        dx = hx - tx; dy = hy - ty
+        px = x - tx; py = y - ty
+
+        dot = px * dx + py * dy
+        length = dx * dx + dy * dy
+
+        # Degenerate segments have no length, so they project onto their
+        # tail.  The projection is clamped before it's divided, which keeps
+        # the division from ever being zero over zero.
+        k = numpy.clip(dot, 0, length) / numpy.where(length > 0, length, 1)
+
+        px = px - k * dx; py = py - k * dy
+        return px * px + py * py
+
+    @staticmethod
+    def point_near_line(points, segments, padding):
+        """ Return a mask showing which points are within the given padding
+        of which line segments. """
+        padding = Batch.array(padding)
+        distance = Batch.point_line_distance_squared(points, segments)
+        return (distance <= padding * padding) & (padding >= 0)
+
+    # Points and Shapes {{{1
+    @staticmethod
+    def point_inside_shape(points, shape):
+        """ Return a mask showing which points are inside the given convex
+        shape.  Each point must be behind every edge. """
+        x, y = Batch.coordinates(points)
+        inside = numpy.ones(numpy.shape(x), dtype=bool)
+
+        for edge in shape.edges:
+            nx, ny = edge.facing
+            hx, hy = edge.head
+            inside &= nx * (x - hx) + ny * (y - hy) <= 0
+
+        return inside
+
+    # Boxes Touching {{{1
+    @staticmethod
+    def boxes_touching(boxes, others):
+        """ Return a mask showing which boxes overlap.  Either argument can be
+        a single Rectangle instead of an array. """
+        l1, t1, r1, b1 = Batch.bounds(boxes)
+        l2, t2, r2, b2 = Batch.bounds(others)
+
+        return (l1 <= r2) & (r1 >= l2) & (t1 <= b2) & (b1 >= t2)
+
+    @staticmethod
+    def boxes_touching_pairs(boxes, others=None):
+        """ Return the index pair of every overlapping pair of boxes.  If only
+        one set of boxes is given, it is compared against itself and each pair
+        is only reported once, with i < j. """
+        l1, t1, r1, b1 = Batch.bounds(boxes)
+        l2, t2, r2, b2 = Batch.bounds(boxes if others is None else others)
+
+        def touching(rows, columns):
+            return (l1[rows, None] <= r2[columns]) & \
+                   (r1[rows, None] >= l2[columns]) & \
+                   (t1[rows, None] <= b2[columns]) & \
+                   (b1[rows, None] >= t2[columns])
+
+        return Batch.find_pairs(touching, len(l1), len(l2), others is None)
+
+    # Helper Methods {{{1
+    @staticmethod
+    def array(values):
+        """ Convert the argument into an array of floats. """
+        if numpy is None:
+            raise ImportError("Batch collision checks require numpy.")
+        return numpy.asarray(values, dtype=float)
+
+    @staticmethod
+    def coordinates(points):
+        """ Split an array of points into arrays of x and y coordinates.  A
+        single vector is split into two numbers. """
+        if isinstance(points, VectorArray):
+            return Batch.array(points.x), Batch.array(points.y)
+
+        points = Batch.array(points)
+        return points[..., 0], points[..., 1]
+
+    @staticmethod
+    def bounds(boxes):
+        """ Split an array of boxes into arrays of left, top, right, and
+        bottom coordinates.  A single Rectangle is split into four numbers. """
+        if isinstance(boxes, shapes.Rectangle):
+            return boxes.left, boxes.top, boxes.right, boxes.bottom
+
+        boxes = Batch.array(boxes)
+        return boxes[..., 0], boxes[..., 1], boxes[..., 2], boxes[..., 3]
+
+    @staticmethod
+    def segments(lines):
+        """ Split an array of line segments into arrays of head x, head y,
+        tail x, and tail y coordinates.  A single Line is split into four
+        numbers. """
+        if isinstance(lines, shapes.Line):
+            (hx, hy), (tx, ty) = lines.head, lines.tail
+            return hx, hy, tx, ty
+
+        lines = Batch.array(lines)
+        return lines[..., 0], lines[..., 1], lines[..., 2], lines[..., 3]
+
+    @staticmethod
+    def find_pairs(touching, rows, columns, symmetric):
+        """ Collect the index pairs for which the given function returns true.
+        The function is called with a slice of rows and a slice of columns,
+        and has to return a matrix of booleans.  If the comparison is
+        symmetric, only pairs with i < j are considered. """
+        found = [numpy.zeros((0, 2), dtype=int)]
+
+        for start in range(0, rows, Batch.block_size):
+            end = min(start + Batch.block_size, rows)
+            first_column = start if symmetric else 0
+
+            mask = touching(slice(start, end), slice(first_column, columns))
+
+            if symmetric:
+                mask &= numpy.arange(first_column, columns) > \
+                        numpy.arange(start, end)[:, None]
+
+            i, j = numpy.nonzero(mask)
+            found.append(numpy.column_stack((i + start, j + first_column)))
+
+        return numpy.concatenate(found)
     # }}}1
 
 if __name__ == "__main__":
     from shapes import *
+    from fixtures import random_shapes, edges_touching
 
     # Points and Lines {{{1
     def points_and_lines():
@@ -311,6 +1395,38 @@ if __name__ == "__main__":
             print "An assertion failed at %s." % point; print
             raise
 
+        # Degenerate lines are treated like points.
+        assert point_near_line(Vector(13, 14), degenerate, 5)
+        assert not point_near_line(Vector(13, 14.1), degenerate, 5)
+
+        distance_squared = Collisions.point_line_distance_squared
+
+        assert distance_squared(Vector(13, 10), line) == 9
+        assert distance_squared(Vector(13, 19), line) == 25
+        assert distance_squared(Vector(6, 2), line) == 25
+        assert distance_squared(Vector(13, 14), degenerate) == 25
+
+        # Negative padding can never be reached, so nothing is near anything.
+        assert not points_nearby(origin, origin, -1)
+        assert not point_near_line(Vector(10, 10), line, -1)
+        assert not Collisions.circles_nearby(
+                Circle(origin, 1), Circle(origin, 1), -3)
+
+        # The padding can still shrink a circle, as long as something is left.
+        assert Collisions.point_near_circle(
+                Vector(13, 10), Circle(origin, 5), -2)
+        assert not Collisions.point_near_circle(
+                Vector(13.1, 10), Circle(origin, 5), -2)
+        assert Collisions.circle_near_line(Circle(Vector(13, 10), 5), line, -2)
+        assert not Collisions.circle_near_line(
+                Circle(Vector(13, 10), 1), line, -2)
+
+        assert Collisions.distance_squared(1, 2, 4, 6) == 25
+        assert Collisions.coordinates_nearby(1, 2, 4, 6, 5)
+        assert not Collisions.coordinates_nearby(1, 2, 4, 6, 4.9)
+        assert Collisions.coordinates_near_line(13, 10, 10, 5, 10, 15, 3)
+        assert not Collisions.coordinates_near_line(13, 10, 10, 5, 10, 15, 2.9)
+
     # Points and Shapes {{{1
     def points_and_shapes():
         box = Rectangle(5, 5, 15, 15)
@@ -376,6 +1492,16 @@ if __name__ == "__main__":
                     == inside_zero[y][x]
             assert point_inside_circle(point, zero_circle)  \
                     == inside_zero[y][x]
+
+        # The optimized box functions should agree with the generic ones.
+        square = Polygon(list(box.vertices))
+
+        for x, y in pairs:
+            point = 5 * Vector(x, y)
+
+            for padding in (-5, -1, 0, 1, 5):
+                assert point_near_shape(point, box, padding)  \
+                        == point_near_shape(point, square, padding)
     # }}}1
 
     # Lines and Shapes {{{1
@@ -468,6 +1594,21 @@ if __name__ == "__main__":
                 print "\nAssertion at L:%d R:%d failed.\n" % (left, right)
                 raise
 
+        # Test lines inside and outside of boxes.
+        inside = Line(Vector(8, 8), Vector(12, 11))
+        outside = Line(Vector(16, 0), Vector(20, 14))
+        crossing = Line(Vector(8, 8), Vector(20, 14))
+
+        assert Collisions.box_touching_line(box, inside)
+        assert not Collisions.shape_touching_line(box, inside)
+        assert Collisions.touching(inside, box)
+
+        assert not Collisions.box_touching_line(box, outside)
+        assert not Collisions.shape_touching_line(box, outside)
+
+        assert Collisions.box_touching_line(box, crossing)
+        assert Collisions.shape_touching_line(box, crossing)
+
         # Test degenerate lines.
         coordinates = (5, 10, 15)
         results = (False, True, False)
@@ -508,6 +1649,7 @@ if __name__ == "__main__":
 
         shapes_touching = Collisions.shapes_touching
         circle_touching_shape = Collisions.circle_touching_shape
+        circle_touching_polygon = Collisions.circle_touching_polygon
         circles_touching = Collisions.circles_touching
                     
         touching_rect = [
@@ -561,6 +1703,390 @@ if __name__ == "__main__":
                     touching_circle[y][x]
             assert circle_touching_shape(circle_3, rect_0) ==        \
                     touching_zero[y][x]
+
+            # Testing the separating axis tests
+            assert circle_touching_polygon(circle_2, rect_3) ==      \
+                    touching_circle[y][x]
+            assert circle_touching_polygon(circle_0, rect_3) ==      \
+                    touching_zero[y][x]
+            assert circle_touching_polygon(circle_3, polygon_2) ==   \
+                    touching_circle[y][x]
+
+    # Separating Axes {{{1
+    def separating_axes():
+        polygons_touching = Collisions.polygons_touching
+        circle_touching_polygon = Collisions.circle_touching_polygon
+
+        # These diamonds have overlapping boxes, but they only touch when
+        # they're close enough for their corners to meet.
+        diamond = Polygon.from_regular(Vector(0, 0), 10, 4)
+
+        for offset, result in ((10, True), (12, False), (20, False)):
+            other = Polygon.from_regular(Vector(offset, offset), 10, 4)
+
+            assert Collisions.boxes_touching(diamond.box, other.box)
+            assert polygons_touching(diamond, other) == result
+            assert polygons_touching(other, diamond) == result
+
+        # This circle is inside the diamond's box, but beside its corner.
+        for radius, result in ((4, False), (5, True)):
+            circle = Circle(Vector(8, 8), radius)
+            assert circle_touching_polygon(circle, diamond) == result
+
+        # A rotated square should behave exactly like the same diamond built
+        # directly from its world-space vertices.
+        square = Rectangle.from_center(Vector.null(), 10, 10)
+        rotated = TransformedShape(
+                square, Transform(Vector(0, 0), math.pi / 4, math.sqrt(2)))
+
+        for offset, result in ((10, True), (12, False), (20, False)):
+            other = Polygon.from_regular(Vector(offset, offset), 10, 4)
+            assert polygons_touching(rotated, other) == result
+
+        for radius, result in ((4, False), (5, True)):
+            circle = Circle(Vector(8, 8), radius)
+            assert circle_touching_polygon(circle, rotated) == result
+
+        for x, y in ((0, 0), (4, 4), (6, 6), (9, 0), (11, 0)):
+            point = Vector(x, y)
+            for padding in (-1, 0, 1):
+                assert Collisions.point_near_shape(point, rotated, padding) \
+                        == Collisions.point_near_shape(point, diamond, padding)
+
+        # The separating axis tests should always agree with the edge
+        # intersection tests they replaced.  The shapes are crowded together,
+        # so there are plenty of near misses as well as hits.
+        polygons = random_shapes(200, size=80, seed=1, kinds=("polygon",))
+        circles = random_shapes(100, size=80, seed=2, kinds=("circle",))
+        hits = 0
+
+        for first in polygons[:100]:
+            for second in polygons[100:]:
+                expected = edges_touching(first, second)
+                assert polygons_touching(first, second) == expected
+                hits += expected
+
+            for circle in circles:
+                assert circle_touching_polygon(circle, first) == \
+                        Collisions.circle_touching_shape(circle, first)
+
+        assert 0 < hits < 100 * 100
+
+    # Contacts {{{1
+    def contacts():
+        contact = Collisions.contact
+
+        # Circles
+        first = Circle(Vector(0, 0), 5)
+        second = Circle(Vector(8, 0), 5)
+
+        result = contact(first, second)
+        assert result.normal == Vector(1, 0)
+        assert result.depth == 2
+        assert result.points == (Vector(4, 0),)
+        assert result.translation == Vector(2, 0)
+
+        assert contact(first, second.move(Vector(3, 0))) is None
+
+        # Boxes and polygons
+        box = Rectangle(0, 0, 10, 10)
+        other = Rectangle(8, 2, 18, 6)
+        polygon = Polygon.from_vertices(box.vertices)
+
+        for first, second in ((box, other), (polygon, other)):
+            result = contact(first, second)
+            assert result.normal == Vector(1, 0)
+            assert result.depth == 2
+            assert set(result.points) == set([Vector(8, 2), Vector(8, 6)])
+
+            result = contact(second, first)
+            assert result.normal == Vector(-1, 0)
+            assert result.depth == 2
+
+        assert contact(box, other.move(Vector(3, 0))) is None
+        assert contact(polygon, other.move(Vector(3, 0))) is None
+
+        # Circles and shapes
+        circle = Circle(Vector(12, 5), 3)
+
+        for shape in (box, polygon):
+            result = contact(circle, shape)
+            assert result.normal == Vector(-1, 0)
+            assert result.depth == 1
+            assert result.points == (Vector(9.5, 5),)
+
+            result = contact(shape, circle)
+            assert result.normal == Vector(1, 0)
+
+        corner = Circle(Vector(13, 14), 6)
+        result = contact(corner, box)
+
+        assert result.normal == Vector(-0.6, -0.8)
+        assert result.depth == 1
+        assert contact(corner.shrink(2), box) is None
+
+    # Swept Shapes {{{1
+    def swept_shapes():
+        circle = Circle(Vector(-10, 0), 1)
+        wall = Line(Vector(0, -5), Vector(0, 5))
+        square = Polygon.from_vertices(Rectangle(-2, -2, 2, 2).vertices)
+
+        forward = Vector(20, 0); backward = Vector(-20, 0)
+        sideways = Vector(0, 20)
+
+        # This circle would tunnel through the wall if it were only checked
+        # at the start and the end of its move.
+        circle_impact_line = Collisions.circle_impact_line
+
+        assert circle_impact_line(circle, forward, wall) == 0.45
+        assert circle_impact_line(circle, backward, wall) is None
+        assert circle_impact_line(circle, sideways, wall) is None
+        assert circle_impact_line(circle.move(Vector(0, 4.5)),
+                forward, wall) == 0.45
+        assert circle_impact_line(circle.move(Vector(9, 0)),
+                forward, wall) == 0
+
+        circles_impact = Collisions.circles_impact
+        target = Circle(Vector(0, 0), 1)
+
+        assert circles_impact(circle, forward, target) == 0.4
+        assert circles_impact(circle, backward, target) is None
+
+        boxes_impact = Collisions.boxes_impact
+        box = circle.box; other = target.box
+
+        assert boxes_impact(box, forward, other) == 0.4
+        assert boxes_impact(box, backward, other) is None
+        assert boxes_impact(box, sideways, other) is None
+
+        circle_impact_polygon = Collisions.circle_impact_polygon
+
+        assert circle_impact_polygon(circle, forward, square) == 0.35
+        assert circle_impact_polygon(circle, backward, square) is None
+        assert circle_impact_polygon(target, forward, square) == 0
+
+    # Distances {{{1
+    def distances():
+        import random
+        generator = random.Random(3)
+        uniform = generator.uniform
+
+        line = Line(Vector(0, 0), Vector(10, 0))
+        point = Line(Vector(5, 5), Vector(5, 5))
+        circle = Circle(Vector(0, 0), 5)
+        box = Rectangle(0, 0, 10, 10)
+        square = Polygon.from_regular(Vector(5, 5), 5 * math.sqrt(2), 4,
+                math.pi / 4)
+        moved = TransformedShape(square,
+                Transform(Vector(10, 0), math.pi / 7, 2))
+
+        assert Collisions.distance(Vector(5, 3), line) == 3
+        assert Collisions.distance(Vector(13, 4), line) == 5
+        assert Collisions.distance(Vector(-3, -4), line) == 5
+        assert Collisions.distance(Vector(8, 9), point) == 5
+
+        assert Collisions.distance(Vector(8, 0), circle) == 3
+        assert Collisions.distance(Vector(1, 1), circle) == 0
+
+        assert Collisions.distance(Vector(13, 14), box) == 5
+        assert Collisions.distance(Vector(5, -2), box) == 2
+        assert Collisions.distance(Vector(5, 5), box) == 0
+
+        # Every distance should agree with the padded point functions.  The
+        # padding around boxes and polygons has square corners, so only
+        # lines and circles are exact in both directions.
+        for trial in range(200):
+            point = Vector(uniform(-20, 40), uniform(-20, 40))
+
+            for shape in (line, circle, box, square, moved):
+                distance = Collisions.distance(point, shape)
+
+                if isinstance(shape, Line):
+                    near = Collisions.point_near_line
+                elif isinstance(shape, Circle):
+                    near = Collisions.point_near_circle
+                else:
+                    near = Collisions.point_near_shape
+
+                assert near(point, shape, distance + 1e-6)
+
+                if distance > 1e-6 and isinstance(shape, (Line, Circle)):
+                    assert not near(point, shape, distance - 1e-6)
+
+            # Polygons and boxes should be exactly the same.
+            assert abs(Collisions.distance(point, square) -
+                    Collisions.distance(point, box)) < 1e-9
+
+    # Raycasts {{{1
+    def raycasts():
+        raycast = Collisions.raycast
+
+        origin = Vector(-10, 0)
+        forward = Vector(1, 0); backward = Vector(-1, 0)
+
+        wall = Line(Vector(0, -5), Vector(0, 5))
+        circle = Circle(Vector(0, 0), 5)
+        box = Rectangle(-2, -2, 2, 2)
+        polygon = Polygon.from_vertices(box.vertices)
+
+        expected = (wall, 10), (circle, 5), (box, 8), (polygon, 8)
+
+        for shape, distance in expected:
+            hit = raycast(origin, forward, 20, shape)
+
+            assert hit.distance == distance
+            assert hit.point == Vector(distance - 10, 0)
+            assert hit.normal == Vector(-1, 0)
+
+            assert raycast(origin, backward, 20, shape) is None
+            assert raycast(origin, forward, distance - 1, shape) is None
+
+        # Rays that start inside a shape hit it right away.
+        for shape in (circle, box, polygon):
+            hit = raycast(Vector(1, 1), forward, 20, shape)
+            assert hit.distance == 0
+
+        # Rays that run along a line hit its nearest end.
+        hit = raycast(Vector(0, -10), Vector(0, 1), 20, wall)
+        assert hit.point == Vector(0, -5)
+
+    # Mutable Shapes {{{1
+    def mutable_shapes():
+        touching = Collisions.touching
+        contact = Collisions.contact
+        raycast = Collisions.raycast
+
+        # Mutable shapes should give exactly the same answers as immutable
+        # copies of themselves.
+        polygon = Polygon.from_regular(Vector(20, 20), 10, 5)
+        others = polygon, Circle(Vector(30, 10), 6), Rectangle(10, 25, 30, 35)
+
+        mutable_circle = MutableCircle(Vector(0, 0), 8)
+        mutable_box = MutableRectangle(-6, -4, 6, 4)
+        point = MutableVector(0, 0)
+
+        for step in range(12):
+            displacement = Vector(4, 3)
+
+            mutable_circle.move_ip(displacement)
+            mutable_box.move_ip(displacement)
+            point += displacement
+
+            pairs = (mutable_circle.freeze(), mutable_circle), \
+                    (mutable_box.freeze(), mutable_box)
+
+            for fixed, mutable in pairs:
+                assert Collisions.point_inside(point, fixed) == \
+                        Collisions.point_inside(point, mutable)
+
+                for other in others:
+                    assert touching(fixed, other) == touching(mutable, other)
+                    assert touching(other, fixed) == touching(other, mutable)
+
+                    expected = contact(fixed, other)
+                    result = contact(mutable, other)
+
+                    assert bool(expected) == bool(result)
+                    assert not result or expected.depth == result.depth
+
+                    expected = raycast(point.freeze(), displacement, 50, other)
+                    result = raycast(point, displacement, 50, other)
+
+                    assert bool(expected) == bool(result)
+                    assert not result or expected.distance == result.distance
+
+                # Fire a ray at the shape itself, from a little way back.
+                origin = point.freeze() - 5 * displacement
+                expected = raycast(origin, displacement, 50, fixed)
+                result = raycast(origin, displacement, 50, mutable)
+
+                assert expected and result
+                assert expected.distance == result.distance
+
+            expected = Collisions.circles_impact(
+                    mutable_circle.freeze(), point.freeze(), others[1])
+            result = Collisions.circles_impact(
+                    mutable_circle, point, others[1])
+
+            assert expected == result
+
+        # Lines can be built from mutable vectors too.
+        mutable_lines = Line(MutableVector(0, 0), MutableVector(10, 0)), \
+                Line(MutableVector(5, 0), MutableVector(5, 0))
+        circle = MutableCircle(Vector(5, 10), 2)
+
+        for line in mutable_lines:
+            frozen = Line(line.head.freeze(), line.tail.freeze())
+
+            expected = Collisions.circle_impact_line(
+                    circle.freeze(), Vector(0, -20), frozen)
+            result = Collisions.circle_impact_line(
+                    circle, Vector(0, -20), line)
+
+            assert expected is not None and expected == result
+
+    # Batches {{{1
+    def batches():
+        import random
+
+        generator = random.Random(0)
+        uniform = generator.uniform
+
+        points = [Vector(uniform(0, 100), uniform(0, 100)) for i in range(200)]
+        radii = [uniform(0, 10) for i in range(200)]
+        circles = [Circle(p, r) for p, r in zip(points, radii)]
+        boxes = [circle.box for circle in circles[::2]]
+        bounds = [(b.left, b.top, b.right, b.bottom) for b in boxes]
+
+        origin = points[0]; circle = circles[0]; box = boxes[0]
+        polygon = Polygon.from_regular(Vector(50, 50), 30, 6)
+
+        def same(mask, expected):
+            return list(mask) == list(expected)
+
+        def same_pairs(pairs, expected):
+            return sorted(map(tuple, pairs)) == sorted(expected)
+
+        assert same(Batch.point_inside_circle(origin, points, radii),
+                [Collisions.point_inside_circle(origin, c) for c in circles])
+        assert same(Batch.point_inside_circle(points, origin, 10),
+                [Collisions.point_inside_circle(p, Circle(origin, 10))
+                    for p in points])
+        assert same(Batch.circles_touching(points, radii, origin, 5),
+                [Collisions.circles_touching(c, Circle(origin, 5))
+                    for c in circles])
+        assert same(Batch.point_inside_shape(VectorArray.from_vectors(points),
+                polygon), [Collisions.point_inside_shape(p, polygon)
+                    for p in points])
+        assert same(Batch.boxes_touching(bounds, box),
+                [Collisions.boxes_touching(b, box) for b in boxes])
+
+        lines = [Line(points[i], points[i + 1]) for i in range(0, 200, 2)]
+        lines.append(Line(origin, origin))
+        segments = [tuple(line.head) + tuple(line.tail) for line in lines]
+
+        assert numpy.allclose(
+                Batch.point_line_distance_squared(origin, segments),
+                [Collisions.point_line_distance_squared(origin, line)
+                    for line in lines])
+        assert same(Batch.point_near_line(origin, segments, 20),
+                [Collisions.point_near_line(origin, line, 20)
+                    for line in lines])
+        assert same(Batch.point_near_line(points, lines[0], 10),
+                [Collisions.point_near_line(point, lines[0], 10)
+                    for point in points])
+
+        assert same_pairs(Batch.circles_touching_pairs(points, radii),
+                [(i, j) for i in range(200) for j in range(i + 1, 200)
+                    if Collisions.circles_touching(circles[i], circles[j])])
+        assert same_pairs(
+                Batch.circles_touching_pairs(points, radii, points[:5], 3),
+                [(i, j) for i in range(200) for j in range(5)
+                    if Collisions.circles_touching(
+                        circles[i], Circle(points[j], 3))])
+        assert same_pairs(Batch.boxes_touching_pairs(bounds),
+                [(i, j) for i in range(100) for j in range(i + 1, 100)
+                    if Collisions.boxes_touching(boxes[i], boxes[j])])
     # }}}1
 
     print "Testing collisions.py..."
@@ -570,5 +2096,14 @@ if __name__ == "__main__":
 
     lines_and_shapes()
     shapes_and_circles()
+    separating_axes()
+    contacts()
+    swept_shapes()
+    distances()
+    raycasts()
+    mutable_shapes()
+
+    if numpy is not None:
+        batches()
 
     print "All tests passed."
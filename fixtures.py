@@ -0,0 +1,95 @@
+""" The fixtures module builds the random scenes used by the self-tests and the
+benchmarks, along with brute-force answers to check the faster code against.
+It's only meant for testing, so setup.py doesn't install it.
+
+Every scene is generated from a fixed random seed, so the same arguments
+always give the same shapes.  The kinds of shapes in a scene are picked in
+turn from the given list, and lines alternate between having a facing and
+not having one. """
+
+from __future__ import division
+
+import math, random
+
+from vector import Vector
+from shapes import Line, Circle, Rectangle, Polygon, MutableCircle
+from collisions import Collisions
+
+# Scenes {{{1
+def random_shapes(count, size=500, seed=0,
+        kinds=("circle", "rectangle", "polygon")):
+    """ Return the given number of shapes scattered over a square with the
+    given size.  The kinds can be any of "vector", "line", "circle",
+    "mutable circle", "rectangle", and "polygon". """
+    generator = random.Random(seed)
+    shapes = []
+
+    for index in range(count):
+        center = Vector(generator.uniform(0, size),
+                        generator.uniform(0, size))
+        radius = generator.uniform(2, 20)
+        kind = kinds[index % len(kinds)]
+
+        if kind == "vector":
+            shapes.append(center)
+        elif kind == "line":
+            direction = Vector.from_radians(generator.uniform(0, 2 * math.pi))
+            facing = direction.orthogonal if index // len(kinds) % 2 else None
+            shapes.append(Line(center, center + 2 * radius * direction,
+                facing))
+        elif kind == "circle":
+            shapes.append(Circle(center, radius))
+        elif kind == "mutable circle":
+            shapes.append(MutableCircle(center, radius))
+        elif kind == "rectangle":
+            shapes.append(Rectangle.from_center(
+                center, 2 * radius, generator.uniform(2, 40)))
+        elif kind == "polygon":
+            sides = generator.randint(3, 7)
+            angle = generator.uniform(0, math.pi)
+            shapes.append(Polygon.from_regular(center, radius, sides, angle))
+        else:
+            raise ValueError("Unknown kind of shape: %s" % kind)
+
+    return shapes
+# }}}1
+
+# Brute Force {{{1
+def brute_force_pairs(shapes):
+    """ Return every pair of shapes with overlapping boxes, as a set of
+    frozensets. """
+    pairs = set()
+    for index, first in enumerate(shapes):
+        for second in shapes[index + 1:]:
+            if Collisions.boxes_touching(first.box, second.box):
+                pairs.add(frozenset((first, second)))
+    return pairs
+
+def brute_force_touching(shapes):
+    """ Return every pair of touching shapes, as a list of (first, second)
+    tuples sorted by the positions of the shapes in the list. """
+    pairs = []
+    for index, first in enumerate(shapes):
+        for second in shapes[index + 1:]:
+            if Collisions.touching(first, second):
+                pairs.append((first, second))
+    return pairs
+
+def edges_touching(first, second):
+    """ Return true if the two convex shapes are touching, by checking
+    whether either center is inside the other shape and then looking for an
+    edge of the first shape that crosses the second.  This is how
+    shapes_touching() worked before it used separating axes, and it's kept to
+    check and time the new test against. """
+    point_inside_shape = Collisions.point_inside_shape
+    shape_touching_edge = Collisions.shape_touching_line
+
+    if point_inside_shape(first.center, second): return True
+    if point_inside_shape(second.center, first): return True
+
+    for edge in first.edges:
+        if shape_touching_edge(second, edge):
+            return True
+
+    return False
+# }}}1
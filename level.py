@@ -0,0 +1,545 @@
+""" The level module stores static level geometry, like walls and floors, in a
+read-only file that is meant to be memory-mapped.  Everything is kept in flat
+arrays of numbers: the kind, box, center, and radius of each shape, the
+vertices and normals of every shape laid end to end, and a uniform grid that
+lists which shapes overlap each cell.  The grid is built once, when the level
+is saved.
+
+Opening a level doesn't parse anything or build any objects.  Queries look up
+the cells they cover, read the boxes of the shapes in those cells straight out
+of the file, and only build shape objects for the few candidates that remain.
+Those objects are then handed to the same functions in the collisions module
+that are used for everything else.  Every process that opens the same file
+shares a single copy of it through the operating system's page cache.
+
+Shapes are identified by their position in the list the level was saved
+from, and level[index] rebuilds any one of them. """
+
+from __future__ import division
+
+import array, math, mmap, struct, sys
+
+from vector import Vector
+from shapes import Line, Circle, Shape, Rectangle
+from collisions import Collisions
+from serialization import FormatError, line_facing
+
+# Format Constants {{{1
+level_magic = b"LEVL"
+level_version = 1
+
+# The magic string, the version, then the numbers of shapes, vertices, grid
+# entries, grid columns, and grid rows, and finally the cell size and the
+# position of the grid's top left corner.
+header = struct.Struct("<4sHxxIIIIIxxxxddd")
+
+line_code = 0
+circle_code = 1
+rectangle_code = 2
+polygon_code = 3
+
+# The grid is made coarser until it has no more than this many cells for each
+# shape in the level.
+cells_per_shape = 4
+# }}}1
+
+class StaticLevel(object):
+    """ Gives read-only access to a level that was saved by StaticLevel.save().
+    Lines, circles, rectangles, and any other convex shape can be stored.
+    Polygons come back as MappedPolygon objects, which use the normals stored
+    in the file rather than calculating them again. """
+
+    # Factory Methods {{{1
+    @staticmethod
+    def save(path, shapes, cell_size=None):
+        """ Write the given shapes to a level file at the given path. """
+        with open(path, 'wb') as file:
+            file.write(StaticLevel.pack(shapes, cell_size))
+
+    @staticmethod
+    def pack(shapes, cell_size=None):
+        """ Return the contents of a level file holding the given shapes. """
+        kinds = array.array('B')
+        starts = array.array('I', [0])
+        boxes = array.array('d')
+        centers = array.array('d')
+        radii = array.array('d')
+        vertices = array.array('d')
+        normals = array.array('d')
+
+        for shape in shapes:
+            box = shape.box
+            radius = 0
+
+            if isinstance(shape, Line):
+                kinds.append(line_code)
+                vertices.extend(shape.head); vertices.extend(shape.tail)
+
+                # Lines store their normal, then the way they're facing.
+                facing = line_facing(shape)
+
+                normals.extend((0, 0) if shape.degenerate else shape.normal)
+                normals.extend((0, 0) if facing is None else facing)
+
+            elif isinstance(shape, Circle):
+                kinds.append(circle_code)
+                radius = shape.radius
+
+            elif isinstance(shape, Shape):
+                if isinstance(shape, Rectangle):
+                    kinds.append(rectangle_code)
+                else:
+                    kinds.append(polygon_code)
+
+                for vertex, normal in zip(shape.vertices, shape.normals):
+                    vertices.extend(vertex); normals.extend(normal)
+
+            else:
+                raise TypeError("Can't store %r in a level." % (shape,))
+
+            starts.append(len(vertices) // 2)
+            boxes.extend((box.left, box.top, box.right, box.bottom))
+            centers.extend(shape.center)
+            radii.append(radius)
+
+        grid = StaticLevel.build_grid(boxes, cell_size)
+        size, left, top, columns, rows, cell_starts, members = grid
+
+        sections = (kinds, starts, boxes, centers, radii, vertices, normals,
+                cell_starts, members)
+
+        if sys.byteorder != "little":
+            for section in sections: section.byteswap()
+
+        chunks = [header.pack(level_magic, level_version,
+                len(kinds), len(vertices) // 2, len(members),
+                columns, rows, size, left, top)]
+
+        for section in sections:
+            chunk = section.tostring()
+            chunks.append(chunk + b"\0" * (-len(chunk) % 8))
+
+        return b"".join(chunks)
+
+    @staticmethod
+    def build_grid(boxes, cell_size=None):
+        """ Return the cell size, the position, the dimensions, and the
+        contents of a grid covering the given flat array of boxes.  The
+        contents are two arrays: where each cell's list of shapes starts, and
+        all of those lists laid end to end. """
+        count = len(boxes) // 4
+
+        if not count:
+            return 1, 0, 0, 0, 0, array.array('I', [0]), array.array('I')
+
+        left = min(boxes[0::4]); right = max(boxes[2::4])
+        top = min(boxes[1::4]); bottom = max(boxes[3::4])
+
+        if cell_size is None:
+            widths = (boxes[k + 2] - boxes[k] for k in range(0, 4 * count, 4))
+            heights = (boxes[k + 3] - boxes[k + 1]
+                    for k in range(0, 4 * count, 4))
+
+            cell_size = 2 * sum(max(w, h) for w, h in zip(widths, heights))
+            cell_size = max(cell_size / count, 1)
+
+            while StaticLevel.count_cells(left, top, right, bottom,
+                    cell_size) > cells_per_shape * count:
+                cell_size *= 2
+
+        columns = int((right - left) // cell_size) + 1
+        rows = int((bottom - top) // cell_size) + 1
+
+        cells = [[] for cell in range(columns * rows)]
+
+        for index in range(count):
+            k = 4 * index
+            first_column = int((boxes[k] - left) // cell_size)
+            first_row = int((boxes[k + 1] - top) // cell_size)
+            last_column = int((boxes[k + 2] - left) // cell_size)
+            last_row = int((boxes[k + 3] - top) // cell_size)
+
+            for row in range(first_row, last_row + 1):
+                for column in range(first_column, last_column + 1):
+                    cells[row * columns + column].append(index)
+
+        cell_starts = array.array('I', [0])
+        members = array.array('I')
+
+        for cell in cells:
+            members.extend(cell)
+            cell_starts.append(len(members))
+
+        return cell_size, left, top, columns, rows, cell_starts, members
+
+    @staticmethod
+    def count_cells(left, top, right, bottom, cell_size):
+        columns = int((right - left) // cell_size) + 1
+        rows = int((bottom - top) // cell_size) + 1
+        return columns * rows
+    # }}}1
+
+    # Operators {{{1
+    def __init__(self, path):
+        """ Memory-map the level file at the given path. """
+        with open(path, 'rb') as file:
+            try:
+                self.__buffer = mmap.mmap(
+                        file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise FormatError("This file is empty.")
+
+        try:
+            fields = header.unpack_from(self.__buffer, 0)
+        except struct.error:
+            self.close()
+            raise FormatError("This file is too short to be a level.")
+
+        magic, version, shapes, vertices, members, columns, rows, \
+                size, left, top = fields
+
+        if magic != level_magic:
+            self.close()
+            raise FormatError("This file doesn't hold a level.")
+        if version != level_version:
+            self.close()
+            raise FormatError("Unsupported level version: %d" % version)
+
+        self.__count = shapes
+        self.__columns = columns; self.__rows = rows
+        self.__size = size; self.__left = left; self.__top = top
+
+        offset = header.size
+        offsets = []
+
+        for format, length in (
+                ('B', shapes), ('I', shapes + 1), ('d', 4 * shapes),
+                ('d', 2 * shapes), ('d', shapes),
+                ('d', 2 * vertices), ('d', 2 * vertices),
+                ('I', columns * rows + 1), ('I', members)):
+            offsets.append(offset)
+            length *= struct.calcsize(format)
+            offset += length + (-length % 8)
+
+        if offset > len(self.__buffer):
+            self.close()
+            raise FormatError("This level file is truncated.")
+
+        self.__kinds, self.__starts, self.__boxes, self.__centers, \
+                self.__radii, self.__vertices, self.__normals, \
+                self.__cell_starts, self.__members = offsets
+
+    def __len__(self):
+        return self.__count
+
+    def __iter__(self):
+        for index in range(self.__count):
+            yield self[index]
+
+    def __getitem__(self, index):
+        """ Build the shape stored at the given index. """
+        if not 0 <= index < self.__count:
+            raise IndexError("level index out of range")
+
+        buffer = self.__buffer
+        kind, = struct.unpack_from('<B', buffer, self.__kinds + index)
+
+        if kind == rectangle_code:
+            return Rectangle(*self.__box(index))
+
+        x, y = struct.unpack_from('<2d', buffer, self.__centers + 16 * index)
+        center = Vector(x, y)
+
+        if kind == circle_code:
+            offset = self.__radii + 8 * index
+            radius, = struct.unpack_from('<d', buffer, offset)
+            return Circle(center, radius)
+
+        start, end = struct.unpack_from('<2I', buffer,
+                self.__starts + 4 * index)
+        size = 2 * (end - start)
+
+        values = struct.unpack_from('<%dd' % size, buffer,
+                self.__vertices + 16 * start)
+        vertices = [Vector(values[k], values[k + 1])
+                for k in range(0, size, 2)]
+
+        values = struct.unpack_from('<%dd' % size, buffer,
+                self.__normals + 16 * start)
+        normals = [Vector(values[k], values[k + 1])
+                for k in range(0, size, 2)]
+
+        if kind == line_code:
+            facing = normals[1] if normals[1] else None
+            return Line(vertices[0], vertices[1], facing)
+
+        box = Rectangle(*self.__box(index))
+        return MappedPolygon(vertices, normals, center, box)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def close(self):
+        """ Unmap the level file. """
+        self.__buffer.close()
+
+    # Attributes {{{1
+    @property
+    def cell_size(self):
+        return self.__size
+
+    @property
+    def dimensions(self):
+        """ The number of columns and rows in the grid. """
+        return self.__columns, self.__rows
+
+    def get_cell_size(self): return self.cell_size
+    def get_dimensions(self): return self.dimensions
+
+    # Query Methods {{{1
+    def query(self, shape):
+        """ Return the index of every shape in the level with a box that
+        overlaps the box of the given shape, in sorted order. """
+        box = shape.box
+        left, top, right, bottom = box.left, box.top, box.right, box.bottom
+
+        found = set()
+        for start, end in self.__cells(left, top, right, bottom):
+            if end > start:
+                found.update(struct.unpack_from('<%dI' % (end - start),
+                        self.__buffer, self.__members + 4 * start))
+
+        unpack = struct.Struct('<4d').unpack_from
+        buffer = self.__buffer; offset = self.__boxes
+        results = []
+
+        for index in sorted(found):
+            l, t, r, b = unpack(buffer, offset + 32 * index)
+            if l <= right and r >= left and t <= bottom and b >= top:
+                results.append(index)
+
+        return results
+
+    def query_region(self, region):
+        """ Return the index of every shape in the level that is touching the
+        given region, which can be any line, circle, or shape. """
+        touching = Collisions.touching
+        return [index for index in self.query(region)
+                if touching(region, self[index])]
+
+    def query_point(self, point):
+        """ Return the index of every shape in the level that contains the
+        given point. """
+        point_inside = Collisions.point_inside
+        region = Rectangle.from_point(point)
+
+        return [index for index in self.query(region)
+                if point_inside(point, self[index])]
+
+    def raycast(self, origin, direction, max_distance):
+        """ Return the index of the first shape hit by the given ray and a
+        RayHit describing where it was hit, or None if the ray doesn't hit
+        anything within the given distance. """
+        end = origin + direction.normal * max_distance
+        raycast = Collisions.raycast
+
+        hits = []
+        for index in self.query(Line(origin, end)):
+            hit = raycast(origin, direction, max_distance, self[index])
+            if hit: hits.append((hit.distance, index, hit))
+
+        if not hits:
+            return None
+
+        distance, index, hit = min(hits)
+        return index, hit
+
+    # Helper Methods {{{1
+    def __box(self, index):
+        return struct.unpack_from('<4d', self.__buffer,
+                self.__boxes + 32 * index)
+
+    def __cells(self, left, top, right, bottom):
+        """ Yield the start and end of the list of shapes in every grid cell
+        that overlaps the given bounds. """
+        size = self.__size
+        columns = self.__columns; rows = self.__rows
+
+        first_column = max(int(math.floor((left - self.__left) / size)), 0)
+        first_row = max(int(math.floor((top - self.__top) / size)), 0)
+        last_column = min(int(math.floor((right - self.__left) / size)),
+                columns - 1)
+        last_row = min(int(math.floor((bottom - self.__top) / size)),
+                rows - 1)
+
+        unpack = struct.Struct('<2I').unpack_from
+        buffer = self.__buffer; offset = self.__cell_starts
+
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                yield unpack(buffer, offset + 4 * (row * columns + column))
+    # }}}1
+
+class MappedPolygon(Shape):
+    """ A convex polygon rebuilt from a level file.  The normals, center, and
+    box were calculated when the level was saved, so they are simply passed
+    in; only the edges are calculated, and only if they're needed. """
+
+    # Operators {{{1
+    def __init__(self, vertices, normals, center, box):
+        self.__vertices = vertices
+        self.__normals = normals
+        self.__center = center
+        self.__box = box
+        self.__edges = None
+
+    def __repr__(self):
+        return "MappedPolygon: %s" % (self.__vertices,)
+
+    # Attributes {{{1
+    @property
+    def edges(self):
+        if self.__edges is None:
+            self.__edges = Shape.find_edges(
+                    self.vertices, self.center, self.normals)
+        return self.__edges
+
+    @property
+    def vertices(self):
+        return self.__vertices
+
+    @property
+    def normals(self):
+        return self.__normals
+
+    @property
+    def center(self):
+        return self.__center
+
+    @property
+    def box(self):
+        return self.__box
+
+    @property
+    def pygame(self):
+        return [vertex.pygame for vertex in self.vertices]
+    # }}}1
+
+if __name__ == "__main__":
+    import os, random, tempfile
+    from shapes import *
+    from fixtures import random_shapes
+
+    # Helper Functions {{{1
+    def random_level(count, seed=0):
+        return random_shapes(count, size=1000, seed=seed,
+                kinds=("line", "circle", "rectangle", "polygon"))
+
+    def saved_level(shapes, cell_size=None):
+        handle, path = tempfile.mkstemp(suffix=".level")
+        os.close(handle)
+        StaticLevel.save(path, shapes, cell_size)
+        return path
+
+    # Storage Tests {{{1
+    def storage_tests():
+        shapes = random_level(200)
+        path = saved_level(shapes)
+
+        try:
+            with StaticLevel(path) as level:
+                assert len(level) == len(shapes)
+
+                for shape, copy in zip(shapes, level):
+                    assert shape.box == copy.box
+
+                    if isinstance(shape, Line):
+                        assert type(copy) is Line
+                        assert copy.points == shape.points
+                        assert copy.normal == shape.normal
+                        assert line_facing(copy) == line_facing(shape)
+                    elif isinstance(shape, Circle):
+                        assert copy == shape
+                    elif isinstance(shape, Rectangle):
+                        assert type(copy) is Rectangle
+                        assert copy == shape
+                    else:
+                        assert copy.vertices == shape.vertices
+                        assert copy.normals == shape.normals
+                        assert copy.edges == shape.edges
+
+                try: level[len(shapes)]
+                except IndexError: pass
+                else: raise AssertionError
+
+            # An empty level has an empty grid.
+            StaticLevel.save(path, [])
+            with StaticLevel(path) as level:
+                assert len(level) == 0
+                assert level.query(Rectangle(0, 0, 10, 10)) == []
+
+            # Files that aren't levels are rejected.
+            with open(path, 'wb') as file:
+                file.write(b"PICK" + StaticLevel.pack(shapes)[4:])
+
+            try: StaticLevel(path)
+            except FormatError: pass
+            else: raise AssertionError
+
+        finally:
+            os.remove(path)
+
+    # Query Tests {{{1
+    def query_tests():
+        shapes = random_level(400)
+        generator = random.Random(1)
+
+        for cell_size in (None, 16, 250, 5000):
+            path = saved_level(shapes, cell_size)
+
+            try:
+                with StaticLevel(path) as level:
+                    for probe in random_level(40, seed=2):
+                        expected = [index for index, shape in enumerate(shapes)
+                                if Collisions.touching(probe, shape)]
+                        assert level.query_region(probe) == expected
+
+                    for trial in range(40):
+                        point = Vector(generator.uniform(-50, 1050),
+                                       generator.uniform(-50, 1050))
+                        expected = [index for index, shape in enumerate(shapes)
+                                if Collisions.point_inside(point, shape)]
+                        assert level.query_point(point) == expected
+
+                    for trial in range(20):
+                        origin = Vector(generator.uniform(0, 1000),
+                                        generator.uniform(0, 1000))
+                        direction = Vector.from_radians(
+                                generator.uniform(0, 6.3))
+
+                        hits = []
+                        for index, shape in enumerate(shapes):
+                            hit = Collisions.raycast(
+                                    origin, direction, 300, shape)
+                            if hit: hits.append((hit.distance, index))
+
+                        result = level.raycast(origin, direction, 300)
+
+                        if not hits:
+                            assert result is None
+                        else:
+                            assert result[0] == min(hits)[1]
+            finally:
+                os.remove(path)
+
+    # }}}1
+
+    print "Testing level.py..."
+
+    storage_tests()
+    query_tests()
+
+    print "All tests passed."
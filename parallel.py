@@ -0,0 +1,213 @@
+""" The parallel module spreads collision detection across a pool of worker
+processes.  Python can only run one thread at a time, so this is the only way
+to keep more than one core busy.  There are two entry points:
+
+touching_in_scenes() takes a list of independent scenes, like the rooms on a
+game server, and finds the touching pairs in each one.  Every scene is handled
+by a single worker.
+
+touching_in_scene() takes one large scene and cuts it into vertical strips.
+Shapes that straddle the border between two strips are sent to both, and each
+pair is only reported by the strip holding the left edge of the overlap
+between the pair's boxes, so no pair is ever reported twice.
+
+In both cases the shapes are sent to the workers in the compact binary format
+from the serialization module rather than as pickled objects, and the workers
+use the same broad phase and narrow phase functions as everything else.  The
+pairs come back as indices, are sorted, and are then translated back into the
+original shapes, so the results are always the same no matter how the work
+was divided.  Inputs that are too small to be worth the overhead are handled
+serially, in the calling process. """
+
+from __future__ import division
+
+import array
+import multiprocessing
+
+import serialization
+from broadphase import SpatialHash
+
+# Constants {{{1
+# Inputs with fewer shapes than this are never sent to the pool.
+serial_threshold = 2000
+# }}}1
+
+# Entry Points {{{1
+def touching_in_scenes(scenes, processes=None, pool=None,
+        threshold=serial_threshold):
+    """ Return a list of touching pairs for each of the given scenes.  Each
+    scene is a list of shapes, and each list of pairs is sorted by the
+    positions of the shapes in their scene.  If a pool is given, it is used
+    instead of starting a new one. """
+
+    scenes = [list(scene) for scene in scenes]
+    total = sum(len(scene) for scene in scenes)
+
+    if total < threshold or processes == 1:
+        results = [find_touching(scene) for scene in scenes]
+    else:
+        tasks = [serialization.dumps(scene) for scene in scenes]
+        results = map_tasks(touching_task, tasks, processes, pool)
+
+    return [[(scene[i], scene[j]) for i, j in pairs]
+            for scene, pairs in zip(scenes, results)]
+
+def touching_in_scene(shapes, processes=None, pool=None,
+        threshold=serial_threshold, strips=None):
+    """ Return every pair of touching shapes in the given scene, sorted by the
+    positions of the shapes in the list.  The scene is divided into the given
+    number of strips, which defaults to a few per process. """
+
+    shapes = list(shapes)
+
+    if len(shapes) < threshold or processes == 1:
+        pairs = find_touching(shapes)
+        return [(shapes[i], shapes[j]) for i, j in pairs]
+
+    if strips is None:
+        strips = 4 * (processes or multiprocessing.cpu_count())
+
+    boxes = [shape.box for shape in shapes]
+    borders = find_borders(boxes, strips)
+
+    tasks = []
+    for low, high in zip(borders[:-1], borders[1:]):
+        members = [index for index, box in enumerate(boxes)
+                if box.left <= high and box.right >= low]
+
+        if len(members) < 2:
+            continue
+
+        encoded = serialization.dumps([shapes[index] for index in members])
+        tasks.append((encoded, array.array('l', members), low, high))
+
+    results = map_tasks(strip_task, tasks, processes, pool)
+    pairs = sorted(pair for result in results for pair in result)
+
+    return [(shapes[i], shapes[j]) for i, j in pairs]
+# }}}1
+
+# Workers {{{1
+def touching_task(encoded):
+    """ Find the touching pairs in one whole scene. """
+    return find_touching(serialization.loads(encoded))
+
+def strip_task(task):
+    """ Find the touching pairs in one strip of a scene, and translate them
+    back into the indices of the whole scene.  A pair is only kept if the
+    left edge of the overlap between its boxes is inside the strip. """
+    encoded, members, low, high = task
+    strip = serialization.loads(encoded)
+    pairs = []
+
+    for i, j in find_touching(strip):
+        left = max(strip[i].box.left, strip[j].box.left)
+
+        if low <= left < high:
+            pairs.append((members[i], members[j]))
+
+    return pairs
+
+def map_tasks(function, tasks, processes=None, pool=None):
+    """ Run the given function on every task using a process pool, and return
+    the results in the same order as the tasks. """
+    if not tasks:
+        return []
+
+    if pool is not None:
+        return pool.map(function, tasks)
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(function, tasks)
+    finally:
+        pool.close()
+        pool.join()
+# }}}1
+
+# Serial Methods {{{1
+def find_touching(shapes, cell_size=None):
+    """ Return the (i, j) index pairs of every touching pair of shapes, with
+    i < j, in sorted order.  This runs entirely in the calling process. """
+    if len(shapes) < 2:
+        return []
+
+    if cell_size is None:
+        cell_size = find_cell_size(shapes)
+
+    grid = SpatialHash(cell_size)
+    indices = {}
+
+    for index, shape in enumerate(shapes):
+        indices[shape] = index
+        grid.insert(shape)
+
+    pairs = []
+    for first, second in grid.touching():
+        i = indices[first]; j = indices[second]
+        pairs.append((i, j) if i < j else (j, i))
+
+    pairs.sort()
+    return pairs
+
+def find_cell_size(shapes):
+    """ Pick a grid cell that's about twice as big as a typical shape. """
+    total = 0
+    for shape in shapes:
+        box = shape.box
+        total += max(box.width, box.height)
+
+    return max(2 * total / len(shapes), 1)
+
+def find_borders(boxes, strips):
+    """ Divide the x-axis into strips that each hold about the same number of
+    boxes.  The outer borders are infinite, so every box is in some strip. """
+    centers = sorted((box.left + box.right) / 2 for box in boxes)
+    count = len(centers)
+
+    inner = [centers[index * count // strips] for index in range(1, strips)]
+    inner = sorted(set(inner))
+
+    return [-float('inf')] + inner + [float('inf')]
+# }}}1
+
+if __name__ == "__main__":
+    from vector import *
+    from shapes import *
+    from fixtures import random_shapes, brute_force_touching
+
+    # Parallel Tests {{{1
+    def parallel_tests():
+        kinds = "circle", "rectangle", "polygon", "line"
+        pool = multiprocessing.Pool(2)
+
+        try:
+            scenes = [random_shapes(count, seed=count, kinds=kinds)
+                    for count in (0, 1, 50, 120, 200)]
+            expected = [brute_force_touching(scene) for scene in scenes]
+
+            # The results should be the same whether or not the pool is used.
+            assert touching_in_scenes(scenes) == expected
+            assert touching_in_scenes(scenes, pool=pool, threshold=0) \
+                    == expected
+
+            scene = random_shapes(400, kinds=kinds)
+            expected = brute_force_touching(scene)
+
+            assert touching_in_scene(scene) == expected
+
+            for strips in (1, 2, 7):
+                assert touching_in_scene(scene, pool=pool,
+                        threshold=0, strips=strips) == expected
+
+        finally:
+            pool.close()
+            pool.join()
+
+    # }}}1
+
+    print "Testing parallel.py..."
+
+    parallel_tests()
+
+    print "All tests passed."
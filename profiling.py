@@ -0,0 +1,264 @@
+""" The profiling module counts how often each collision function is called
+and how long it takes.  Profiling is off by default.  Turning it on replaces
+every static method of the Collisions class with a wrapper that records each
+call, and turning it off puts the original functions back, so code that isn't
+being profiled runs exactly the same functions it always did.
+
+Since the functions in the collisions module call each other through the
+Collisions class, the wrappers also see which function called which.  This
+shows, for example, how often shapes_touching() took the fast path for a pair
+of rectangles rather than the generic separating axis test.
+
+Objects that looked up a collision function before profiling was turned on,
+like a CollisionWorld created with the default narrow phase, keep calling the
+original function.  Calls made through them are only counted when they reach
+another function through the Collisions class. """
+
+from __future__ import division
+
+import timeit
+
+from collisions import Collisions
+
+class CollisionProfiler(object):
+    """ Records the number of calls to each function in the Collisions class,
+    the total time spent in each one, and the function that called it.  The
+    profiler can be turned on and off with enable() and disable(), or used as
+    a context manager.  Only one profiler can be enabled at a time.  Times
+    are measured with timeit.default_timer() and include the time spent in
+    any functions that were called in turn. """
+
+    # The profiler that is currently enabled, if any.
+    active = None
+
+    # Operators {{{1
+    def __init__(self):
+        self.__originals = {}
+        self.__stack = []
+
+        self.__calls = {}
+        self.__times = {}
+        self.__callers = {}
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exception):
+        self.disable()
+
+    # Attributes {{{1
+    @property
+    def enabled(self):
+        return CollisionProfiler.active is self
+
+    def get_enabled(self): return self.enabled
+
+    # Switches {{{1
+    def enable(self):
+        """ Start recording calls to the collision functions. """
+        if CollisionProfiler.active is not None:
+            raise RuntimeError("Another profiler is already enabled.")
+
+        for name, value in vars(Collisions).items():
+            if isinstance(value, staticmethod):
+                function = value.__get__(None, Collisions)
+                self.__originals[name] = value
+                setattr(Collisions, name, staticmethod(
+                    self.__wrap(name, function)))
+
+        CollisionProfiler.active = self
+
+    def disable(self):
+        """ Stop recording calls and restore the original functions. """
+        if not self.enabled:
+            return
+
+        for name, value in self.__originals.items():
+            setattr(Collisions, name, value)
+
+        self.__originals.clear()
+        del self.__stack[:]
+        CollisionProfiler.active = None
+
+    def reset(self):
+        """ Forget everything that has been recorded so far. """
+        self.__calls.clear()
+        self.__times.clear()
+        self.__callers.clear()
+
+    # Results {{{1
+    def snapshot(self):
+        """ Return a dictionary with an entry for every function that has
+        been called.  Each entry holds the number of calls, the total time in
+        seconds, and the number of calls made by each of the other collision
+        functions.  The entry for shapes_touching() also counts how often the
+        rectangle fast path and the generic path were taken. """
+        results = {}
+
+        for name, calls in self.__calls.items():
+            results[name] = {
+                    "calls": calls,
+                    "time": self.__times[name],
+                    "callers": {} }
+
+        for (caller, name), calls in self.__callers.items():
+            results[name]["callers"][caller] = calls
+
+        if "shapes_touching" in results:
+            results["shapes_touching"]["paths"] = {
+                    "box": self.__count("shapes_touching", "boxes_touching"),
+                    "generic": self.__count(
+                        "shapes_touching", "polygons_touching") }
+
+        return results
+
+    def report(self):
+        """ Return a table of the recorded functions, sorted by the total
+        time spent in each one. """
+        results = self.snapshot()
+        lines = ["%-28s %10s %12s %12s" % (
+            "function", "calls", "total (ms)", "each (us)")]
+
+        for name in sorted(results, key=lambda name: -results[name]["time"]):
+            calls = results[name]["calls"]
+            time = results[name]["time"]
+
+            lines.append("%-28s %10d %12.3f %12.3f" % (
+                name, calls, 1e3 * time, 1e6 * time / calls))
+
+        return "\n".join(lines)
+
+    # Helper Methods {{{1
+    def __wrap(self, name, function):
+        calls = self.__calls; times = self.__times
+        callers = self.__callers; stack = self.__stack
+        timer = timeit.default_timer
+
+        def wrapper(*arguments, **keywords):
+            if stack:
+                key = stack[-1], name
+                callers[key] = callers.get(key, 0) + 1
+
+            stack.append(name)
+            start = timer()
+
+            try:
+                return function(*arguments, **keywords)
+            finally:
+                times[name] = times.get(name, 0) + timer() - start
+                calls[name] = calls.get(name, 0) + 1
+                stack.pop()
+
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+
+    def __count(self, caller, name):
+        return self.__callers.get((caller, name), 0)
+    # }}}1
+
+if __name__ == "__main__":
+    from vector import *
+    from shapes import *
+    from world import CollisionWorld
+
+    # Switch Tests {{{1
+    def switch_tests():
+        originals = dict(vars(Collisions))
+        profiler = CollisionProfiler()
+
+        assert not profiler.enabled
+
+        with profiler:
+            assert profiler.enabled
+            assert CollisionProfiler.active is profiler
+            assert vars(Collisions)["touching"] is not originals["touching"]
+
+            try: CollisionProfiler().enable()
+            except RuntimeError: pass
+            else: raise AssertionError
+
+        # Once the profiler is off, the original functions are back.
+        assert not profiler.enabled
+        assert CollisionProfiler.active is None
+        assert vars(Collisions) == originals
+
+        # Errors are passed through, and still turn the profiler off.
+        try:
+            with profiler:
+                Collisions.touching(None, None)
+        except AttributeError: pass
+        else: raise AssertionError
+
+        assert vars(Collisions) == originals
+        assert profiler.snapshot()["touching"]["calls"] == 1
+
+    # Counter Tests {{{1
+    def counter_tests():
+        box = Rectangle(0, 0, 10, 10)
+        other = Rectangle(5, 5, 15, 15)
+        triangle = Polygon.from_regular(Vector(8, 8), 5, 3)
+
+        with CollisionProfiler() as profiler:
+            for index in range(3):
+                Collisions.touching(box, other)
+            Collisions.touching(box, triangle)
+            Collisions.shapes_touching(other, triangle)
+            Collisions.point_inside(Vector(1, 1), box)
+
+        results = profiler.snapshot()
+
+        assert results["touching"]["calls"] == 4
+        assert results["touching"]["callers"] == {}
+        assert results["shapes_touching"]["calls"] == 5
+        assert results["shapes_touching"]["callers"] == {"touching": 4}
+        assert results["shapes_touching"]["paths"] == {
+                "box": 3, "generic": 2 }
+
+        assert results["boxes_touching"]["calls"] == 3
+        assert results["polygons_touching"]["calls"] == 2
+        assert results["point_inside_shape"]["callers"] == {"point_inside": 1}
+
+        for name, result in results.items():
+            assert result["time"] >= 0
+            assert name in profiler.report()
+
+        # Functions that were never called don't show up at all.
+        assert "raycast" not in results
+
+        # Calls made while the profiler is off aren't counted.
+        Collisions.touching(box, other)
+        assert profiler.snapshot() == results
+
+        profiler.reset()
+        assert profiler.snapshot() == {}
+
+    # World Tests {{{1
+    def world_tests():
+        shapes = [Circle(Vector(0, 0), 5), Circle(Vector(8, 0), 5),
+                  Rectangle(20, 0, 30, 10), Rectangle(25, 5, 35, 15)]
+
+        with CollisionProfiler() as profiler:
+            world = CollisionWorld()
+            for shape in shapes:
+                world.insert(shape)
+
+            entered, stayed, exited = world.step()
+
+        results = profiler.snapshot()
+
+        assert len(entered) == 2
+        assert results["touching"]["calls"] == 2
+        assert results["circles_touching"]["calls"] == 1
+        assert results["shapes_touching"]["paths"]["box"] == 1
+
+    # }}}1
+
+    print "Testing profiling.py..."
+
+    switch_tests()
+    counter_tests()
+    world_tests()
+
+    print "All tests passed."
@@ -0,0 +1,343 @@
+""" The serialization module packs vectors and shapes into a compact binary
+format, for saving snapshots of a scene or for sending one to another process.
+Only the data needed to rebuild each shape is stored: the coordinates of a
+vector, the points of a line, the center and radius of a circle, the sides of
+a rectangle, and the vertices of a polygon.  Everything else, like normals,
+edges, and boxes, is calculated again the first time it's needed.
+
+The format is little-endian and starts with a short header holding a magic
+string, a version number, and the number of objects.  Next comes one code per
+object, and then all the numbers for each kind of object, stored together.
+This layout lets loads() read each kind of object with a single call to
+struct.unpack_from(), directly from any buffer: a string, a bytearray, a
+memoryview, or a memory-mapped file.
+
+Lines keep the way they're facing, if they have one.  A line facing the null
+vector isn't facing either way, so it's loaded without a facing.  Mutable
+shapes are stored as their immutable counterparts, and any other shape with
+vertices is stored as a polygon. """
+
+from __future__ import division
+
+import array, struct, sys
+
+from vector import Vector, MutableVector
+from shapes import Line, Circle, Shape, Rectangle, Polygon
+
+# Format Constants {{{1
+format_magic = b"SHPS"
+format_version = 1
+
+header = struct.Struct("<4sHI")
+
+vector_code = 0
+line_code = 1
+circle_code = 2
+rectangle_code = 3
+polygon_code = 4
+
+# Lines can optionally store which way they're facing.
+facing_flag = 1
+# }}}1
+
+class FormatError(Exception):
+    """ Raised when a buffer doesn't hold shapes in a format that can be
+    read. """
+    pass
+
+# Encoding {{{1
+def dumps(shapes):
+    """ Return a string holding all of the given vectors and shapes. """
+    codes = array.array('B')
+    vectors = array.array('d')
+    lines = array.array('d')
+    flags = array.array('B')
+    circles = array.array('d')
+    rectangles = array.array('d')
+    polygons = array.array('d')
+    sizes = []
+
+    for shape in shapes:
+        if isinstance(shape, (Vector, MutableVector)):
+            codes.append(vector_code)
+            vectors.extend(shape)
+
+        elif isinstance(shape, Line):
+            codes.append(line_code)
+            lines.extend(shape.head); lines.extend(shape.tail)
+
+            facing = line_facing(shape)
+            if facing is None:
+                flags.append(0)
+            else:
+                flags.append(facing_flag)
+                lines.extend(facing)
+
+        elif isinstance(shape, Circle):
+            codes.append(circle_code)
+            circles.extend(shape.center); circles.append(shape.radius)
+
+        elif isinstance(shape, Rectangle):
+            codes.append(rectangle_code)
+            rectangles.extend((
+                shape.left, shape.top, shape.right, shape.bottom))
+
+        elif isinstance(shape, Shape):
+            codes.append(polygon_code)
+            vertices = shape.vertices
+            sizes.append(len(vertices))
+            for vertex in vertices:
+                polygons.extend(vertex)
+
+        else:
+            raise TypeError("Can't serialize %r." % (shape,))
+
+    return b"".join((
+        header.pack(format_magic, format_version, len(codes)),
+        codes.tostring(),
+        pack_numbers(vectors),
+        flags.tostring(), pack_numbers(lines),
+        pack_numbers(circles),
+        pack_numbers(rectangles),
+        struct.pack("<%dI" % len(sizes), *sizes), pack_numbers(polygons)))
+
+def line_facing(line):
+    """ Return the way the given line is facing, or None if it isn't facing
+    either way.  This doesn't rely on the assertion in Line.facing, so it gives
+    the same answer when assertions are turned off. """
+    try: facing = line.facing
+    except AssertionError: return None
+    return facing if facing else None
+
+def pack_numbers(numbers):
+    """ Return the given array of doubles as a little-endian string. """
+    if sys.byteorder != "little":
+        numbers = array.array('d', numbers)
+        numbers.byteswap()
+    return numbers.tostring()
+# }}}1
+
+# Decoding {{{1
+def loads(buffer, offset=0):
+    """ Return a list of the vectors and shapes stored in the given buffer,
+    starting at the given offset.  Polygons are trusted to still be
+    convex. """
+    try:
+        return read_shapes(buffer, offset)
+    except struct.error as error:
+        raise FormatError("Truncated buffer: %s" % error)
+
+def read_shapes(buffer, offset):
+    magic, version, count = header.unpack_from(buffer, offset)
+    offset += header.size
+
+    if magic != format_magic:
+        raise FormatError("This buffer doesn't hold any shapes.")
+    if version != format_version:
+        raise FormatError("Unsupported format version: %d" % version)
+
+    def unpack(format, count):
+        values = struct.unpack_from("<%d%s" % (count, format), buffer, offset)
+        return values, offset + count * struct.calcsize(format)
+
+    codes, offset = unpack('B', count)
+
+    for code in codes:
+        if code > polygon_code:
+            raise FormatError("Unknown shape code: %d" % code)
+
+    tallies = [codes.count(code) for code in range(5)]
+
+    # Vectors
+    values, offset = unpack('d', 2 * tallies[vector_code])
+    vectors = [Vector(values[k], values[k + 1])
+            for k in xrange(0, len(values), 2)]
+
+    # Lines
+    flags, offset = unpack('B', tallies[line_code])
+    facings = sum(1 for flag in flags if flag & facing_flag)
+    values, offset = unpack('d', 4 * len(flags) + 2 * facings)
+
+    lines = []; k = 0
+    for flag in flags:
+        head = Vector(values[k], values[k + 1])
+        tail = Vector(values[k + 2], values[k + 3])
+        k += 4
+
+        if flag & facing_flag:
+            lines.append(Line(head, tail, Vector(values[k], values[k + 1])))
+            k += 2
+        else:
+            lines.append(Line(head, tail))
+
+    # Circles
+    values, offset = unpack('d', 3 * tallies[circle_code])
+    circles = [Circle(Vector(values[k], values[k + 1]), values[k + 2])
+            for k in xrange(0, len(values), 3)]
+
+    # Rectangles
+    values, offset = unpack('d', 4 * tallies[rectangle_code])
+    rectangles = [Rectangle(*values[k : k + 4])
+            for k in xrange(0, len(values), 4)]
+
+    # Polygons
+    sizes, offset = unpack('I', tallies[polygon_code])
+    values, offset = unpack('d', 2 * sum(sizes))
+
+    polygons = []; k = 0
+    for size in sizes:
+        vertices = [Vector(values[j], values[j + 1])
+                for j in xrange(k, k + 2 * size, 2)]
+        polygons.append(Polygon(vertices, trusted=True))
+        k += 2 * size
+
+    kinds = [iter(vectors), iter(lines), iter(circles),
+            iter(rectangles), iter(polygons)]
+
+    return [next(kinds[code]) for code in codes]
+# }}}1
+
+if __name__ == "__main__":
+    import pickle
+    from shapes import *
+    from fixtures import random_shapes
+
+    # Helper Functions {{{1
+    kinds = "vector", "line", "circle", "rectangle", "polygon"
+
+    def assert_same(shape, copy):
+        if isinstance(shape, Vector):
+            assert type(copy) is Vector
+            assert copy == shape
+        elif isinstance(shape, Line):
+            assert type(copy) is Line
+            assert copy.points == shape.points
+            assert copy.normal == shape.normal
+        elif isinstance(shape, Circle):
+            assert isinstance(copy, Circle)
+            assert copy == shape
+        elif isinstance(shape, Rectangle):
+            assert isinstance(copy, Rectangle)
+            assert copy == shape
+        else:
+            assert copy.vertices == shape.vertices
+            assert copy.normals == shape.normals
+            assert copy.box == shape.box
+
+    # Round Trip Tests {{{1
+    def round_trip_tests():
+        shapes = random_shapes(200, kinds=kinds)
+        data = dumps(shapes)
+
+        for buffer in (data, bytearray(data), memoryview(data)):
+            copies = loads(buffer)
+            assert len(copies) == len(shapes)
+
+            for shape, copy in zip(shapes, copies):
+                assert_same(shape, copy)
+
+        # The buffer can be part of a larger one.
+        copies = loads(b"padding" + data, len(b"padding"))
+        assert len(copies) == len(shapes)
+
+        assert loads(dumps([])) == []
+
+        # Lines keep the way they're facing.
+        head, tail = Vector(0, 0), Vector(10, 0)
+        facings = [Vector(0, 1), Vector(0, -1), None, Vector.null()]
+        lines = [Line(head, tail, facing) for facing in facings]
+
+        for line, copy in zip(lines, loads(dumps(lines))):
+            assert copy.points == line.points
+            assert line_facing(copy) == line_facing(line)
+
+        assert line_facing(lines[0]) == Vector(0, 1)
+        assert line_facing(lines[3]) is None
+
+        # Mutable shapes are loaded as immutable ones.
+        mutables = [MutableVector(1, 2), MutableCircle(Vector(1, 2), 3),
+                MutableRectangle(1, 2, 3, 4)]
+
+        vector, circle, box = loads(dumps(mutables))
+
+        assert type(vector) is Vector and vector == Vector(1, 2)
+        assert type(circle) is Circle and circle == Circle(Vector(1, 2), 3)
+        assert type(box) is Rectangle and box == Rectangle(1, 2, 3, 4)
+
+        # Any other shape is loaded as a polygon.
+        square = Polygon.from_regular(Vector(0, 0), 10, 4)
+        transform = Transform.from_translation(Vector(5, 5))
+        moved = TransformedShape(square, transform)
+        copy, = loads(dumps([moved]))
+
+        assert type(copy) is Polygon
+        assert copy.vertices == moved.vertices
+
+    # Error Tests {{{1
+    def error_tests():
+        data = dumps(random_shapes(20, kinds=kinds))
+
+        for bad in (data[:-1], data[:5], b"PICK" + data[4:]):
+            try: loads(bad)
+            except FormatError: pass
+            else: raise AssertionError
+
+        # The shape codes come right after the header.
+        corrupt = bytearray(dumps([Circle(Vector(1, 2), 3)]))
+        corrupt[header.size] = 9
+
+        try: loads(corrupt)
+        except FormatError: pass
+        else: raise AssertionError
+
+        newer = header.pack(format_magic, format_version + 1, 0)
+        try: loads(newer)
+        except FormatError: pass
+        else: raise AssertionError
+
+        try: dumps([object()])
+        except TypeError: pass
+        else: raise AssertionError
+
+    # Pickle Tests {{{1
+    def pickle_tests():
+        shapes = random_shapes(50, kinds=kinds)
+        shapes += [MutableCircle(Vector(1, 2), 3),
+                MutableRectangle(1, 2, 3, 4)]
+
+        # Touch the derived attributes, so they'd be pickled if they could be.
+        for shape in shapes:
+            if not isinstance(shape, Vector): shape.box
+
+        for protocol in (0, pickle.HIGHEST_PROTOCOL):
+            copies = pickle.loads(pickle.dumps(shapes, protocol))
+
+            for shape, copy in zip(shapes, copies):
+                assert type(copy) is type(shape)
+                if isinstance(shape, (Vector, Line, Polygon)):
+                    assert_same(shape, copy)
+                else:
+                    assert copy == shape
+
+        # Only the primary data should be pickled.
+        square = Polygon.from_regular(Vector(0, 0), 10, 4)
+        before = len(pickle.dumps(square, 2))
+        square.edges; square.box
+        assert len(pickle.dumps(square, 2)) == before
+
+        transform = Transform(Vector(1, 2), 0.5, 2)
+        moved = TransformedShape(square, transform)
+        copy = pickle.loads(pickle.dumps(moved, 2))
+
+        assert copy.transform == transform
+        assert copy.vertices == moved.vertices
+
+    # }}}1
+
+    print "Testing serialization.py..."
+
+    round_trip_tests()
+    error_tests()
+    pickle_tests()
+
+    print "All tests passed."
@@ -8,6 +8,8 @@ arguments = dict(
         author = "Kale Kundert",
         author_email = "kale@thekunderts.net",
 
-        py_modules = ("vector", "shapes", "collisions") )
+        py_modules = (
+            "vector", "shapes", "collisions", "broadphase", "world",
+            "parallel", "serialization", "level", "profiling") )
 
 setup(**arguments)
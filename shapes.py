@@ -9,7 +9,10 @@ to draw shapes.  In addition, the vertical axis is assumed to increase going
 down the screen.  This only matters for functions that explicitly refer to the
 "top" or the "bottom" of particular shapes.
 
-All of the shape classes are immutable and are not meant to be subclassed. """
+All of the shape classes are immutable and are not meant to be subclassed,
+except for the mutable circles and rectangles at the end of the module.  Those
+are meant for objects that move every frame, and they can be used anywhere
+their immutable counterparts can. """
 
 from __future__ import division
 
@@ -40,13 +43,14 @@ class Line(object):
         self.__head = head
         self.__tail = tail
         self.__facing = facing
+        self.__normal = None
+        self.__degenerate = None
+        self.__box = None
 
-        try:
-            self.__normal = (head - tail).get_orthonormal()
-            self.__degenerate = False
-        except NullVectorError:
-            self.__normal = None
-            self.__degenerate = True
+    def __reduce__(self):
+        """ Pickle lines using their points, so the normal and the box are
+        calculated again when they are next needed. """
+        return Line, (self.__head, self.__tail, self.__facing)
 
     def __eq__(self, other):
         if self.facing != other.facing:
@@ -74,6 +78,8 @@ class Line(object):
 
     @property
     def degenerate(self):
+        if self.__degenerate is None:
+            self.__find_normal()
         return self.__degenerate
 
     @property
@@ -83,6 +89,8 @@ class Line(object):
 
     @property
     def normal(self):
+        if self.__degenerate is None:
+            self.__find_normal()
         assert self.__normal
         return self.__normal
 
@@ -98,6 +106,12 @@ class Line(object):
     def direction(self):
         return self.head - self.tail
 
+    @property
+    def box(self):
+        if self.__box is None:
+            self.__box = Rectangle.from_corners(self.head, self.tail)
+        return self.__box
+
     @property
     def pygame(self):
         return (self.tail, self.head)
@@ -112,10 +126,21 @@ class Line(object):
     def get_center(self): return self.center
     def get_points(self): return self.points
     def get_direction(self): return self.direction
+    def get_box(self): return self.box
 
     def get_pygame(self): return self.pygame
     # }}}1
 
+    # Helper Methods {{{1
+    def __find_normal(self):
+        try:
+            self.__normal = (self.head - self.tail).get_orthonormal()
+            self.__degenerate = False
+        except NullVectorError:
+            self.__normal = None
+            self.__degenerate = True
+    # }}}1
+
 class Circle(object):
     """ Represents a circle with just a center and a radius. """
 
@@ -137,7 +162,11 @@ class Circle(object):
     def __init__(self, center, radius):
         self.__center = center
         self.__radius = radius
-        self.__box = Rectangle.from_circle(self)
+        self.__box = None
+
+    def __reduce__(self):
+        """ Pickle circles using their center and radius. """
+        return Circle, (self.__center, self.__radius)
 
     def __eq__(self, other):
         return (self.center == other.center and
@@ -157,6 +186,8 @@ class Circle(object):
 
     @property
     def box(self):
+        if self.__box is None:
+            self.__box = Rectangle.from_circle(self)
         return self.__box
 
     @property
@@ -194,6 +225,12 @@ class Shape(object):
     @property
     def vertices(self): raise NotImplementedError
 
+    @property
+    def normals(self):
+        """ The outward unit normal of each edge.  The edge that starts at the
+        n-th vertex has the n-th normal. """
+        return Shape.find_normals(self.vertices, self.center)
+
     @property
     def center(self): raise NotImplementedError
     @property
@@ -204,6 +241,7 @@ class Shape(object):
 
     def get_edges(self): return self.edges
     def get_vertices(self): return self.vertices
+    def get_normals(self): return self.normals
 
     def get_center(self): return self.center
     def get_box(self): return self.box
@@ -236,8 +274,8 @@ class Shape(object):
         return sum(vertices, Vector.null()) / len(vertices)
 
     @staticmethod
-    def find_edges(vertices, center):
-        edges = []
+    def find_normals(vertices, center):
+        normals = []
         for head, tail in Polygon.yield_vertices(vertices, 2):
 
             direction = (head - tail).get_orthogonal()
@@ -247,6 +285,19 @@ class Shape(object):
             if Vector.dot(normal, reference) > 0:
                 normal = -normal
 
+            normals.append(normal)
+
+        return normals
+
+    @staticmethod
+    def find_edges(vertices, center, normals=None):
+        if normals is None:
+            normals = Shape.find_normals(vertices, center)
+
+        edges = []
+        pairs = Polygon.yield_vertices(vertices, 2)
+
+        for (head, tail), normal in zip(pairs, normals):
             edge = Line(head, tail, normal)
             edges.append(edge)
 
@@ -273,10 +324,11 @@ class Polygon(Shape):
 
     # Factory Methods {{{1
     @staticmethod
-    def from_vertices(vertices):
+    def from_vertices(vertices, trusted=False):
         """ Create a polygon from a list of vertices.  This resulting shape
-        must must convex; an assertion will fail if it isn't. """
-        return Polygon(vertices)
+        must must convex; an assertion will fail if it isn't.  The check can
+        be skipped for vertices that are already known to be convex. """
+        return Polygon(vertices, trusted)
 
     @staticmethod
     def from_regular(center, radius, sides, angle=0):
@@ -284,35 +336,61 @@ class Polygon(Shape):
         vertices = []
 
         for index in range(sides):
-            normal = Vector.from_radians(2 * pi * index / sides + angle)
+            normal = Vector.from_radians(2 * math.pi * index / sides + angle)
             vertex = center + radius * normal
             vertices.append(vertex)
 
-        return Polygon(vertices)
+        # Regular polygons are always convex.
+        return Polygon(vertices, trusted=True)
     # }}}1
 
     # Operators {{{1
-    def __init__(self, vertices):
-        self.__vertices = Polygon.check_vertices(vertices)
-        self.__center = Polygon.find_center(vertices)
-        self.__edges = Polygon.find_edges(vertices, self.__center)
-        self.__box = Rectangle.from_shape(self)
+    def __init__(self, vertices, trusted=False):
+        """ Create a polygon from a list of vertices.  Everything derived from
+        the vertices is only calculated the first time it's needed, so a
+        polygon that is trusted to be convex costs very little to create. """
+        if not trusted:
+            Polygon.check_vertices(vertices)
+
+        self.__vertices = vertices
+        self.__center = None
+        self.__normals = None
+        self.__edges = None
+        self.__box = None
+
+    def __reduce__(self):
+        """ Pickle polygons using their vertices alone.  The vertices were
+        already checked when this polygon was created, so they're trusted. """
+        return Polygon, (self.__vertices, True)
 
     # Attributes {{{1
     @property
     def edges(self):
+        if self.__edges is None:
+            self.__edges = Polygon.find_edges(
+                    self.vertices, self.center, self.normals)
         return self.__edges
 
     @property
     def vertices(self):
         return self.__vertices
 
+    @property
+    def normals(self):
+        if self.__normals is None:
+            self.__normals = Polygon.find_normals(self.vertices, self.center)
+        return self.__normals
+
     @property
     def box(self):
+        if self.__box is None:
+            self.__box = Rectangle.from_shape(self)
         return self.__box
 
     @property
     def center(self):
+        if self.__center is None:
+            self.__center = Polygon.find_center(self.vertices)
         return self.__center
 
     @property
@@ -379,17 +457,10 @@ class Rectangle(Shape):
 
     @staticmethod
     def from_shape(shape):
-        top, left = shape.center
-        bottom, right = shape.center
-
-        for vertex in shape.vertices:
-            top = min(top, vertex.y)
-            left = min(left, vertex.x)
+        xs = [vertex[0] for vertex in shape.vertices]
+        ys = [vertex[1] for vertex in shape.vertices]
 
-            bottom = max(bottom, vertex.y)
-            right = max(right, vertex.y)
-
-        return Rectangle(left, top, right, bottom)
+        return Rectangle(min(xs), min(ys), max(xs), max(ys))
 
     def shrink(self, padding):
         return self.grow(-padding)
@@ -414,6 +485,11 @@ class Rectangle(Shape):
         return Rectangle(left, top, right, bottom)
     # }}}1
 
+    # The top, right, bottom, and left normals, in the same order as the
+    # vertices that start each of those edges.
+    outward_normals = (
+            Vector(0, -1), Vector(1, 0), Vector(0, 1), Vector(-1, 0))
+
     # Operators {{{1
     def __init__(self, left, top, right, bottom):
         self.__left = min(left, right)
@@ -422,8 +498,16 @@ class Rectangle(Shape):
         self.__right = max(right, left)
         self.__bottom = max(bottom, top)
 
+        self.__center = None
+        self.__vertices = None
+        self.__edges = None
+
+    def __reduce__(self):
+        """ Pickle rectangles using their sides. """
+        return type(self), (self.left, self.top, self.right, self.bottom)
+
     def __eq__(self, other):
-        return (type(self) == type(other) and
+        return (isinstance(other, Rectangle) and
                 self.top == other.top and
                 self.bottom == other.bottom and
                 self.left == other.left and
@@ -460,18 +544,20 @@ class Rectangle(Shape):
     def size(self):
         return (self.width, self.height)
 
+    # The corners, edges, and center are all cached the first time they're
+    # used, since collision checks tend to use them over and over again.
     @property
     def top_left(self):
-        return Vector(self.left, self.top)
+        return self.vertices[0]
     @property
     def top_right(self):
-        return Vector(self.right, self.top)
+        return self.vertices[1]
     @property
     def bottom_left(self):
-        return Vector(self.left, self.bottom)
+        return self.vertices[3]
     @property
     def bottom_right(self):
-        return Vector(self.right, self.bottom)
+        return self.vertices[2]
 
     @property
     def corners(self):
@@ -479,32 +565,40 @@ class Rectangle(Shape):
 
     @property
     def top_edge(self):
-        return Line(self.top_left, self.top_right, Vector(0, -1))
+        return self.edges[0]
     @property
     def bottom_edge(self):
-        return Line(self.bottom_left, self.bottom_right, Vector(0, 1))
+        return self.edges[1]
     @property
     def left_edge(self):
-        return Line(self.top_left, self.bottom_left, Vector(-1, 0))
+        return self.edges[2]
     @property
     def right_edge(self):
-        return Line(self.top_right, self.bottom_right, Vector(1, 0))
+        return self.edges[3]
 
     @property
     def edges(self):
-        return (self.top_edge, self.bottom_edge,
-                self.left_edge, self.right_edge)
+        if self.__edges is None:
+            self.__edges = Rectangle.find_sides(self.vertices)
+        return self.__edges
 
     @property
     def vertices(self):
-        return (self.top_left, self.top_right,
-                self.bottom_right, self.bottom_left)
+        if self.__vertices is None:
+            self.__vertices = Rectangle.find_corners(
+                    self.left, self.top, self.right, self.bottom)
+        return self.__vertices
+
+    @property
+    def normals(self):
+        return Rectangle.outward_normals
 
     @property
     def center(self):
-        x = (self.left + self.right) / 2.0
-        y = (self.top + self.bottom) / 2.0
-        return Vector(x, y)
+        if self.__center is None:
+            self.__center = Rectangle.find_middle(
+                    self.left, self.top, self.right, self.bottom)
+        return self.__center
 
     @property
     def box(self):
@@ -537,6 +631,267 @@ class Rectangle(Shape):
     def get_bottom_edge(self): return self.bottom_edge
     def get_left_edge(self): return self.left_edge
     def get_right_edge(self): return self.right_edge
+
+    # Setup Methods {{{1
+    @staticmethod
+    def find_corners(left, top, right, bottom):
+        return (Vector(left, top), Vector(right, top),
+                Vector(right, bottom), Vector(left, bottom))
+
+    @staticmethod
+    def find_middle(left, top, right, bottom):
+        return Vector((left + right) / 2.0, (top + bottom) / 2.0)
+
+    @staticmethod
+    def find_sides(vertices):
+        top_left, top_right, bottom_right, bottom_left = vertices
+        top, right, bottom, left = Rectangle.outward_normals
+
+        return (Line(top_left, top_right, top),
+                Line(bottom_left, bottom_right, bottom),
+                Line(top_left, bottom_left, left),
+                Line(top_right, bottom_right, right))
+    # }}}1
+
+class TransformedShape(Shape):
+    """ Places a polygon or rectangle that is described in its own local space
+    into the world using a transform.  The world-space vertices, normals, and
+    edges are only calculated when they're first needed, and moving or
+    rotating the shape reuses the same local shape.  This makes it cheap to
+    move and rotate sprites every frame. """
+
+    # Factory Methods {{{1
+    def move(self, displacement):
+        """ Return a shape that is offset from this one. """
+        return self.place(self.transform.move(displacement))
+
+    def rotate(self, angle):
+        """ Return a shape that is rotated about its local origin. """
+        return self.place(self.transform.rotate(angle))
+
+    def place(self, transform):
+        """ Return a shape with the same local geometry as this one, but with
+        a different transform. """
+        return TransformedShape(self.local, transform)
+    # }}}1
+
+    # Operators {{{1
+    def __init__(self, local, transform):
+        self.__local = local
+        self.__transform = transform
+
+        self.__vertices = None
+        self.__normals = None
+        self.__edges = None
+        self.__center = None
+        self.__box = None
+
+    def __reduce__(self):
+        """ Pickle transformed shapes using their local shape and their
+        transform. """
+        return TransformedShape, (self.__local, self.__transform)
+
+    def __repr__(self):
+        return "TransformedShape: %s, %s" % (self.local, self.transform)
+
+    # Attributes {{{1
+    @property
+    def local(self):
+        return self.__local
+
+    @property
+    def transform(self):
+        return self.__transform
+
+    @property
+    def vertices(self):
+        if self.__vertices is None:
+            self.__vertices = self.transform.apply_all(self.local.vertices)
+        return self.__vertices
+
+    @property
+    def normals(self):
+        if self.__normals is None:
+            apply = self.transform.apply_normal
+            self.__normals = [apply(normal) for normal in self.local.normals]
+        return self.__normals
+
+    @property
+    def edges(self):
+        if self.__edges is None:
+            self.__edges = Shape.find_edges(
+                    self.vertices, self.center, self.normals)
+        return self.__edges
+
+    @property
+    def center(self):
+        if self.__center is None:
+            self.__center = self.transform.apply(self.local.center)
+        return self.__center
+
+    @property
+    def box(self):
+        if self.__box is None:
+            self.__box = Rectangle.from_shape(self)
+        return self.__box
+
+    @property
+    def pygame(self):
+        return [vertex.pygame for vertex in self.vertices]
+
+    def get_local(self): return self.local
+    def get_transform(self): return self.transform
+    # }}}1
+
+class MutableCircle(Circle):
+    """ A circle that can be moved and resized in place.  The center is a
+    mutable vector, and the box is a mutable rectangle that is updated along
+    with the circle, so moving the circle every frame doesn't allocate any
+    new objects.  Mutable circles can be used anywhere a circle can.
+
+    Be aware that the center and the box are shared with the circle, so they
+    change whenever the circle does.  Use freeze() to take a snapshot. """
+
+    # Factory Methods {{{1
+    def freeze(self):
+        """ Return an immutable copy of this circle. """
+        return Circle(self.center.freeze(), self.radius)
+
+    def grow(self, padding):
+        """ Return an immutable circle with a larger radius than this one.
+        The new circle doesn't share this circle's center. """
+        return self.freeze().grow(padding)
+
+    def move_ip(self, displacement):
+        """ Move this circle by the given displacement. """
+        self.__center += displacement
+        self.__box.move_ip(displacement)
+
+    def place_ip(self, center):
+        """ Move the center of this circle to the given point. """
+        self.__center.assign(center)
+        self.__update()
+
+    def grow_ip(self, padding):
+        """ Make the radius of this circle bigger. """
+        self.__radius += padding
+        self.__update()
+
+    def shrink_ip(self, padding):
+        """ Make the radius of this circle smaller. """
+        self.grow_ip(-padding)
+    # }}}1
+
+    # Operators {{{1
+    def __init__(self, center, radius):
+        self.__center = MutableVector.from_vector(center)
+        self.__radius = radius
+        self.__box = MutableRectangle(0, 0, 0, 0)
+        self.__update()
+
+    def __reduce__(self):
+        return MutableCircle, (self.__center.freeze(), self.__radius)
+
+    def __update(self):
+        x, y = self.__center; r = self.__radius
+        self.__box.update(x - r, y - r, x + r, y + r)
+
+    # Attributes {{{1
+    @property
+    def center(self):
+        return self.__center
+
+    @property
+    def radius(self):
+        return self.__radius
+
+    @property
+    def box(self):
+        return self.__box
+    # }}}1
+
+class MutableRectangle(Rectangle):
+    """ A rectangle that can be moved and resized in place.  The vertices,
+    edges, and center are still cached, but the cache is cleared whenever the
+    rectangle changes.  Mutable rectangles can be used anywhere a rectangle
+    can, including as the box of a mutable circle.  The factory methods
+    inherited from the rectangle class return new, immutable rectangles. """
+
+    # Factory Methods {{{1
+    def freeze(self):
+        """ Return an immutable copy of this rectangle. """
+        return Rectangle(self.left, self.top, self.right, self.bottom)
+
+    def move_ip(self, displacement):
+        """ Move this rectangle by the given displacement. """
+        dx, dy = displacement
+
+        self.__left += dx; self.__right += dx
+        self.__top += dy; self.__bottom += dy
+        self.__forget()
+
+    def grow_ip(self, padding):
+        """ Make this rectangle bigger on every side. """
+        box = self.grow(padding)
+        self.update(box.left, box.top, box.right, box.bottom)
+
+    def shrink_ip(self, padding):
+        """ Make this rectangle smaller on every side. """
+        self.grow_ip(-padding)
+
+    def update(self, left, top, right, bottom):
+        """ Give this rectangle completely new dimensions. """
+        self.__left = min(left, right)
+        self.__top = min(top, bottom)
+
+        self.__right = max(right, left)
+        self.__bottom = max(bottom, top)
+
+        self.__forget()
+    # }}}1
+
+    # Operators {{{1
+    def __init__(self, left, top, right, bottom):
+        self.update(left, top, right, bottom)
+
+    def __forget(self):
+        self.__center = None
+        self.__vertices = None
+        self.__edges = None
+
+    # Attributes {{{1
+    @property
+    def top(self):
+        return self.__top
+    @property
+    def bottom(self):
+        return self.__bottom
+    @property
+    def left(self):
+        return self.__left
+    @property
+    def right(self):
+        return self.__right
+
+    @property
+    def edges(self):
+        if self.__edges is None:
+            self.__edges = Rectangle.find_sides(self.vertices)
+        return self.__edges
+
+    @property
+    def vertices(self):
+        if self.__vertices is None:
+            self.__vertices = Rectangle.find_corners(
+                    self.left, self.top, self.right, self.bottom)
+        return self.__vertices
+
+    @property
+    def center(self):
+        if self.__center is None:
+            self.__center = Rectangle.find_middle(
+                    self.left, self.top, self.right, self.bottom)
+        return self.__center
     # }}}1
 
 if __name__ == "__main__":
@@ -637,6 +992,20 @@ if __name__ == "__main__":
             assert vertex in polygon.vertices
             assert vertex.pygame in polygon.pygame
 
+        assert polygon.get_normals() == [top, right, bottom, left]
+        for edge, normal in zip(polygon.edges, polygon.normals):
+            assert edge.facing == normal
+
+        # Trusted polygons skip the convexity check, but otherwise behave
+        # exactly like any other polygon.
+        trusted = Polygon.from_vertices(vertices, trusted=True)
+        Polygon.from_vertices(bad_vertices, trusted=True)
+
+        assert trusted.get_box() == box
+        assert trusted.get_center() == center
+        assert trusted.get_normals() == polygon.get_normals()
+        assert trusted.get_edges() == polygon.get_edges()
+
     # Rectangle Tests {{{1
     def rectangle_tests():
 
@@ -668,6 +1037,14 @@ if __name__ == "__main__":
         for vertex in vertices:
             assert vertex in golden.vertices
 
+        assert list(golden.normals) == Shape.find_normals(
+                golden.vertices, golden.center)
+
+        assert golden.edges is golden.edges
+        assert golden.vertices is golden.vertices
+        assert golden.top_edge is golden.edges[0]
+        assert golden.corners == (golden.top_left, golden.bottom_right)
+
         assert golden == Rectangle.from_size(width, height)
         assert golden == Rectangle.from_center(center, width, height)
 
@@ -683,6 +1060,89 @@ if __name__ == "__main__":
         assert golden == Rectangle(
                 left - 1, top - 1, right - 1, bottom - 1).move(Vector(1, 1))
 
+    # Transformed Shape Tests {{{1
+    def transformed_tests():
+        local = Rectangle.from_center(Vector.null(), 20, 10)
+        transform = Transform(Vector(50, 50), math.pi / 2)
+        shape = TransformedShape(local, transform)
+
+        def same(first, second):
+            return Vector.get_distance(first, second) < 1e-9
+
+        assert shape.get_local() is local
+        assert shape.get_transform() == transform
+
+        assert same(shape.center, Vector(50, 50))
+        assert same(shape.box.top_left, Vector(45, 40))
+        assert same(shape.box.bottom_right, Vector(55, 60))
+
+        for vertex, expected in zip(shape.vertices, [
+                Vector(55, 40), Vector(55, 60),
+                Vector(45, 60), Vector(45, 40) ]):
+            assert same(vertex, expected)
+
+        # The normals should still point outwards and stay normalized.
+        for normal, edge in zip(shape.normals, shape.edges):
+            assert abs(normal.magnitude - 1) < 1e-9
+            assert Vector.dot(normal, edge.center - shape.center) > 0
+
+        # Moving and rotating reuse the same local shape.
+        moved = shape.move(Vector(10, 0)).rotate(-math.pi / 2)
+
+        assert moved.local is local
+        assert same(moved.center, Vector(60, 50))
+        assert same(moved.box.top_left, Vector(50, 45))
+
+        scaled = TransformedShape(local, Transform.from_scale(2))
+        assert same(scaled.box.bottom_right, Vector(20, 10))
+
+    # Mutable Shape Tests {{{1
+    def mutable_tests():
+        center = Vector(15, 15); radius = 5
+        displacement = Vector(5, -5)
+
+        circle = MutableCircle(center, radius)
+        box = circle.box
+
+        assert circle == Circle(center, radius)
+        assert box == Rectangle.from_center(center, 10, 10)
+
+        circle.move_ip(displacement)
+
+        assert circle.box is box
+        assert circle == Circle(center + displacement, radius)
+        assert box == Rectangle.from_center(center + displacement, 10, 10)
+
+        circle.place_ip(center); circle.grow_ip(1)
+
+        assert circle.box is box
+        assert circle == Circle(center, radius + 1)
+        assert box == Rectangle.from_center(center, 12, 12)
+
+        frozen = circle.freeze(); grown = circle.grow(1)
+        circle.shrink_ip(1); circle.move_ip(displacement)
+
+        assert frozen == Circle(center, radius + 1)
+        assert grown == Circle(center, radius + 2)
+
+        rectangle = MutableRectangle(0, 0, 10, 20)
+        vertices = rectangle.vertices
+
+        assert rectangle == Rectangle(0, 0, 10, 20)
+        assert rectangle.center == Vector(5, 10)
+
+        rectangle.move_ip(displacement)
+
+        assert rectangle == Rectangle(5, -5, 15, 15)
+        assert rectangle.vertices != vertices
+        assert rectangle.center == Vector(10, 5)
+        assert rectangle.top_edge == Rectangle(5, -5, 15, 15).top_edge
+
+        rectangle.grow_ip(5)
+        assert rectangle == Rectangle(0, -10, 20, 20)
+        assert type(rectangle.freeze()) is Rectangle
+        assert type(rectangle.move(displacement)) is Rectangle
+
     # }}}1
 
     print "Testing shapes.py..."
@@ -691,6 +1151,8 @@ if __name__ == "__main__":
     circle_tests()
     polygon_tests()
     rectangle_tests()
+    transformed_tests()
+    mutable_tests()
 
     print "All tests passed."
 
@@ -6,24 +6,49 @@ from __future__ import division
 
 import math
 import random
+import array
+import operator
 
-class Vector(object):
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class Vector(tuple):
     """ Represents a two-dimensional vector.  In particular, this class
     features a number of factory methods to create vectors from angles and
     other input and a number of overloaded operators to facilitate vector
-    math. """
+    math.
+
+    Vectors are stored as two-element tuples.  This keeps them small (there is
+    no per-instance dictionary), makes them immutable, and lets the operators
+    below read coordinates by index instead of through python properties.  Any
+    object that can be indexed like a vector can be used as an operand. """
+
+    __slots__ = ()
 
     # Factory Methods {{{1
     @staticmethod
     def null():
-        """ Return a null vector. """
-        return Vector(0, 0)
+        """ Return a null vector.  Vectors are immutable, so the same object
+        is returned every time. """
+        return _null
+
+    @staticmethod
+    def unit_x():
+        """ Return a unit vector pointing along the x-axis. """
+        return _unit_x
+
+    @staticmethod
+    def unit_y():
+        """ Return a unit vector pointing along the y-axis. """
+        return _unit_y
 
     @staticmethod
     def random(magnitude=1):
         """ Create a unit vector pointing in a random direction. """
         theta = random.uniform(0, 2 * math.pi)
-        return magnitude * Vector(math.cos(theta), math.sin(theta))
+        return Vector(magnitude * math.cos(theta), magnitude * math.sin(theta))
 
     @staticmethod
     def from_radians(angle):
@@ -48,7 +73,7 @@ class Vector(object):
 
         # Floating point error will confuse the trig functions occasionally.
         except ValueError:
-            return 0 if temp > 0 else pi
+            return 0 if temp > 0 else math.pi
 
         # It doesn't make sense to find the angle of a null vector. 
         except ZeroDivisionError:
@@ -63,18 +88,18 @@ class Vector(object):
     @staticmethod
     def get_distance(A, B):
         """ Return the Euclidean distance between the two input vectors. """
-        return (A - B).magnitude
+        dx = A[0] - B[0]; dy = A[1] - B[1]
+        return math.sqrt(dx * dx + dy * dy)
 
     @staticmethod
     def get_manhattan(A, B):
         """ Return the Manhattan distance between the two input vectors. """
-        disp = B - A
-        return abs(disp.x) + abs(disp.y)
+        return abs(B[0] - A[0]) + abs(B[1] - A[1])
 
     @staticmethod
     def dot_product(A, B):
         """ Return the dot product of the given vectors. """
-        return A.x * B.x + A.y * B.y
+        return A[0] * B[0] + A[1] * B[1]
 
     @staticmethod
     def perp_product(A, B):
@@ -82,7 +107,7 @@ class Vector(object):
         just a cross product where the third dimension is taken to be zero and
         the result is returned as a scalar. """
 
-        return A.x * B.y - A.y * B.x
+        return A[0] * B[1] - A[1] * B[0]
 
     # Create shorter aliases for the dot and perp products.
     dot = dot_product
@@ -90,128 +115,118 @@ class Vector(object):
     # }}}1
 
     # Operators {{{1
-    def __init__(self, x, y):
+    def __new__(cls, x, y):
         """ Construct a vector using the given coordinates. """
-        self.__x = x
-        self.__y = y
+        return _new(cls, (x, y))
 
-    def __iter__(self):
-        """ Iterate over this vectors coordinates. """
-        yield self.x; yield self.y
+    def __reduce__(self):
+        """ Pickle vectors using their coordinates. """
+        return Vector, (self[0], self[1])
 
     def __add__(self, v):
         """ Return the sum of this vector and the argument. """
-        return Vector(self.x + v.x, self.y + v.y)
+        return _new(Vector, (self[0] + v[0], self[1] + v[1]))
 
     def __sub__(self, v):
         """ Return the difference between this vector and the argument. """
-        return Vector(self.x - v.x, self.y - v.y)
+        return _new(Vector, (self[0] - v[0], self[1] - v[1]))
 
     def __neg__(self):
         """ Return a copy of this vector with the signs flipped. """
-        return Vector(-self.x, -self.y)
+        return _new(Vector, (-self[0], -self[1]))
 
     def __abs__(self):
         """ Return the absolute value of this vector. """
-        return Vector(abs(self.x), abs(self.y))
+        return _new(Vector, (abs(self[0]), abs(self[1])))
     
     def __mul__(self, c):
         """ Return the scalar product of this vector and the argument. """
-        return Vector(c * self.x, c * self.y)
+        return _new(Vector, (c * self[0], c * self[1]))
 
     def __rmul__(self, c):
         """ Return the scalar product of this vector and the argument. """
-        return Vector(c * self.x, c * self.y)
+        return _new(Vector, (c * self[0], c * self[1]))
 
     def __div__(self, c):
         """ Return the scalar quotient of this vector and the argument.  The
         argument is taken as a float to ensure true division. """
-        return Vector(self.x / float(c), self.y / float(c))
+        c = float(c)
+        return _new(Vector, (self[0] / c, self[1] / c))
 
     def __truediv__(self, c):
         """ Return the scalar quotient of this vector and the argument. """
-        return Vector(self.x / c, self.y / c)
+        return _new(Vector, (self[0] / c, self[1] / c))
 
     def __floordiv__(self, c):
         """ Return the integer quotient of this vector and the argument. """
-        return Vector(self.x // c, self.y // c)
+        return _new(Vector, (self[0] // c, self[1] // c))
 
     def __mod__(self, c):
         """ Return the remainder after dividing this vector by the argument.
         This should work with integer and floating point input. """
-        return Vector(self.x % c, self.y % c)
-
-    def __eq__(self, other):
-        """ Return true if this vector is exactly the same as the argument.
-        Floating point rounding error is completely unaccounted for. """
-        return self.x == other.x and self.y == other.y
+        return _new(Vector, (self[0] % c, self[1] % c))
 
-    def __ne__(self, other):
-        """ Return true if this vector and the argument are not the same. """
-        return self.x != other.x or self.y != other.y
+    # Equality and hashing are inherited from tuple.  As before, floating
+    # point rounding error is completely unaccounted for.
 
     def __nonzero__(self):
         """ Return true is the vector is not degenerate. """
-        return self.x != 0 or self.y != 0
+        return self[0] != 0 or self[1] != 0
 
     def __repr__(self):
         """ Return a string representation of this vector. """
-        return "<%f, %f>" % self.get_tuple()
+        return "<%f, %f>" % self
 
     def __str__(self):
         """ Return a string representation of this vector. """
         return self.__repr__()
 
     # Attributes {{{1
-    @property
-    def x(self):
-        """ Get the first coordinate in this vector. """
-        return self.__x
 
-    @property
-    def y(self):
-        """ Get the second coordinate in this vector. """
-        return self.__y
-
-    @property
-    def r(self):
-        """ Get the first coordinate in this vector. """
-        return self.__x
-    
-    @property
-    def th(self):
-        """ Get the second coordinate in this vector. """
-        return self.__y
+    # The coordinates are read with C-level item getters rather than python
+    # functions, because they are accessed so often.
+    x = property(operator.itemgetter(0),
+            doc="Get the first coordinate in this vector.")
+    y = property(operator.itemgetter(1),
+            doc="Get the second coordinate in this vector.")
+    r = property(operator.itemgetter(0),
+            doc="Get the first coordinate in this vector.")
+    th = property(operator.itemgetter(1),
+            doc="Get the second coordinate in this vector.")
 
     @property
     def tuple(self):
         """ Return the vector as a tuple. """
-        return self.x, self.y
+        return self[0], self[1]
 
     @property
     def pygame(self):
         """ Return the vector as a tuple of integers.  This is the format
         Pygame expects to receive coordinates in. """
-        return int(self.x), int(self.y)
+        return int(self[0]), int(self[1])
 
     @property
     def magnitude(self):
         """ Calculate the length of this vector. """
-        return math.sqrt(self.magnitude_squared)
+        x, y = self
+        return math.sqrt(x * x + y * y)
 
     @property
     def magnitude_squared(self):
         """ Calculate the square of the length of this vector.  This is
         slightly more efficient that finding the real length. """
-        return self.x**2 + self.y**2
+        x, y = self
+        return x * x + y * y
 
     @property
     def normal(self):
         """ Return a unit vector pointing in the same direction as this
         one. """
+        x, y = self
+        magnitude = math.sqrt(x * x + y * y)
 
         try:
-            return self / self.magnitude
+            return _new(Vector, (x / magnitude, y / magnitude))
         except ZeroDivisionError:
             raise NullVectorError()
 
@@ -219,7 +234,7 @@ class Vector(object):
     def orthogonal(self):
         """ Return a vector that is orthogonal to this one.  The resulting
         vector is not normalized. """
-        return Vector(-self.y, self.x)
+        return _new(Vector, (-self[1], self[0]))
 
     @property
     def orthonormal(self):
@@ -228,16 +243,16 @@ class Vector(object):
         return self.orthogonal.normal
 
     def get_x(self):
-        return self.x
+        return self[0]
 
     def get_y(self):
-        return self.y
+        return self[1]
 
     def get_r(self):
-        return self.r
+        return self[0]
 
     def get_th(self):
-        return self.th
+        return self[1]
 
     def get_tuple(self):
         return self.tuple
@@ -270,6 +285,532 @@ class Vector(object):
 
     # }}}1
 
+# Vectors are built by calling tuple.__new__() directly wherever possible,
+# which skips the python-level constructor.  The most common constants are
+# only ever built once.
+_new = tuple.__new__
+_null = Vector(0, 0)
+_unit_x = Vector(1, 0)
+_unit_y = Vector(0, 1)
+
+class MutableVector(list):
+    """ Represents a two-dimensional vector that can be changed in place.  This
+    is meant for values that are updated every frame, like the position of a
+    moving object, because updating it doesn't allocate anything.  Only the
+    augmented assignment operators (+=, -=, *=, and /=) change the vector
+    itself; the other operators still return new, immutable vectors.
+
+    Mutable vectors are stored as two-element lists, so they can be indexed
+    and unpacked exactly like normal vectors.  This means they can be passed to
+    any function that expects a vector.  They can't be hashed. """
+
+    __slots__ = ()
+
+    # Factory Methods {{{1
+    @staticmethod
+    def from_vector(vector):
+        """ Create a mutable copy of the given vector. """
+        return MutableVector(vector[0], vector[1])
+
+    def freeze(self):
+        """ Return an immutable copy of this vector. """
+        return _new(Vector, (self[0], self[1]))
+
+    def assign(self, v):
+        """ Copy the coordinates of the given vector into this one. """
+        self[0] = v[0]; self[1] = v[1]
+        return self
+    # }}}1
+
+    # Operators {{{1
+    def __init__(self, x, y):
+        list.__init__(self, (x, y))
+
+    def __reduce__(self):
+        """ Pickle mutable vectors using their coordinates. """
+        return MutableVector, (self[0], self[1])
+
+    def __iadd__(self, v):
+        self[0] += v[0]; self[1] += v[1]
+        return self
+
+    def __isub__(self, v):
+        self[0] -= v[0]; self[1] -= v[1]
+        return self
+
+    def __imul__(self, c):
+        self[0] *= c; self[1] *= c
+        return self
+
+    def __itruediv__(self, c):
+        self[0] /= c; self[1] /= c
+        return self
+
+    __idiv__ = __itruediv__
+
+    def __add__(self, v):
+        return _new(Vector, (self[0] + v[0], self[1] + v[1]))
+
+    def __radd__(self, v):
+        return _new(Vector, (v[0] + self[0], v[1] + self[1]))
+
+    def __sub__(self, v):
+        return _new(Vector, (self[0] - v[0], self[1] - v[1]))
+
+    def __rsub__(self, v):
+        return _new(Vector, (v[0] - self[0], v[1] - self[1]))
+
+    def __mul__(self, c):
+        return _new(Vector, (c * self[0], c * self[1]))
+
+    def __rmul__(self, c):
+        return _new(Vector, (c * self[0], c * self[1]))
+
+    def __truediv__(self, c):
+        return _new(Vector, (self[0] / c, self[1] / c))
+
+    __div__ = __truediv__
+
+    def __neg__(self):
+        return _new(Vector, (-self[0], -self[1]))
+
+    def __abs__(self):
+        return _new(Vector, (abs(self[0]), abs(self[1])))
+
+    def __eq__(self, other):
+        try:
+            return (len(other) == 2 and
+                    self[0] == other[0] and self[1] == other[1])
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __nonzero__(self):
+        return self[0] != 0 or self[1] != 0
+
+    def __repr__(self):
+        return "<%f, %f>" % (self[0], self[1])
+
+    def __str__(self):
+        return self.__repr__()
+
+    # Attributes {{{1
+    def __set_x(self, x): self[0] = x
+    def __set_y(self, y): self[1] = y
+
+    x = property(operator.itemgetter(0), __set_x,
+            doc="Get or set the first coordinate in this vector.")
+    y = property(operator.itemgetter(1), __set_y,
+            doc="Get or set the second coordinate in this vector.")
+
+    # The rest of the attributes only ever index the vector, so they can be
+    # borrowed directly from the immutable vector class.
+    tuple = Vector.__dict__["tuple"]
+    pygame = Vector.__dict__["pygame"]
+    magnitude = Vector.__dict__["magnitude"]
+    magnitude_squared = Vector.__dict__["magnitude_squared"]
+    normal = Vector.__dict__["normal"]
+    orthogonal = Vector.__dict__["orthogonal"]
+    orthonormal = Vector.__dict__["orthonormal"]
+
+    get_x = Vector.__dict__["get_x"]
+    get_y = Vector.__dict__["get_y"]
+    get_tuple = Vector.__dict__["get_tuple"]
+    get_pygame = Vector.__dict__["get_pygame"]
+    get_magnitude = Vector.__dict__["get_magnitude"]
+    get_magnitude_squared = Vector.__dict__["get_magnitude_squared"]
+    get_normal = Vector.__dict__["get_normal"]
+    get_orthogonal = Vector.__dict__["get_orthogonal"]
+    get_orthonormal = Vector.__dict__["get_orthonormal"]
+    get_components = Vector.__dict__["get_components"]
+    # }}}1
+
+class VectorArray(object):
+    """ Represents a sequence of two-dimensional vectors.  The coordinates are
+    kept in two contiguous arrays of floats, which are numpy arrays if numpy is
+    installed and array.array objects otherwise.  All of the operators and
+    attributes provided by the Vector class are applied elementwise, so one
+    call can replace a loop over thousands of vectors.
+
+    Scalar arguments are applied to every vector in the array and Vector
+    arguments are added to or subtracted from every vector in the array.  Note
+    that a VectorArray must be the left operand in these cases, because the
+    Vector operators don't know anything about arrays. """
+
+    # Factory Methods {{{1
+    @staticmethod
+    def null(size):
+        """ Return an array of null vectors. """
+        return VectorArray([0] * size, [0] * size)
+
+    @staticmethod
+    def from_vectors(vectors):
+        """ Create an array from any sequence of Vector objects. """
+        vectors = list(vectors)
+        return VectorArray([v.x for v in vectors], [v.y for v in vectors])
+
+    # Math Methods {{{1
+    @staticmethod
+    def get_distance(A, B):
+        """ Return the Euclidean distances between the two inputs.  Either
+        input may be a single vector. """
+        Ax, Ay = _components(A); Bx, By = _components(B)
+        return VectorArray(
+                _elementwise(operator.sub, Ax, Bx),
+                _elementwise(operator.sub, Ay, By)).magnitude
+
+    @staticmethod
+    def dot_product(A, B):
+        """ Return the dot products of the given vectors. """
+        Ax, Ay = _components(A); Bx, By = _components(B)
+        return _elementwise(_dot, Ax, Ay, Bx, By)
+
+    @staticmethod
+    def perp_product(A, B):
+        """ Return the perp products of the given vectors. """
+        Ax, Ay = _components(A); Bx, By = _components(B)
+        return _elementwise(_perp, Ax, Ay, Bx, By)
+
+    # Create shorter aliases for the dot and perp products.
+    dot = dot_product
+    perp = perp_product
+    # }}}1
+
+    # Operators {{{1
+    def __init__(self, xs, ys):
+        """ Construct an array from the given sequences of coordinates. """
+        self.__x = _coordinates(xs)
+        self.__y = _coordinates(ys)
+
+        if len(self.__x) != len(self.__y):
+            raise ValueError("Coordinate arrays must be the same length.")
+
+    def __len__(self):
+        """ Return the number of vectors in this array. """
+        return len(self.__x)
+
+    def __getitem__(self, index):
+        """ Return a single vector, or a new array if given a slice. """
+        if isinstance(index, slice):
+            return VectorArray(self.__x[index], self.__y[index])
+        return Vector(float(self.__x[index]), float(self.__y[index]))
+
+    def __iter__(self):
+        """ Iterate over the vectors in this array. """
+        for x, y in zip(self.__x, self.__y):
+            yield Vector(float(x), float(y))
+
+    def __add__(self, v):
+        """ Return the sums of these vectors and the argument. """
+        vx, vy = _components(v)
+        return VectorArray(
+                _elementwise(operator.add, self.__x, vx),
+                _elementwise(operator.add, self.__y, vy))
+
+    def __sub__(self, v):
+        """ Return the differences between these vectors and the argument. """
+        vx, vy = _components(v)
+        return VectorArray(
+                _elementwise(operator.sub, self.__x, vx),
+                _elementwise(operator.sub, self.__y, vy))
+
+    def __neg__(self):
+        """ Return a copy of this array with the signs flipped. """
+        return VectorArray(
+                _elementwise(operator.neg, self.__x),
+                _elementwise(operator.neg, self.__y))
+
+    def __abs__(self):
+        """ Return the absolute values of these vectors. """
+        return VectorArray(
+                _elementwise(abs, self.__x),
+                _elementwise(abs, self.__y))
+
+    def __mul__(self, c):
+        """ Return the scalar products of these vectors and the argument.  The
+        argument can either be a single number or one number per vector. """
+        return VectorArray(
+                _elementwise(operator.mul, self.__x, c),
+                _elementwise(operator.mul, self.__y, c))
+
+    def __rmul__(self, c):
+        """ Return the scalar products of these vectors and the argument. """
+        return self.__mul__(c)
+
+    def __div__(self, c):
+        """ Return the scalar quotients of these vectors and the argument. """
+        return self.__truediv__(c)
+
+    def __truediv__(self, c):
+        """ Return the scalar quotients of these vectors and the argument. """
+        return VectorArray(
+                _elementwise(operator.truediv, self.__x, c),
+                _elementwise(operator.truediv, self.__y, c))
+
+    def __floordiv__(self, c):
+        """ Return the integer quotients of these vectors and the argument. """
+        return VectorArray(
+                _elementwise(operator.floordiv, self.__x, c),
+                _elementwise(operator.floordiv, self.__y, c))
+
+    def __mod__(self, c):
+        """ Return the remainders after dividing these vectors by the
+        argument. """
+        return VectorArray(
+                _elementwise(operator.mod, self.__x, c),
+                _elementwise(operator.mod, self.__y, c))
+
+    def __eq__(self, other):
+        """ Return true if every vector in this array is exactly the same as
+        the corresponding vector in the argument. """
+        return (list(self.x) == list(other.x) and
+                list(self.y) == list(other.y))
+
+    def __ne__(self, other):
+        """ Return true if any of the vectors in the arrays differ. """
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        """ Return a string representation of this array. """
+        return "[%s]" % ", ".join(repr(vector) for vector in self)
+
+    # Attributes {{{1
+    @property
+    def x(self):
+        """ Get the array of first coordinates. """
+        return self.__x
+
+    @property
+    def y(self):
+        """ Get the array of second coordinates. """
+        return self.__y
+
+    @property
+    def magnitude(self):
+        """ Calculate the length of every vector in this array. """
+        return _elementwise(_sqrt, self.magnitude_squared)
+
+    @property
+    def magnitude_squared(self):
+        """ Calculate the squared length of every vector in this array. """
+        return _elementwise(_dot, self.__x, self.__y, self.__x, self.__y)
+
+    @property
+    def normal(self):
+        """ Return an array of unit vectors pointing in the same directions as
+        the vectors in this one. """
+        magnitude = self.magnitude
+
+        if 0 in magnitude:
+            raise NullVectorError()
+
+        return self / magnitude
+
+    @property
+    def orthogonal(self):
+        """ Return an array of vectors that are orthogonal to the ones in this
+        array.  The resulting vectors are not normalized. """
+        return VectorArray(_elementwise(operator.neg, self.__y), self.__x)
+
+    @property
+    def orthonormal(self):
+        """ Return an array of vectors that are both normalized and orthogonal
+        to the ones in this array. """
+        return self.orthogonal.normal
+
+    def get_x(self):
+        return self.x
+
+    def get_y(self):
+        return self.y
+
+    def get_magnitude(self):
+        return self.magnitude
+
+    def get_magnitude_squared(self):
+        return self.magnitude_squared
+
+    def get_normal(self, magnitude=1):
+        return magnitude * self.normal
+
+    def get_orthogonal(self):
+        return self.orthogonal
+
+    def get_orthonormal(self, magnitude=1):
+        return magnitude * self.orthonormal
+
+    # }}}1
+
+# Array Backend {{{1
+def _coordinates(values):
+    """ Store the given numbers in a contiguous array of floats.  Arrays that
+    are already in the right format are not copied. """
+    if numpy is not None:
+        return numpy.asarray(values, dtype=numpy.float64)
+    if isinstance(values, array.array) and values.typecode == 'd':
+        return values
+    return array.array('d', values)
+
+def _components(v):
+    """ Return the coordinates of either a vector or a vector array. """
+    return v.x, v.y
+
+def _elementwise(function, *arguments):
+    """ Apply the given function to every element of the given arrays.  Any
+    scalar arguments are repeated for every element.  Numpy arrays do this on
+    their own, so in that case the function is just called once. """
+    if numpy is not None:
+        return function(*arguments)
+
+    size = max(len(x) for x in arguments if hasattr(x, '__len__'))
+    columns = [x if hasattr(x, '__len__') else [x] * size for x in arguments]
+
+    return array.array('d', map(function, *columns))
+
+def _dot(Ax, Ay, Bx, By):
+    return Ax * Bx + Ay * By
+
+def _perp(Ax, Ay, Bx, By):
+    return Ax * By - Ay * Bx
+
+_sqrt = numpy.sqrt if numpy is not None else math.sqrt
+# }}}1
+
+class Transform(object):
+    """ Represents a translation, a rotation, and a uniform scaling.  Points
+    are scaled and rotated about the origin first, then translated.  Like
+    vectors, transforms are immutable.  The sine and cosine of the rotation
+    are only calculated once, so applying a transform to many points is
+    cheap. """
+
+    # Factory Methods {{{1
+    @staticmethod
+    def identity():
+        return Transform()
+
+    @staticmethod
+    def from_translation(translation):
+        return Transform(translation)
+
+    @staticmethod
+    def from_rotation(angle):
+        return Transform(rotation=angle)
+
+    @staticmethod
+    def from_scale(scale):
+        return Transform(scale=scale)
+
+    def move(self, displacement):
+        """ Return a transform that is translated further than this one. """
+        return Transform(self.translation + displacement,
+                self.rotation, self.scale)
+
+    def rotate(self, angle):
+        """ Return a transform that is rotated further than this one, about
+        the same center. """
+        return Transform(self.translation, self.rotation + angle, self.scale)
+    # }}}1
+
+    # Math Methods {{{1
+    def apply(self, point):
+        """ Move the given point from local space into world space. """
+        x, y = point; tx, ty = self.__translation
+        c = self.__cos; s = self.__sin
+
+        return _new(Vector, (tx + c * x - s * y, ty + s * x + c * y))
+
+    def apply_all(self, points):
+        """ Move every one of the given points into world space at once. """
+        tx, ty = self.__translation
+        c = self.__cos; s = self.__sin
+
+        return [_new(Vector, (tx + c * x - s * y, ty + s * x + c * y))
+                for x, y in points]
+
+    def apply_inverse(self, point):
+        """ Move the given point from world space back into local space. """
+        tx, ty = self.__translation
+        x = point[0] - tx; y = point[1] - ty
+        c = self.__cos; s = self.__sin
+        k = self.__scale * self.__scale
+
+        return _new(Vector, ((c * x + s * y) / k, (c * y - s * x) / k))
+
+    def apply_normal(self, normal):
+        """ Rotate the given direction without scaling or translating it, so
+        unit vectors stay unit vectors. """
+        x, y = normal
+        c = self.__cos / self.__scale; s = self.__sin / self.__scale
+
+        return _new(Vector, (c * x - s * y, s * x + c * y))
+
+    def compose(self, other):
+        """ Return a transform that applies the given transform first and then
+        this one. """
+        return Transform(self.apply(other.translation),
+                self.rotation + other.rotation, self.scale * other.scale)
+    # }}}1
+
+    # Operators {{{1
+    def __init__(self, translation=_null, rotation=0, scale=1):
+        assert scale > 0
+
+        self.__translation = translation
+        self.__rotation = rotation
+        self.__scale = scale
+
+        # The scale is folded into the cosine and sine.
+        self.__cos = scale * math.cos(rotation)
+        self.__sin = scale * math.sin(rotation)
+
+    def __reduce__(self):
+        """ Pickle transforms without their cosine and sine. """
+        return Transform, (self.__translation, self.__rotation, self.__scale)
+
+    def __mul__(self, other):
+        return self.compose(other)
+
+    def __eq__(self, other):
+        return (isinstance(other, Transform) and
+                self.translation == other.translation and
+                self.rotation == other.rotation and
+                self.scale == other.scale)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "Transform: %s, %f rad, x%f" % (
+                self.translation, self.rotation, self.scale)
+
+    # Attributes {{{1
+    @property
+    def translation(self):
+        return self.__translation
+
+    @property
+    def rotation(self):
+        return self.__rotation
+
+    @property
+    def scale(self):
+        return self.__scale
+
+    @property
+    def inverse(self):
+        translation = self.apply_inverse(_null)
+        return Transform(translation, -self.rotation, 1 / self.scale)
+
+    def get_translation(self): return self.translation
+    def get_rotation(self): return self.rotation
+    def get_scale(self): return self.scale
+    def get_inverse(self): return self.inverse
+    # }}}1
+
 class NullVectorError(Exception):
     """ Thrown when an operation chokes on a null vector. """
     pass
@@ -281,6 +822,9 @@ if __name__ == "__main__":
         """ Make sure that the factory methods return the right objects. """
 
         assert Vector.null() == Vector(0, 0)
+        assert Vector.null() is Vector.null()
+        assert Vector.unit_x() == Vector(1, 0)
+        assert Vector.unit_y() == Vector(0, 1)
 
         degrees = (0, 90, 180, 270)
         radians = (0, math.pi / 2, math.pi, 3 * math.pi / 2)
@@ -294,12 +838,151 @@ if __name__ == "__main__":
         answers.  In particular, make sure that they can all cope with
         degenerate input. """
 
-        pass
+        import pickle
+
+        A = Vector(3, 4); B = Vector(-4, 3)
+
+        assert A + B == Vector(-1, 7)
+        assert A - B == Vector(7, 1)
+        assert 2 * A == A * 2 == Vector(6, 8)
+        assert A / 2 == Vector(1.5, 2)
+
+        assert A.magnitude == 5
+        assert A.magnitude_squared == 25
+        assert A.normal == Vector(0.6, 0.8)
+        assert A.orthogonal == B
+
+        assert Vector.dot(A, B) == 0
+        assert Vector.perp(A, B) == 25
+        assert Vector.get_distance(A, B) == math.sqrt(50)
+
+        assert not Vector.null()
+        assert pickle.loads(pickle.dumps(A)) == A
+        assert pickle.loads(pickle.dumps(A, 2)) == A
+
+        try: A.x = 0
+        except AttributeError: pass
+        else: assert False
+
+        try: Vector.null().normal
+        except NullVectorError: pass
+        else: assert False
+
+    # Array Tests {{{1
+    def array_tests():
+        """ Make sure that vector arrays give the same answers as doing the
+        same math one vector at a time. """
+
+        vectors = [Vector(3, 4), Vector(-1, 2), Vector(0, -5), Vector(7, 0)]
+        other = Vector(1, 1)
+
+        A = VectorArray.from_vectors(vectors)
+        B = VectorArray.from_vectors(reversed(vectors))
+
+        assert len(A) == len(vectors)
+        assert list(A) == vectors
+        assert A[1] == vectors[1]
+        assert list(A[1:3]) == vectors[1:3]
+
+        assert list(A + B) == [a + b for a, b in zip(A, B)]
+        assert list(A - other) == [a - other for a in vectors]
+        assert list(-A) == [-a for a in vectors]
+        assert list(abs(A)) == [abs(a) for a in vectors]
+        assert list(2 * A) == [2 * a for a in vectors]
+        assert list(A / 2) == [a / 2 for a in vectors]
+        assert list(A // 2) == [a // 2 for a in vectors]
+        assert list(A % 2) == [a % 2 for a in vectors]
+        assert A * [1, 2, 3, 4] == VectorArray.from_vectors(
+                [k * a for k, a in zip([1, 2, 3, 4], vectors)])
+
+        assert list(A.magnitude) == [a.magnitude for a in vectors]
+        assert list(A.magnitude_squared) == \
+                [a.magnitude_squared for a in vectors]
+        assert list(A.normal) == [a.normal for a in vectors]
+        assert list(A.orthogonal) == [a.orthogonal for a in vectors]
+
+        assert list(VectorArray.dot(A, B)) == \
+                [Vector.dot(a, b) for a, b in zip(A, B)]
+        assert list(VectorArray.perp(A, other)) == \
+                [Vector.perp(a, other) for a in vectors]
+        assert list(VectorArray.get_distance(A, other)) == \
+                [Vector.get_distance(a, other) for a in vectors]
+
+        try: VectorArray.null(3).normal
+        except NullVectorError: pass
+        else: assert False
+
+    # Mutable Tests {{{1
+    def mutable_tests():
+        """ Make sure that mutable vectors change in place, but otherwise
+        behave just like normal vectors. """
+
+        import pickle
+
+        A = MutableVector(3, 4); B = Vector(-4, 3)
+        original = A
+
+        A += B; assert A == Vector(-1, 7)
+        A -= B; assert A == Vector(3, 4)
+        A *= 2; assert A == Vector(6, 8)
+        A /= 2; assert A == Vector(3, 4)
+        assert A is original
+
+        assert A + B == B + A == Vector(-1, 7)
+        assert A - B == Vector(7, 1) and B - A == Vector(-7, -1)
+        assert 2 * A == A * 2 == Vector(6, 8)
+        assert type(A + B) is type(B + A) is Vector
+
+        assert A.magnitude == 5
+        assert A.normal == Vector(0.6, 0.8)
+        assert A.orthogonal == B
+        assert Vector.dot(A, B) == 0
+        assert Vector.get_distance(A, B) == math.sqrt(50)
+
+        A.x = 5; A.y = 6
+        assert A.freeze() == Vector(5, 6)
+        assert A.assign(B) == B
+        assert pickle.loads(pickle.dumps(A)) == A
+
+        try: hash(A)
+        except TypeError: pass
+        else: assert False
+
+    # Transform Tests {{{1
+    def transform_tests():
+        """ Make sure that transforms move points into and out of world space
+        consistently. """
+
+        def same(A, B):
+            return Vector.get_distance(A, B) < 1e-9
+
+        point = Vector(3, 4)
+        transform = Transform(Vector(10, -5), math.pi / 2, 2)
+        other = Transform(Vector(-1, 2), -math.pi / 3, 0.5)
+
+        assert same(transform.apply(point), Vector(2, 1))
+        assert transform.apply_all([point, -point]) == \
+                [transform.apply(point), transform.apply(-point)]
+        assert same(transform.apply_inverse(Vector(2, 1)), point)
+        assert same(transform.apply_normal(Vector(1, 0)), Vector(0, 1))
+
+        assert same(transform.inverse.apply(transform.apply(point)), point)
+        assert same((transform * other).apply(point),
+                transform.apply(other.apply(point)))
+
+        assert Transform.identity().apply(point) == point
+        assert Transform.from_translation(point).apply(point) == 2 * point
+        assert transform.move(point).translation == Vector(13, -1)
+        assert transform.rotate(1).rotation == math.pi / 2 + 1
     # }}}1
 
     print "Testing vector.py..."
 
     factory_tests()
+    math_tests()
+    array_tests()
+    mutable_tests()
+    transform_tests()
 
     print "All tests passed."
     print "However, there are not many tests for this module.  Use with caution."
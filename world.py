@@ -0,0 +1,340 @@
+""" The world module ties the broad-phase indices and the narrow-phase
+collision functions together.  A collision world owns a set of shapes, and
+every time it is stepped it finds the pairs of shapes that are touching and
+reports which of those pairs started touching, kept touching, or stopped
+touching since the last step.
+
+Shapes are immutable, so moving a shape usually means replacing it with a new
+object.  The world treats the replacement as the same body, so replacing a
+shape that is touching something doesn't cause the contact to end and begin
+again.  Mutable shapes can simply be moved in place; the world notices that
+their boxes changed the next time it is stepped. """
+
+from __future__ import division
+
+from collisions import Collisions
+from broadphase import AABBTree, default_category, default_mask
+
+class CollisionWorld(object):
+    """ Keeps track of which shapes are touching each other from one step to
+    the next.  Any broad-phase index can be used to find candidate pairs, and
+    the narrow phase defaults to Collisions.touching().  The result of the
+    narrow phase is cached for every candidate pair, and is reused as long as
+    neither shape in the pair has moved.
+
+    Callbacks can be registered for the three kinds of events.  Each callback
+    is called with the two shapes involved, in the order they were added to
+    the world.  The same events are also returned by step(). """
+
+    # Operators {{{1
+    def __init__(self, broad_phase=None, narrow_phase=None):
+        self.__index = broad_phase if broad_phase is not None else AABBTree()
+        self.__narrow_phase = narrow_phase or Collisions.touching
+
+        self.__serial = 0
+        self.__serials = {}     # shape -> serial
+        self.__shapes = {}      # serial -> shape
+        self.__bounds = {}      # serial -> box when last checked
+
+        self.__moved = set()
+        self.__removed = {}
+        self.__cache = {}
+        self.__touching = set()
+
+        self.__enter_callbacks = []
+        self.__stay_callbacks = []
+        self.__exit_callbacks = []
+
+    def __len__(self):
+        return len(self.__serials)
+
+    def __iter__(self):
+        return iter(self.__serials)
+
+    def __contains__(self, shape):
+        return shape in self.__serials
+
+    # Attributes {{{1
+    @property
+    def broad_phase(self):
+        return self.__index
+
+    @property
+    def narrow_phase(self):
+        return self.__narrow_phase
+
+    @property
+    def touching(self):
+        """ Every pair of shapes that was touching as of the last step. """
+        return [self.__pair(key) for key in sorted(self.__touching)]
+
+    def get_broad_phase(self): return self.broad_phase
+    def get_narrow_phase(self): return self.narrow_phase
+    def get_touching(self): return self.touching
+
+    # Callbacks {{{1
+    def on_enter(self, callback):
+        """ Call the given function whenever two shapes start touching. """
+        self.__enter_callbacks.append(callback)
+
+    def on_stay(self, callback):
+        """ Call the given function once per step for every pair of shapes
+        that was already touching and still is. """
+        self.__stay_callbacks.append(callback)
+
+    def on_exit(self, callback):
+        """ Call the given function whenever two shapes stop touching,
+        including when one of them is removed from the world. """
+        self.__exit_callbacks.append(callback)
+
+    # Shape Methods {{{1
+    def insert(self, shape, category=default_category, mask=default_mask):
+        """ Add the given shape to the world.  The category and mask are
+        passed on to the broad phase, which never reports a pair unless each
+        shape's category shares a bit with the other shape's mask. """
+        serial = self.__serial
+        self.__serial += 1
+
+        self.__serials[shape] = serial
+        self.__shapes[serial] = shape
+        self.__bounds[serial] = CollisionWorld.find_bounds(shape)
+        self.__moved.add(serial)
+
+        self.__index.insert(shape, category, mask)
+
+    def remove(self, shape):
+        """ Remove the given shape from the world.  Any pairs it was part of
+        will be reported as exiting on the next step. """
+        serial = self.__serials.pop(shape)
+        del self.__shapes[serial]
+        del self.__bounds[serial]
+
+        self.__moved.discard(serial)
+        self.__removed[serial] = shape
+
+        self.__index.remove(shape)
+
+    def move(self, shape, replacement=None):
+        """ Tell the world that the given shape has moved.  If a replacement is
+        given, it takes the place of the original shape and is treated as the
+        same body, so contacts carry over from one to the other.  Mutable
+        shapes that have moved in place don't need to be passed to this
+        method, although it doesn't hurt. """
+
+        if replacement is None:
+            replacement = shape
+
+        serial = self.__serials.pop(shape)
+
+        self.__serials[replacement] = serial
+        self.__shapes[serial] = replacement
+        self.__bounds[serial] = CollisionWorld.find_bounds(replacement)
+        self.__moved.add(serial)
+
+        self.__index.move(shape, replacement)
+
+    # Simulation Methods {{{1
+    def step(self):
+        """ Find every pair of touching shapes, call the callbacks, and return
+        three lists of pairs: the pairs that started touching, the pairs that
+        kept touching, and the pairs that stopped touching. """
+
+        moved = self.__moved
+        self.__update(moved)
+
+        shapes = self.__shapes
+        serials = self.__serials
+        narrow_phase = self.__narrow_phase
+
+        old_cache = self.__cache
+        new_cache = {}
+        touching = set()
+
+        for first, second in self.__index.pairs():
+            a = serials[first]; b = serials[second]
+            key = (a, b) if a < b else (b, a)
+
+            # Only pairs that have moved since the last step are tested.
+            if a in moved or b in moved or key not in old_cache:
+                result = narrow_phase(first, second)
+            else:
+                result = old_cache[key]
+
+            new_cache[key] = result
+            if result: touching.add(key)
+
+        previous = self.__touching
+
+        entered = [self.__pair(key) for key in sorted(touching - previous)]
+        stayed = [self.__pair(key) for key in sorted(touching & previous)]
+        exited = [self.__pair(key) for key in sorted(previous - touching)]
+
+        self.__cache = new_cache
+        self.__touching = touching
+        self.__removed = {}
+        moved.clear()
+
+        for callbacks, pairs in (
+                (self.__enter_callbacks, entered),
+                (self.__stay_callbacks, stayed),
+                (self.__exit_callbacks, exited)):
+            for callback in callbacks:
+                for first, second in pairs:
+                    callback(first, second)
+
+        return entered, stayed, exited
+
+    def __update(self, moved):
+        """ Find any mutable shapes that have moved in place, and update the
+        index to match. """
+        bounds = self.__bounds
+        index = self.__index
+
+        for serial, shape in self.__shapes.iteritems():
+            current = CollisionWorld.find_bounds(shape)
+
+            if current != bounds[serial]:
+                bounds[serial] = current
+                moved.add(serial)
+                index.move(shape)
+
+    def __pair(self, key):
+        shapes = self.__shapes
+        removed = self.__removed
+
+        a, b = key
+        first = shapes[a] if a in shapes else removed[a]
+        second = shapes[b] if b in shapes else removed[b]
+
+        return first, second
+
+    # Helper Methods {{{1
+    @staticmethod
+    def find_bounds(shape):
+        box = shape.box
+        return box.left, box.top, box.right, box.bottom
+    # }}}1
+
+if __name__ == "__main__":
+    from vector import *
+    from shapes import *
+    from broadphase import *
+    from fixtures import random_shapes, brute_force_touching
+
+    # Event Tests {{{1
+    def event_tests():
+        first = Circle(Vector(0, 0), 5)
+        second = Circle(Vector(20, 0), 5)
+        events = []
+
+        world = CollisionWorld()
+        world.on_enter(lambda a, b: events.append(("enter", a, b)))
+        world.on_stay(lambda a, b: events.append(("stay", a, b)))
+        world.on_exit(lambda a, b: events.append(("exit", a, b)))
+
+        world.insert(first)
+        world.insert(second)
+
+        assert len(world) == 2
+        assert first in world and second in world
+
+        assert world.step() == ([], [], [])
+        assert events == []
+
+        # Replacing a shape carries its contacts over to the replacement.
+        moved = first.move(Vector(12, 0))
+        world.move(first, moved)
+
+        assert world.step() == ([(moved, second)], [], [])
+        assert world.touching == [(moved, second)]
+
+        again = moved.move(Vector(1, 0))
+        world.move(moved, again)
+
+        assert world.step() == ([], [(again, second)], [])
+
+        world.remove(second)
+
+        assert world.step() == ([], [], [(again, second)])
+        assert world.step() == ([], [], [])
+
+        assert events == [
+                ("enter", moved, second),
+                ("stay", again, second),
+                ("exit", again, second) ]
+
+    # Filter Tests {{{1
+    def filter_tests():
+        bullet, player = 1, 2
+
+        first = Circle(Vector(0, 0), 5)
+        second = Circle(Vector(8, 0), 5)
+        target = Circle(Vector(-5, 0), 5)
+
+        for index in (SpatialHash(32), SweepAndPrune(), AABBTree()):
+            world = CollisionWorld(index)
+
+            world.insert(first, bullet, player)
+            world.insert(second, bullet, player)
+            world.insert(target, player, bullet)
+
+            # The bullets overlap each other, but only hit the player.
+            entered, stayed, exited = world.step()
+            assert entered == [(first, target)]
+
+    # Cache Tests {{{1
+    def cache_tests():
+        calls = []
+
+        def narrow_phase(first, second):
+            calls.append((first, second))
+            return Collisions.touching(first, second)
+
+        shapes = random_shapes(200, size=300,
+                kinds=("rectangle", "mutable circle"))
+        mutables = [shape for shape in shapes
+                if isinstance(shape, MutableCircle)]
+
+        for index in (SpatialHash(32), SweepAndPrune(), AABBTree()):
+            world = CollisionWorld(index, narrow_phase)
+            touching = set()
+
+            for shape in shapes:
+                world.insert(shape)
+
+            for frame in range(5):
+                del calls[:]
+                entered, stayed, exited = world.step()
+
+                touching |= set(frozenset(pair) for pair in entered)
+                touching -= set(frozenset(pair) for pair in exited)
+
+                assert touching == set(frozenset(pair)
+                        for pair in brute_force_touching(shapes))
+                assert set(frozenset(pair) for pair in world.touching) \
+                        == touching
+
+                # Nothing that stayed still should have been tested again.
+                if frame:
+                    for pair in calls:
+                        assert any(shape in moving for shape in pair)
+
+                # Move a few of the circles in place.
+                moving = set(mutables[frame::7])
+                for shape in moving:
+                    shape.move_ip(Vector(3, -2))
+
+            # Put the circles back where they started.
+            for frame in range(5):
+                for shape in mutables[frame::7]:
+                    shape.move_ip(Vector(-3, 2))
+
+    # }}}1
+
+    print "Testing world.py..."
+
+    event_tests()
+    filter_tests()
+    cache_tests()
+
+    print "All tests passed."